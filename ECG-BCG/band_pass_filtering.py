@@ -3,20 +3,71 @@ Created on %(25/09/2017)
 Function to perform a Chebyshev type I bandpass filter for heart rate and breathing.
 """
 
-from scipy.signal import cheby1, filtfilt
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import cheby1, sosfilt, sosfilt_zi, sosfiltfilt
+
+# (high-pass cutoff, low-pass cutoff) in Hz
+FILTER_BANDS = {"bcg": (2.5, 5.0), "breath": (0.01, 0.4)}
+
+
+@lru_cache(maxsize=None)
+def design_sos(fs, filter_type):
+    """
+    Second-order sections (sos_high, sos_low) of the band: an order 2 high-pass
+    followed by an order 4 low-pass Chebyshev type I filter (0.5 dB ripple),
+    designed once per (fs, filter_type). Returns None for unknown filter types.
+    """
+    if filter_type not in FILTER_BANDS:
+        return None
+    high, low = FILTER_BANDS[filter_type]
+    sos_high = cheby1(2, 0.5, high / (fs / 2), btype='high', analog=False, output='sos')
+    sos_low = cheby1(4, 0.5, low / (fs / 2), btype='low', analog=False, output='sos')
+    # Shared by every caller through the cache: do not modify in place
+    return sos_high, sos_low
+
+
+class BandPassFilter:
+    """
+    Cached "bcg" / "breath" band-pass filter.
+
+    filtfilt() is the offline zero-phase filter used by band_pass_filtering
+    (high-pass then low-pass, each with sosfiltfilt, like the former two
+    filtfilt passes). process() is the causal streaming mode: it filters consecutive blocks of
+    a live signal with sosfilt and keeps the filter state between them, so
+    the concatenated output equals filtering the whole signal at once. The
+    state starts at the steady state of the first sample. Unknown filter
+    types pass the data through unchanged.
+    """
+
+    def __init__(self, fs, filter_type):
+        self.fs = fs
+        self.filter_type = filter_type
+        self.stages = design_sos(fs, filter_type)
+        self.sos = None if self.stages is None else np.vstack(self.stages)
+        self._zi = None
+
+    def filtfilt(self, data):
+        if self.stages is None:
+            return data
+        sos_high, sos_low = self.stages
+        return sosfiltfilt(sos_low, sosfiltfilt(sos_high, data))
+
+    def process(self, block):
+        if self.sos is None:
+            return np.asarray(block)
+        block = np.asarray(block, dtype=np.float64)
+        if block.size == 0:
+            return block
+        if self._zi is None:
+            self._zi = sosfilt_zi(self.sos) * block[0]
+        filtered, self._zi = sosfilt(self.sos, block, zi=self._zi)
+        return filtered
+
+    def reset(self):
+        self._zi = None
 
 
 def band_pass_filtering(data, fs, filter_type):
-    if filter_type == "bcg":
-        [b_cheby_high, a_cheby_high] = cheby1(2, 0.5, [2.5 / (fs / 2)], btype='high', analog=False)
-        bcg_ = filtfilt(b_cheby_high, a_cheby_high, data)
-        [b_cheby_low, a_cheby_low] = cheby1(4, 0.5, [5.0 / (fs / 2)], btype='low', analog=False)
-        filtered_data = filtfilt(b_cheby_low, a_cheby_low, bcg_)
-    elif filter_type == "breath":
-        [b_cheby_high, a_cheby_high] = cheby1(2, 0.5, [0.01 / (fs / 2)], btype='high', analog=False)
-        bcg_ = filtfilt(b_cheby_high, a_cheby_high, data)
-        [b_cheby_low, a_cheby_low] = cheby1(4, 0.5, [0.4 / (fs / 2)], btype='low', analog=False)
-        filtered_data = filtfilt(b_cheby_low, a_cheby_low, bcg_)
-    else:
-        filtered_data = data
-    return filtered_data
+    return BandPassFilter(fs, filter_type).filtfilt(data)
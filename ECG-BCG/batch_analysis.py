@@ -0,0 +1,177 @@
+"""
+Parallel per-patient heart-rate analysis (the main.py loop on a process pool).
+
+Every recording file of every patient folder under the dataset root (see
+pipeline.find_patient_files) is processed by pipeline.BCGPipeline in a
+worker process. Workers are started with the 'spawn' method, and BLAS,
+OpenMP and FFTW are capped to --threads threads per worker (1 by default),
+so 16 workers on 16 cores do not each start 16 threads of their own. A file
+that fails is reported in the results table with its error and does not stop
+the run.
+
+Usage: python batch_analysis.py <root_dir> [--workers 16] [--threads 1] [--patients 01 02] [--output results.csv]
+       [--segmented] [--profile stages.json] [--profile-patient 01]
+"""
+
+import argparse
+import multiprocessing
+import os
+from collections import namedtuple
+
+from job_pool import JobSummary, guarded_call, run_jobs, thread_limits
+
+# The dataInfo columns of main.py, followed by the run details
+RESULT_COLUMNS = ["PatientID", "RR AVG", "AVG BCG", "MAE", "RMSE", "MAPE",
+                  "Windows", "Valid windows", "Seconds", "File", "Error"]
+
+AnalysisJob = namedtuple('AnalysisJob', ['patient', 'path'])
+# stages: the profiling.StageRecord list of the recording when profiling
+PatientResult = namedtuple('PatientResult', ['patient', 'path', 'metrics', 'seconds', 'error', 'stages'],
+                           defaults=((),))
+BatchSummary = namedtuple('BatchSummary', ['table'] + list(JobSummary._fields))
+
+_pipeline = None  # built once per worker process
+_profiler = None
+
+
+def collect_jobs(root_dir, patients=None):
+    """One AnalysisJob per non-empty recording file, patient IDs taken from the digits of the folder names."""
+    from pipeline import find_patient_files
+
+    jobs = []
+    for folder_name in sorted(os.listdir(root_dir)):
+        folder_path = os.path.join(root_dir, folder_name)
+        patient = ''.join(filter(str.isdigit, folder_name))
+        if not os.path.isdir(folder_path) or (patients is not None and folder_name not in patients
+                                               and patient not in patients):
+            continue
+        for path in find_patient_files(folder_path):
+            if os.stat(path).st_size != 0:
+                jobs.append(AnalysisJob(patient, path))
+    return jobs
+
+
+def init_worker(threads, pipeline_options=None, profile=False, profile_patient=None):
+    """
+    Worker initializer: caps the already loaded thread pools and the FFTW plans
+    to `threads`, and builds the BCGPipeline with pipeline_options (keyword
+    arguments) and a profiling.Profiler when profile is set (profile_patient:
+    the patient to run under cProfile).
+    """
+    global _pipeline, _profiler
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(threads)
+    except ImportError:
+        pass  # the environment variables already apply to BLAS loaded by the worker
+
+    import fft_engine
+    from pipeline import BCGPipeline
+    from profiling import Profiler
+
+    fft_engine.configure(threads=threads)
+    _profiler = Profiler(profile or profile_patient is not None, profile_patient)
+    _pipeline = BCGPipeline(profiler=_profiler, **(pipeline_options or {}))
+
+
+def run_job(job):
+    """Processes one recording. Never raises: failures are returned in PatientResult.error."""
+    if _pipeline is None:
+        init_worker(1)
+    with _profiler.patient(job.patient):
+        result, error, seconds = guarded_call(_pipeline.process_patient, job.path)
+    metrics = result.metrics if result is not None else None
+    return PatientResult(job.patient, job.path, metrics, seconds, error, _profiler.take())
+
+
+def failed_job(job, error):
+    """PatientResult of a job whose worker process died."""
+    return PatientResult(job.patient, job.path, None, 0.0, error)
+
+
+def results_table(results):
+    """The combined dataInfo table, one row per recording (metrics NaN for failed files)."""
+    import numpy as np
+    import pandas as pd
+
+    rows = []
+    for r in results:
+        m = r.metrics
+        if m is None:
+            rows.append([r.patient] + [np.nan] * 5 + [0, 0, r.seconds, r.path, r.error])
+        else:
+            rows.append([r.patient, np.around(m.reference_mean), np.around(m.bcg_mean), m.mae, m.rmse, m.mape,
+                         m.n_windows, m.n_valid, r.seconds, r.path, r.error])
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def run_batch(root_dir, workers=None, threads=1, patients=None, output_path=None, verbose=True,
+              pipeline_options=None, profile_path=None, profile_patient=None):
+    """
+    Analyses every recording under root_dir with `workers` processes (defaults
+    to the number of cores; 1 runs in-process) of `threads` threads each, with
+    BCGPipeline(**pipeline_options).
+    Returns a BatchSummary; the table is also written to output_path when given
+    (CSV, Parquet or NPZ by extension, see columnar_cache). With profile_path
+    the stages of every recording are profiled and the cohort profile is
+    written there (.json or .csv, see profiling.Profiler.write);
+    profile_patient is run under cProfile.
+    """
+    if not os.path.isdir(root_dir):
+        raise FileNotFoundError(f"Dataset root '{root_dir}' not found.")
+
+    jobs = collect_jobs(root_dir, patients)
+    with thread_limits(threads):
+        jobs_summary = run_jobs(run_job, jobs, workers, sort_key=lambda r: (r.patient, r.path),
+                                report=_report if verbose else None, initializer=init_worker,
+                                initargs=(threads, pipeline_options, profile_path is not None, profile_patient),
+                                mp_context=multiprocessing.get_context('spawn'), failed_result=failed_job)
+    results, workers = jobs_summary.results, jobs_summary.workers
+    failed = [r for r in results if r.error is not None]
+    table = results_table(results)
+    summary = BatchSummary(table, *jobs_summary)
+    if output_path is not None:
+        from columnar_cache import write_table
+        write_table(table, output_path)
+    profiler = None
+    if profile_path is not None:
+        from profiling import Profiler
+        profiler = Profiler()
+        profiler.records = [record for r in results for record in r.stages]
+        profiler.write(profile_path)
+
+    if verbose:
+        print("\nBatch analysis summary")
+        print("==========================================================================================================")
+        print(f"Recordings: {len(results)}, succeeded: {summary.succeeded}, failed: {summary.failed}")
+        print(f"Workers: {workers} x {threads} thread(s), wall time: {summary.wall_seconds:.2f} s, "
+              f"summed recording time: {sum(r.seconds for r in results):.2f} s")
+        for r in failed:
+            print(f"  FAILED [{r.patient}] {r.path}: {r.error}")
+        if profiler is not None:
+            profiler.print_summary()
+    return summary
+
+
+def _report(result):
+    status = "ok" if result.error is None else "FAILED"
+    print(f"[{result.patient}] {os.path.basename(result.path)}: {status} ({result.seconds:.2f} s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root_dir", help="dataset root containing one folder per patient")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("--threads", type=int, default=1, help="BLAS/FFTW threads per worker")
+    parser.add_argument("--patients", nargs="+", default=None, help="patient folder names or IDs (default: all)")
+    parser.add_argument("--output", default=None, help="results table (.csv, .parquet or .npz)")
+    parser.add_argument("--segmented", action="store_true",
+                        help="process every segment between removed movements on its own")
+    parser.add_argument("--profile", default=None, help="write the stage profile to this .json or .csv file")
+    parser.add_argument("--profile-patient", default=None, help="run this patient ID under cProfile")
+    args = parser.parse_args()
+
+    summary = run_batch(args.root_dir, workers=args.workers, threads=args.threads, patients=args.patients,
+                        output_path=args.output, pipeline_options={'segmented': args.segmented},
+                        profile_path=args.profile, profile_patient=args.profile_patient)
+    print(summary.table.drop(columns=["File"]).to_string(index=False))
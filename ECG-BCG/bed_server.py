@@ -0,0 +1,250 @@
+"""
+asyncio ingest server for live BCG streams from many beds.
+
+Every bed client connects over TCP (or a UNIX socket), introduces itself
+with a HELLO frame and then sends SAMPLES frames of raw BCG blocks. Each bed
+has its own streaming_pipeline.StreamingBCGPipeline (movement gating,
+band-pass, block wavelet, peaks, windowed rate). The pipelines live in worker
+processes: bed_id is hashed to one of `workers` single-process executors,
+which keeps a bed's state in one process and processes its blocks in order,
+while the event loop only moves bytes. Every SAMPLES frame is answered with a
+RATES frame holding the RATE_DTYPE records of the windows it closed (often
+none); BYE flushes the bed and returns its last records.
+
+Frames: a header of kind (uint8) and payload length (uint32, big-endian),
+then the payload:
+
+- HELLO:   JSON {"bed_id": str, "fs": float}, fs finite and positive
+- SAMPLES: sequence number (uint32), then the samples as little-endian float64
+- RATES:   the sequence number being answered (uint32), then RATE_DTYPE records
+- BYE:     empty; answered by RATES with sequence number 0xFFFFFFFF
+- ERROR:   UTF-8 "<error type>: <message>", then the server closes the connection
+
+A payload longer than MAX_FRAME_SIZE (16 MiB, about 11 hours of samples at
+50 Hz) is refused with ERROR before it is read.
+
+Usage: python bed_server.py [--host 127.0.0.1] [--port 8765] [--unix PATH] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import struct
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from compute_rate import RATE_DTYPE
+
+HELLO, SAMPLES, RATES, BYE, ERROR = 1, 2, 3, 4, 5
+FRAME_HEADER = struct.Struct('!BI')
+SEQUENCE = struct.Struct('!I')
+MAX_FRAME_SIZE = 16 * 1024 * 1024  # bytes of payload
+FINAL_SEQUENCE = 0xFFFFFFFF
+SAMPLE_DTYPE = np.dtype('<f8')
+RECORD_DTYPE = RATE_DTYPE.newbyteorder('<')
+
+_beds = {}  # bed_id -> StreamingBCGPipeline, in each worker process
+
+
+def encode_frame(kind, payload=b''):
+    return FRAME_HEADER.pack(kind, len(payload)) + payload
+
+
+async def read_frame(reader, max_size=MAX_FRAME_SIZE):
+    """
+    (kind, payload) of the next frame; raises asyncio.IncompleteReadError at
+    end of stream, and ValueError (without reading the payload) when it is
+    longer than max_size bytes.
+    """
+    kind, length = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if length > max_size:
+        raise ValueError(f"frame of {length} bytes exceeds the {max_size} byte limit")
+    return kind, await reader.readexactly(length)
+
+
+def decode_rates(payload):
+    """(sequence number, RATE_DTYPE records) of a RATES payload."""
+    return SEQUENCE.unpack_from(payload)[0], np.frombuffer(payload, RECORD_DTYPE, offset=SEQUENCE.size)
+
+
+def _init_worker():
+    import fft_engine
+    fft_engine.configure(threads=1)
+
+
+def _process_block(bed_id, fs, samples):
+    """Worker side: feeds one block to the bed's pipeline and returns the closed windows as bytes."""
+    from streaming_pipeline import StreamingBCGPipeline
+
+    stream = _beds.get(bed_id)
+    if stream is None:
+        stream = _beds[bed_id] = StreamingBCGPipeline(fs)
+    return stream.process(np.frombuffer(samples, SAMPLE_DTYPE)).astype(RECORD_DTYPE).tobytes()
+
+
+def _close_bed(bed_id):
+    stream = _beds.pop(bed_id, None)
+    return b'' if stream is None else stream.flush().astype(RECORD_DTYPE).tobytes()
+
+
+class BedServer:
+    """
+    Accepts bed connections and routes every bed to its worker. `workers`
+    single-process executors (defaults to the number of cores) run the
+    pipelines; call start() inside a running event loop and close() to stop.
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, unix_path=None, workers=None):
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.workers = workers or os.cpu_count() or 1
+        self.executors = []
+        self.server = None
+        self.active_beds = set()
+
+    async def start(self):
+        from job_pool import thread_limits
+
+        context = multiprocessing.get_context('spawn')
+        with thread_limits(1):
+            self.executors = [ProcessPoolExecutor(1, mp_context=context, initializer=_init_worker)
+                              for _ in range(self.workers)]
+            # Start the worker processes now rather than on the first block
+            await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(e, _close_bed, None)
+                                   for e in self.executors))
+        if self.unix_path is not None:
+            self.server = await asyncio.start_unix_server(self._handle, path=self.unix_path)
+        else:
+            self.server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for executor in self.executors:
+            executor.shutdown(wait=True)
+
+    def executor_of(self, bed_id):
+        # crc32 rather than hash(): stable across processes and runs
+        return self.executors[zlib.crc32(bed_id.encode()) % len(self.executors)]
+
+    async def _handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        bed_id = None
+        registered = False
+        try:
+            kind, payload = await read_frame(reader)
+            if kind != HELLO:
+                raise ValueError("the first frame must be HELLO")
+            hello = json.loads(payload)
+            bed_id, fs = str(hello['bed_id']), float(hello['fs'])
+            if not np.isfinite(fs) or fs <= 0:
+                raise ValueError(f"invalid sampling frequency {hello['fs']}")
+            if bed_id in self.active_beds:
+                raise ValueError(f"bed '{bed_id}' is already connected")
+            self.active_beds.add(bed_id)
+            registered = True
+            executor = self.executor_of(bed_id)
+
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind == SAMPLES:
+                    records = await loop.run_in_executor(executor, _process_block, bed_id, fs,
+                                                         payload[SEQUENCE.size:])
+                    writer.write(encode_frame(RATES, payload[:SEQUENCE.size] + records))
+                    await writer.drain()
+                elif kind == BYE:
+                    break
+                else:
+                    raise ValueError(f"unexpected frame kind {kind}")
+
+            records = await loop.run_in_executor(executor, _close_bed, bed_id)
+            self.active_beds.discard(bed_id)
+            registered = False
+            writer.write(encode_frame(RATES, SEQUENCE.pack(FINAL_SEQUENCE) + records))
+            await writer.drain()
+        except asyncio.IncompleteReadError:
+            pass  # client gone: its state is dropped below
+        except Exception as e:
+            # Bad frames, but also pipeline errors and a dead worker (BrokenProcessPool)
+            writer.write(encode_frame(ERROR, f"{type(e).__name__}: {e}".encode()))
+        finally:
+            if registered:
+                self.active_beds.discard(bed_id)
+                try:
+                    await loop.run_in_executor(self.executor_of(bed_id), _close_bed, bed_id)
+                except Exception:
+                    pass  # the worker is broken: the bed's state went with it
+            writer.close()
+
+
+class BedClient:
+    """Minimal client: hello(), send(block) -> sequence number, receive() -> (sequence number, records), bye()."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.sequence = 0
+
+    @classmethod
+    async def connect(cls, bed_id, fs, host='127.0.0.1', port=8765, unix_path=None):
+        if unix_path is not None:
+            reader, writer = await asyncio.open_unix_connection(unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        client = cls(reader, writer)
+        writer.write(encode_frame(HELLO, json.dumps({'bed_id': bed_id, 'fs': fs}).encode()))
+        return client
+
+    async def send(self, block):
+        self.sequence += 1
+        self.writer.write(encode_frame(SAMPLES, SEQUENCE.pack(self.sequence)
+                                       + np.asarray(block, dtype=SAMPLE_DTYPE).tobytes()))
+        await self.writer.drain()
+        return self.sequence
+
+    async def receive(self):
+        kind, payload = await read_frame(self.reader)
+        if kind == ERROR:
+            raise RuntimeError(payload.decode())
+        return decode_rates(payload)
+
+    async def bye(self):
+        """Ends the stream; returns the last records (after the replies still in flight)."""
+        self.writer.write(encode_frame(BYE))
+        await self.writer.drain()
+        while True:
+            sequence, records = await self.receive()
+            if sequence == FINAL_SEQUENCE:
+                self.writer.close()
+                return records
+
+
+async def serve(host, port, unix_path, workers):
+    server = await BedServer(host, port, unix_path, workers).start()
+    where = unix_path or f"{host}:{server.port}"
+    print(f"Bed server listening on {where} with {server.workers} worker(s)")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="UNIX socket path (instead of TCP)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers))
+    except KeyboardInterrupt:
+        pass
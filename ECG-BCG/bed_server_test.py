@@ -0,0 +1,81 @@
+import asyncio
+import json
+import unittest
+
+import numpy as np
+
+from bed_server import ERROR, FRAME_HEADER, HELLO, MAX_FRAME_SIZE, SAMPLES, BedClient, BedServer, encode_frame, read_frame
+
+
+async def exchange(port, *chunks):
+    """Sends the raw chunks to the server and returns the frame it answers before closing the connection."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for chunk in chunks:
+        writer.write(chunk)
+    await writer.drain()
+    frame = await read_frame(reader)
+    await reader.read()  # until the server has closed its side
+    writer.close()
+    return frame
+
+
+def hello(bed_id, fs):
+    return encode_frame(HELLO, json.dumps({'bed_id': bed_id, 'fs': fs}).encode())
+
+
+class BedServerTest(unittest.TestCase):
+
+    def run_with_server(self, test, pass_server=False):
+        async def run():
+            server = await BedServer(port=0, workers=1).start()
+            try:
+                return await test(server if pass_server else server.port)
+            finally:
+                await server.close()
+        return asyncio.run(run())
+
+    def test_invalid_sampling_frequency(self):
+        for fs in (0, -50, 'NaN', 'inf'):
+            with self.subTest(fs=fs):
+                kind, payload = self.run_with_server(lambda port: exchange(port, hello('bed', fs)))
+                self.assertEqual(kind, ERROR)
+                self.assertIn("invalid sampling frequency", payload.decode())
+
+    def test_oversized_frame(self):
+        # Only the header is sent: the server must answer without waiting for the payload
+        header = FRAME_HEADER.pack(SAMPLES, MAX_FRAME_SIZE + 1)
+        kind, payload = self.run_with_server(lambda port: exchange(port, hello('bed', 50.0), header))
+        self.assertEqual(kind, ERROR)
+        self.assertIn("exceeds", payload.decode())
+
+    def test_dead_worker(self):
+        async def stream(server):
+            client = await BedClient.connect('bed', 50.0, port=server.port)
+            await client.send(np.zeros(500))
+            await client.receive()
+            for process in list(server.executors[0]._processes.values()):
+                process.kill()
+                process.join()
+            await client.send(np.zeros(500))
+            with self.assertRaises(RuntimeError) as raised:
+                await client.receive()
+            # The server has closed the connection after its ERROR frame
+            self.assertEqual(await client.reader.read(), b'')
+            client.writer.close()
+            return str(raised.exception)
+        self.assertIn("BrokenProcessPool", self.run_with_server(stream, pass_server=True))
+
+    def test_blocks_are_answered_in_order(self):
+        async def stream(port):
+            client = await BedClient.connect('bed', 50.0, port=port)
+            blocks = np.split(np.random.default_rng(0).normal(size=3000), 6)
+            sequences = [await client.send(block) for block in blocks]
+            replies = [(await client.receive())[0] for _ in sequences]
+            await client.bye()
+            return sequences, replies
+        sequences, replies = self.run_with_server(stream)
+        self.assertEqual(replies, sequences)
+
+
+if __name__ == "__main__":
+    unittest.main()
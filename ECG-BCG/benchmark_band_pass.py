@@ -0,0 +1,83 @@
+"""
+Coefficient design cost, offline speed/accuracy and streaming per-block
+latency of band_pass_filtering.BandPassFilter for the "bcg" and "breath" bands.
+
+- design: two cheby1 designs per call (the former behaviour) vs the cached SOS lookup,
+- offline: the former b/a filtfilt passes vs the SOS sosfiltfilt passes (max relative difference),
+- streaming: mean and 99th percentile time per block of the causal sosfilt mode,
+  and the resulting processing rate in multiples of real time.
+
+Usage: python benchmark_band_pass.py [--fs 50] [--minutes 60] [--blocks 10 50 500]
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy.signal import cheby1, filtfilt
+
+from band_pass_filtering import FILTER_BANDS, BandPassFilter, design_sos
+from benchmark_resample import make_bcg_like
+
+
+def design_ba(fs, filter_type):
+    high, low = FILTER_BANDS[filter_type]
+    return (cheby1(2, 0.5, high / (fs / 2), btype='high', analog=False),
+            cheby1(4, 0.5, low / (fs / 2), btype='low', analog=False))
+
+
+def filtfilt_ba(data, fs, filter_type):
+    (b_high, a_high), (b_low, a_low) = design_ba(fs, filter_type)
+    return filtfilt(b_low, a_low, filtfilt(b_high, a_high, data))
+
+
+def per_call_us(func, repeat=200):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def run(fs, minutes, block_sizes):
+    x = make_bcg_like(int(minutes * 60 * fs), fs)
+    print("\nBand-pass filter benchmark")
+    print("==========================================================================================================")
+    print(f"fs: {fs} Hz, signal: {minutes} min ({x.size} samples)")
+    for filter_type in FILTER_BANDS:
+        design_sos(fs, filter_type)  # warm the cache
+        design_uncached = per_call_us(lambda: design_ba(fs, filter_type))
+        design_cached = per_call_us(lambda: design_sos(fs, filter_type))
+
+        t0 = time.perf_counter()
+        reference = filtfilt_ba(x, fs, filter_type)
+        offline_ba = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        filtered = BandPassFilter(fs, filter_type).filtfilt(x)
+        offline_sos = time.perf_counter() - t0
+        difference = np.max(np.abs(filtered - reference)) / np.max(np.abs(reference))
+
+        print(f"\n[{filter_type}] design: {design_uncached:.0f} us per call uncached, {design_cached:.2f} us cached")
+        print(f"[{filter_type}] offline: filtfilt {offline_ba * 1e3:.1f} ms, sosfiltfilt {offline_sos * 1e3:.1f} ms, "
+              f"max relative difference {difference:.1e}")
+
+        for block_size in block_sizes:
+            band = BandPassFilter(fs, filter_type)
+            latencies = []
+            for start in range(0, x.size - block_size + 1, block_size):
+                t0 = time.perf_counter()
+                band.process(x[start:start + block_size])
+                latencies.append(time.perf_counter() - t0)
+            latencies = np.array(latencies) * 1e6
+            speed = (len(latencies) * block_size / fs) / (latencies.sum() / 1e6)
+            print(f"[{filter_type}] streaming, block {block_size:>5} samples ({block_size / fs * 1e3:.0f} ms): "
+                  f"mean {latencies.mean():.1f} us, p99 {np.percentile(latencies, 99):.1f} us per block, "
+                  f"{speed:.0f}x real time")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fs", type=float, default=50.0)
+    parser.add_argument("--minutes", type=float, default=60.0)
+    parser.add_argument("--blocks", type=int, nargs="+", default=[10, 50, 500])
+    args = parser.parse_args()
+    run(args.fs, args.minutes, args.blocks)
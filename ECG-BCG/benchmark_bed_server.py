@@ -0,0 +1,98 @@
+"""
+Load generator for bed_server: simulated bed clients against a local server.
+
+Starts a BedServer with --workers worker processes and --beds clients in the
+same event loop. Every client streams a synthetic BCG recording (--minutes
+long, at --fs Hz) in --block second blocks, paced at --speed times real time,
+and waits for the reply to each block before sending the next. Reported:
+
+- sustained beds: seconds of signal processed per wall second, i.e. how many
+  real-time beds the server kept up with, and the same per worker core,
+- end-to-end latency of a block (send to reply) percentiles,
+- whether the clients kept their pace (a server that falls behind makes the
+  wall time exceed the paced duration).
+
+Usage: python benchmark_bed_server.py [--beds 8 32] [--workers 2] [--minutes 2] [--speed 20] [--block 1.0]
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from bed_server import BedClient, BedServer
+from benchmark_sampling_rate import make_bcg_with_heart_rate
+from signal_info import window_samples
+
+
+def make_bed_signal(n_samples, fs, seed):
+    """
+    make_bcg_with_heart_rate with body movements (x20 amplitude) in one window
+    out of five: without them the window SDs are all alike and the MAD
+    threshold of the movement detector flags every window as movement.
+    """
+    signal = make_bcg_with_heart_rate(n_samples, fs, seed)[0]
+    window = window_samples(fs)
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_samples, window):
+        if rng.random() < 0.2:
+            signal[start:start + window] *= 20
+    return signal
+
+
+async def bed(bed_id, signal, fs, block_seconds, speed, port, latencies):
+    client = await BedClient.connect(bed_id, fs, port=port)
+    block = int(block_seconds * fs)
+    n_windows = 0
+    t_start = time.perf_counter()
+    for i in range(0, signal.size, block):
+        lag = i / fs / speed - (time.perf_counter() - t_start)
+        if lag > 0:
+            await asyncio.sleep(lag)
+        t0 = time.perf_counter()
+        await client.send(signal[i:i + block])
+        _, records = await client.receive()
+        latencies.append(time.perf_counter() - t0)
+        n_windows += records.size
+    n_windows += (await client.bye()).size
+    return n_windows
+
+
+async def load_test(n_beds, workers, minutes, fs, speed, block_seconds):
+    server = await BedServer(port=0, workers=workers).start()
+    signals = [make_bed_signal(int(minutes * 60 * fs), fs, seed) for seed in range(min(n_beds, 8))]
+    latencies = []
+    t0 = time.perf_counter()
+    windows = await asyncio.gather(*(bed(f"bed-{b:04d}", signals[b % len(signals)], fs, block_seconds, speed,
+                                         server.port, latencies) for b in range(n_beds)))
+    wall = time.perf_counter() - t0
+    await server.close()
+    return wall, np.array(latencies), sum(windows)
+
+
+def run(beds_list, workers, minutes, fs, speed, block_seconds):
+    print("\nBed server load test")
+    print("==========================================================================================================")
+    print(f"{workers} worker(s), {minutes} min per bed at {fs:g} Hz, {block_seconds:g} s blocks at {speed:g}x real time")
+    print(f"{'beds':>6}{'wall [s]':>10}{'paced [s]':>11}{'windows':>9}{'sustained beds':>16}{'beds/core':>11}"
+          f"{'p50 [ms]':>10}{'p95 [ms]':>10}{'p99 [ms]':>10}")
+    for n_beds in beds_list:
+        wall, latencies, n_windows = asyncio.run(load_test(n_beds, workers, minutes, fs, speed, block_seconds))
+        paced = minutes * 60 / speed
+        sustained = n_beds * minutes * 60 / wall
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1e3
+        print(f"{n_beds:>6}{wall:>10.2f}{paced:>11.2f}{n_windows:>9}{sustained:>16.0f}{sustained / workers:>11.0f}"
+              f"{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--beds", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--minutes", type=float, default=2.0)
+    parser.add_argument("--fs", type=float, default=50.0)
+    parser.add_argument("--speed", type=float, default=20.0, help="multiple of real time each bed streams at")
+    parser.add_argument("--block", type=float, default=1.0, help="block length in seconds")
+    args = parser.parse_args()
+    run(args.beds, args.workers, args.minutes, args.fs, args.speed, args.block)
@@ -0,0 +1,116 @@
+"""
+Benchmark of detect_body_movements.detect_patterns against the original
+window-by-window loops.
+
+The original implementation (reproduced in legacy_detect_patterns below)
+computes the window SDs in one Python loop, classifies the windows in a second
+loop and walks the windows a third time for the plot rectangles even when
+plot=0. Its removal mask used window indices instead of sample ranges. The
+benchmark checks that both versions classify every window the same and
+reports how many samples each one removes.
+
+Usage: python benchmark_detect_patterns.py [--hours 1 8] [--fs 50] [--repeat 3]
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from detect_body_movements import classify_windows, detect_patterns, mad_threshold, window_sd
+
+
+def legacy_detect_patterns(pt1, pt2, win_size, data, time):
+    """The original loops (plot=0), returning the window flags and the number of samples kept."""
+    pt1_, pt2_ = pt1, pt2
+    limit = int(math.floor(data.size / win_size))
+    flag = np.zeros([data.size, 1])
+    event_flags = np.zeros([limit, 1])
+
+    segments_sd = []
+    for i in range(0, limit):
+        sub_data = data[pt1:pt2]
+        segments_sd.append(np.std(sub_data, ddof=1))
+        pt1 = pt2
+        pt2 += win_size
+
+    mad = np.sum(np.abs(segments_sd - np.mean(segments_sd, axis=0))) / (1.0 * len(segments_sd))
+    thresh1, thresh2 = 15, 2 * mad
+
+    pt1, pt2 = pt1_, pt2_
+    for j in range(0, limit):
+        std_fos = np.around(segments_sd[j])
+        if std_fos < thresh1:
+            flag[pt1:pt2] = 3
+            event_flags[j] = 3
+        elif std_fos > thresh2:
+            flag[pt1:pt2] = 2
+            event_flags[j] = 2
+        else:
+            flag[pt1:pt2] = 1
+            event_flags[j] = 1
+        pt1 = pt2
+        pt2 += win_size
+
+    pt1, pt2 = pt1_, pt2_
+    for j in range(0, limit):
+        sub_data = data[pt1:pt2]
+        sub_time = np.arange(pt1, pt2) / 50
+        pt1 = pt2
+        pt2 += win_size
+
+    ind2remove = np.sort(np.append(np.where(event_flags == 3), np.where(event_flags == 2)), axis=None)
+    mask = np.ones(data.size, dtype=bool)
+    mask[ind2remove] = False
+    return event_flags.ravel(), data[mask], time[mask]
+
+
+def make_recording(n_samples, win_size, seed=0):
+    """Sleep with a per-window varying amplitude, a few movement bursts and empty-bed periods."""
+    rng = np.random.default_rng(seed)
+    n_windows = n_samples // win_size
+    amplitude = np.repeat(rng.uniform(20, 60, n_windows + 1), win_size)[:n_samples]
+    data = rng.normal(0, 1, n_samples) * amplitude
+    for start in rng.integers(0, n_samples - 3 * win_size, max(n_windows // 40, 1)):
+        data[start:start + 2 * win_size] *= 8  # movement
+    for start in rng.integers(0, n_samples - 10 * win_size, max(n_windows // 100, 1)):
+        data[start:start + 6 * win_size] *= 0.05  # empty bed
+    return data
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - t0)
+    return result, min(times)
+
+
+def run(hours_list, fs, repeat, win_size=500):
+    print("\ndetect_patterns benchmark")
+    print("==========================================================================================================")
+    print(f"{'hours':>6}{'samples':>12}{'loop [ms]':>12}{'vectorized [ms]':>18}{'speed-up':>10}"
+          f"{'same flags':>12}{'kept (loop/new)':>20}")
+    for hours in hours_list:
+        n_samples = int(hours * 3600 * fs)
+        data = make_recording(n_samples, win_size)
+        t = np.arange(n_samples) * 1000.0 / fs
+
+        (old_flags, old_data, _), old_time = best_of(repeat, lambda: legacy_detect_patterns(0, win_size, win_size, data, t))
+        (new_data, _), new_time = best_of(repeat, lambda: detect_patterns(0, win_size, win_size, data, t, plot=0))
+
+        sd = window_sd(data, 0, win_size, win_size)
+        same_flags = np.array_equal(old_flags, classify_windows(sd, mad_threshold(sd)))
+        print(f"{hours:>6}{n_samples:>12}{old_time * 1e3:>12.1f}{new_time * 1e3:>18.1f}{old_time / new_time:>10.1f}"
+              f"{str(same_flags):>12}{f'{old_data.size}/{new_data.size}':>20}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 8])
+    parser.add_argument("--fs", type=float, default=50.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.hours, args.fs, args.repeat)
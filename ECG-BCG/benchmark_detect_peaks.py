@@ -0,0 +1,75 @@
+"""
+Benchmark of the minimum peak distance (mpd) suppression of detect_peaks
+against the original mask loop, which rebuilt a mask over all candidates for
+every kept peak (O(k^2) in the number of candidates k).
+
+White noise with 10^3 to 10^6 candidate peaks and --mpd; the original loop is
+only timed up to --legacy-max candidates. The equivalence of the two on
+random signals and option combinations is tested in detect_peaks_test.py.
+
+Usage: python benchmark_detect_peaks.py [--mpd 10] [--legacy-max 150000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from detect_peaks import detect_peaks
+
+
+def legacy_remove_close_peaks(x, ind, mpd, kpsh):
+    """The original suppression loop of detect_peaks."""
+    ind = ind[np.argsort(x[ind])][::-1]  # sort ind by peak height
+    idel = np.zeros(ind.size, dtype=bool)
+    for i in range(ind.size):
+        if not idel[i]:
+            # keep peaks with the same height if kpsh is True
+            idel = idel | (ind >= ind[i] - mpd) & (ind <= ind[i] + mpd) \
+                          & (x[ind[i]] > x[ind] if kpsh else True)
+            idel[i] = 0  # Keep current peak
+    # remove the small peaks and sort back the indices by their occurrence
+    return np.sort(ind[~idel])
+
+
+def legacy_detect_peaks(x, mpd=1, edge='rising', kpsh=False, valley=False):
+    """detect_peaks with the original suppression: candidates from mpd=1, then the mask loop."""
+    ind = detect_peaks(x, edge=edge, valley=valley)
+    if not ind.size or mpd <= 1:
+        return ind
+    x = np.atleast_1d(x).astype('float64')
+    if valley:
+        x = -x
+    x[np.isnan(x)] = np.inf
+    return legacy_remove_close_peaks(x, ind, mpd, kpsh)
+
+
+def run(mpd, legacy_max, seed=0):
+    rng = np.random.default_rng(seed)
+    print("\ndetect_peaks mpd suppression benchmark")
+    print("==========================================================================================================")
+    print(f"mpd: {mpd}")
+    print(f"{'candidates':>12}{'kept':>10}{'original [s]':>14}{'new [s]':>10}{'speed-up':>10}")
+    for exponent in range(3, 7):
+        # white noise has a candidate peak every third sample on average
+        x = rng.normal(size=3 * 10 ** exponent)
+        candidates = detect_peaks(x)
+        t0 = time.perf_counter()
+        found = detect_peaks(x, mpd=mpd)
+        new_time = time.perf_counter() - t0
+        if candidates.size <= legacy_max:
+            t0 = time.perf_counter()
+            legacy_remove_close_peaks(x, candidates, mpd, False)
+            old_time = time.perf_counter() - t0
+            timing = f"{old_time:>14.3f}{new_time:>10.3f}{old_time / new_time:>10.0f}"
+        else:
+            timing = f"{'-':>14}{new_time:>10.3f}{'-':>10}"
+        print(f"{candidates.size:>12}{found.size:>10}{timing}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mpd", type=int, default=10)
+    parser.add_argument("--legacy-max", type=int, default=150000)
+    args = parser.parse_args()
+    run(args.mpd, args.legacy_max)
@@ -0,0 +1,104 @@
+"""
+Wall time, peak memory and accuracy of the level-4 bior3.9 wavelet cycle
+(the MRA smooth used by main.py) computed by
+- 'two-step': modwt followed by modwtmra(levels=[4]),
+- 'fused':    modwt_fused_fft.modwt_mra(levels=[4]), straight from the input spectrum.
+Each path is run once to build the FFTW plans and filter spectra, then timed.
+Peak memory is measured with tracemalloc (numpy allocations).
+
+The batch section transforms --batch equal-length segments (--segment minutes
+each) in one (batch, N) call and in a Python loop over the rows, with 1 and
+--threads FFTW threads.
+
+The block section runs the streaming BlockMODWT (--block samples per block,
+fed in 1 s pieces) on the longest recording and compares it with the
+full-signal transform away from the first and last margin samples.
+
+Usage: python benchmark_modwt.py [--hours 1 8] [--fs 50] [--batch 16] [--segment 30] [--threads 4] [--block 8192]
+"""
+
+import argparse
+
+import time
+
+import numpy as np
+
+import fft_engine
+from benchmark_resample import make_bcg_like, measure
+from modwt_block import BlockMODWT
+from modwt_fused_fft import modwt_mra
+from modwt_matlab_fft import modwt
+from modwt_mra_matlab_fft import modwtmra
+
+
+def run(hours_list, fs, wname='bior3.9', J=4):
+    print("\nMODWT/MRA benchmark")
+    print("==========================================================================================================")
+    print(f"{'hours':>6}{'samples':>12}{'path':>10}{'wall [s]':>10}{'peak mem [MB]':>16}{'max rel. diff':>16}")
+    for hours in hours_list:
+        x = make_bcg_like(int(hours * 3600 * fs) + 1, fs)
+        paths = {
+            'two-step': lambda: modwtmra(modwt(x, wname, J), wname, levels=[J])[0],
+            'fused': lambda: modwt_mra(x, wname, J, levels=[J])[0],
+        }
+        results = {}
+        for name, func in paths.items():
+            func()
+            results[name] = measure(func)
+        reference = results['two-step'][0]
+        for name, (y, seconds, peak_mb) in results.items():
+            difference = np.max(np.abs(y - reference)) / np.max(np.abs(reference))
+            print(f"{hours:>6}{x.size:>12}{name:>10}{seconds:>10.2f}{peak_mb:>16.1f}{difference:>16.1e}")
+
+
+def run_batch(batch, segment_minutes, fs, threads, wname='bior3.9', J=4):
+    n = int(segment_minutes * 60 * fs)
+    segments = np.stack([make_bcg_like(n, fs, seed) for seed in range(batch)])
+    print(f"\nBatch of {batch} segments of {n} samples")
+    print(f"{'threads':>8}{'loop [s]':>10}{'batched [s]':>13}{'speed-up':>10}{'max abs diff':>14}")
+    for n_threads in sorted({1, threads}):
+        fft_engine.configure(threads=n_threads)
+        timings = {}
+        for name, func in (('loop', lambda: np.stack([modwt_mra(s, wname, J) for s in segments])),
+                           ('batched', lambda: modwt_mra(segments, wname, J))):
+            func()
+            t0 = time.perf_counter()
+            timings[name] = (func(), time.perf_counter() - t0)
+        difference = np.max(np.abs(timings['loop'][0] - timings['batched'][0]))
+        print(f"{n_threads:>8}{timings['loop'][1]:>10.2f}{timings['batched'][1]:>13.2f}"
+              f"{timings['loop'][1] / timings['batched'][1]:>10.1f}{difference:>14.1e}")
+    fft_engine.configure(threads=1)
+
+
+def run_block(hours, fs, block_size, wname='bior3.9', J=4):
+    x = make_bcg_like(int(hours * 3600 * fs) + 1, fs)
+    step = int(fs)
+
+    def stream():
+        transform = BlockMODWT(wname, J, block_size, levels=[J])
+        out = [transform.process(x[i:i + step]) for i in range(0, x.size, step)]
+        return np.concatenate(out + [transform.flush()], axis=-1)[0]
+
+    modwt_mra(x, wname, J, levels=[J])  # build the plans
+    reference, full_seconds, full_peak = measure(lambda: modwt_mra(x, wname, J, levels=[J])[0])
+    y, block_seconds, block_peak = measure(stream)
+    margin = BlockMODWT(wname, J, block_size).margin
+    difference = np.max(np.abs(y - reference)[margin:-margin]) / np.max(np.abs(reference))
+    print(f"\nBlock MODWT, {hours} h, block {block_size} samples, margin {margin} samples")
+    print(f"full signal: {full_seconds:.2f} s, peak {full_peak:.1f} MB; "
+          f"blocks: {block_seconds:.2f} s, peak {block_peak:.1f} MB (including the output); "
+          f"max rel. diff away from the ends {difference:.1e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 8])
+    parser.add_argument("--fs", type=float, default=50.0)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--segment", type=float, default=30.0, help="segment length in minutes")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--block", type=int, default=8192, help="block size of the streaming transform in samples")
+    args = parser.parse_args()
+    run(args.hours, args.fs)
+    run_batch(args.batch, args.segment, args.fs, args.threads)
+    run_block(max(args.hours), args.fs, args.block)
@@ -0,0 +1,69 @@
+"""
+Benchmark of the reference heart-rate alignment (pipeline.window_reference)
+against the original index-based chunking of main.py.
+
+The recording is synthetic: make_bcg_with_heart_rate, whose heart rate
+(70 +- 10 bpm, 10 min period) serves as the reference, with body movements
+in one window out of five (see benchmark_bed_server.make_bed_signal) so that
+detect_patterns removes part of the signal. The original code averaged
+len(ref) // n_windows consecutive reference samples per BCG window, ignoring
+the removed samples; window_reference matches the windows by timestamp.
+
+Reported per recording length: both timings, the largest difference between
+the two when nothing is removed (they should agree), and the mean and largest
+error of the index-based alignment after the movements are removed.
+
+Usage: python benchmark_reference_alignment.py [--hours 1 8] [--fs 50]
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmark_bed_server import make_bed_signal
+from benchmark_detect_patterns import best_of
+from benchmark_sampling_rate import make_bcg_with_heart_rate
+from detect_body_movements import detect_patterns
+from pipeline import window_reference
+from signal_info import window_samples
+
+
+def legacy_reference(rr_heart_rates, n_windows):
+    """The list comprehension of main.py."""
+    window_size = len(rr_heart_rates) // n_windows
+    return np.array([
+        np.mean(rr_heart_rates[i:i + window_size])
+        for i in range(0, len(rr_heart_rates) - window_size + 1, window_size)
+    ])
+
+
+def run(hours_list, fs, repeat=3):
+    window = window_samples(fs)
+    print("\nReference heart-rate alignment benchmark")
+    print("==========================================================================================================")
+    print(f"{'hours':>6}{'windows':>9}{'loop [ms]':>11}{'aligned [ms]':>14}{'speed-up':>10}"
+          f"{'no removal diff':>17}{'kept':>7}{'mean err [bpm]':>16}{'max err [bpm]':>15}")
+    for hours in hours_list:
+        n = int(hours * 3600 * fs)
+        time_ms = 1.7e12 + np.arange(n) * 1000 / fs
+        ref_hr = make_bcg_with_heart_rate(n, fs)[1]
+        n_windows = n // window
+
+        old, old_time = best_of(repeat, lambda: legacy_reference(ref_hr, n_windows))
+        new, new_time = best_of(repeat, lambda: window_reference(time_ms, ref_hr, time_ms, window, n_windows))
+        same = np.max(np.abs(old[:n_windows] - new))
+
+        bcg, bcg_time = detect_patterns(0, window, window, make_bed_signal(n, fs, 0), time_ms, plot=0, fs=fs)
+        n_kept = bcg.size // window
+        old = legacy_reference(ref_hr, n_kept)[:n_kept]
+        new = window_reference(time_ms, ref_hr, bcg_time, window, n_kept)
+        print(f"{hours:>6}{n_windows:>9}{old_time * 1e3:>11.1f}{new_time * 1e3:>14.1f}{old_time / new_time:>10.1f}"
+              f"{same:>17.1e}{n_kept / n_windows:>7.0%}{np.mean(np.abs(old - new)):>16.2f}{np.max(np.abs(old - new)):>15.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 8])
+    parser.add_argument("--fs", type=float, default=50.0)
+    args = parser.parse_args()
+    run(args.hours, args.fs)
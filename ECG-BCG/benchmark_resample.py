@@ -0,0 +1,78 @@
+"""
+Accuracy, wall time and peak memory of the resampling engines in resample_BCG.
+
+Resamples a synthetic overnight-length 140 Hz BCG-like signal to 50 Hz with
+- 'fft':          scipy.signal.resample (the original downsample_general method),
+- 'poly':         scipy.signal.resample_poly with the 5/14 ratio,
+- 'poly chunked': the streaming PolyphaseResampler, fed in chunks.
+Accuracy is reported as the RMS difference to the FFT result (relative to the
+signal RMS, edges excluded) and as the max deviation of the chunked engine from
+resample_poly. Peak memory is measured with tracemalloc (numpy allocations).
+
+Usage: python benchmark_resample.py [--hours 8] [--chunk 140000]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from scipy.signal import resample
+
+from resample_BCG import resample_polyphase
+
+
+def make_bcg_like(n_samples, fs, seed=0):
+    """Heartbeat-like 1.1 Hz pulses on a 0.25 Hz breathing baseline plus noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / fs
+    beats = np.sin(2 * np.pi * 1.1 * t) ** 15 * 300
+    breathing = 800 * np.sin(2 * np.pi * 0.25 * t)
+    return breathing + beats + rng.normal(0, 30, n_samples)
+
+
+def measure(func):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak / 1e6
+
+
+def run(hours, chunk, original_fs=140, new_fs=50):
+    # Odd, non-power-of-two length, as real recordings have
+    n_samples = int(hours * 3600 * original_fs) + 1
+    x = make_bcg_like(n_samples, original_fs)
+    num_new_samples = int(n_samples / original_fs * new_fs)
+
+    engines = {
+        'fft': lambda: resample(x, num_new_samples),
+        'poly': lambda: resample_polyphase(x, original_fs, new_fs)[:num_new_samples],
+        'poly chunked': lambda: resample_polyphase(x, original_fs, new_fs, chunk_size=chunk)[:num_new_samples],
+    }
+    results = {name: measure(func) for name, func in engines.items()}
+
+    edge = 10 * new_fs  # ignore 10 s at both ends, where the FFT method wraps around
+    reference = results['fft'][0][edge:-edge]
+    signal_rms = np.sqrt(np.mean(reference ** 2))
+
+    print("\nResampling benchmark")
+    print("==========================================================================================================")
+    print(f"Input: {n_samples} samples ({hours} h at {original_fs} Hz) -> {num_new_samples} samples at {new_fs} Hz")
+    print(f"{'engine':<14}{'wall [s]':>10}{'peak mem [MB]':>16}{'rel. RMS diff vs fft':>24}")
+    for name, (y, seconds, peak_mb) in results.items():
+        rel_rms = np.sqrt(np.mean((y[edge:-edge] - reference) ** 2)) / signal_rms
+        print(f"{name:<14}{seconds:>10.2f}{peak_mb:>16.1f}{rel_rms:>24.2e}")
+    chunk_error = np.max(np.abs(results['poly chunked'][0] - results['poly'][0]))
+    print(f"Max |chunked - resample_poly|: {chunk_error:.2e} (chunk size {chunk} samples)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=8.0)
+    parser.add_argument("--chunk", type=int, default=140000, help="chunk size of the streaming engine in samples")
+    args = parser.parse_args()
+    run(args.hours, args.chunk)
@@ -0,0 +1,88 @@
+"""
+Throughput and accuracy of the heart-rate chain of main.py at 25, 50 and 140 Hz.
+
+A synthetic 140 Hz BCG-like recording with a slowly varying heart rate
+(60-80 bpm) is resampled to each rate with resample_polyphase (140 Hz is used
+as recorded), then run through the chain with the parameters derived from
+signal_info: band_pass_filtering, the wavelet cycle (modwt_mra smooth of
+wavelet_level(fs)) and window_heart_rates over 10 s windows. detect_patterns
+is left out: the synthetic signal has no movement or empty-bed periods.
+
+Throughput is the recording duration divided by the processing time (x real
+time); accuracy is the mean absolute error of the valid windows against the
+true mean heart rate of each window, and the agreement with the 50 Hz rates.
+
+Usage: python benchmark_sampling_rate.py [--hours 2] [--rates 25 50 140] [--repeat 3]
+"""
+
+import argparse
+
+import numpy as np
+
+from band_pass_filtering import band_pass_filtering
+from benchmark_detect_patterns import best_of
+from heart_rate import window_heart_rates
+from modwt_fused_fft import modwt_mra
+from resample_BCG import resample_polyphase
+from signal_info import SignalInfo, wavelet_level, window_samples
+
+
+def make_bcg_with_heart_rate(n_samples, fs, seed=0):
+    """make_bcg_like with a heart rate of 70 +- 10 bpm (10 min period); returns (signal, bpm per sample)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / fs
+    bpm = 70 + 10 * np.sin(2 * np.pi * t / 600)
+    phase = 2 * np.pi * np.cumsum(bpm / 60) / fs
+    beats = np.sin(phase) ** 15 * 300
+    breathing = 800 * np.sin(2 * np.pi * 0.25 * t)
+    return breathing + beats + rng.normal(0, 30, n_samples), bpm
+
+
+def process(bcg, info):
+    window = window_samples(info.fs)
+    level = wavelet_level(info.fs)
+    movement = band_pass_filtering(bcg, info.fs, "bcg")
+    wavelet_cycle = modwt_mra(movement, 'bior3.9', level, levels=[level])[0]
+    return window_heart_rates(wavelet_cycle, 0, window, window, bcg.size // window, mpd=1, fs=info.fs)
+
+
+def run(hours, rates, repeat, original_fs=140):
+    x, bpm = make_bcg_with_heart_rate(int(hours * 3600 * original_fs), original_fs)
+    window_true = window_samples(original_fs)
+    true_bpm = bpm[:bpm.size // window_true * window_true].reshape(-1, window_true).mean(axis=1)
+
+    print("\nSampling rate benchmark")
+    print("==========================================================================================================")
+    print(f"{hours} h synthetic recording, true heart rate 60-80 bpm")
+    print(f"{'fs [Hz]':>8}{'level':>7}{'samples':>11}{'wall [s]':>10}{'x real time':>13}{'valid':>8}"
+          f"{'MAE [bpm]':>11}{'MAE vs 50 Hz':>14}")
+    results, timings = {}, {}
+    for fs in rates:
+        bcg = x if fs == original_fs else resample_polyphase(x, original_fs, fs)
+        info = SignalInfo(fs)
+        process(bcg, info)  # build the FFT plans and filter designs
+        results[fs], timings[fs] = best_of(repeat, lambda: process(bcg, info))
+
+    for fs in rates:
+        r = results[fs]
+        n = min(r.size, true_bpm.size)
+        valid = r['valid'][:n]
+        mae = np.mean(np.abs(r['bpm'][:n][valid] - true_bpm[:n][valid]))
+        if 50 in results:
+            reference = results[50]
+            m = min(n, reference.size)
+            both = r['valid'][:m] & reference['valid'][:m]
+            versus_50 = f"{np.mean(np.abs(r['bpm'][:m][both] - reference['bpm'][:m][both])):>14.2f}"
+        else:
+            versus_50 = f"{'-':>14}"
+        print(f"{fs:>8}{wavelet_level(fs):>7}{r.size * window_samples(fs):>11}{timings[fs]:>10.3f}"
+              f"{hours * 3600 / timings[fs]:>13.0f}{valid.mean():>8.0%}{mae:>11.2f}{versus_50}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--rates", type=float, nargs="+", default=[25, 50, 140])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.hours, [int(r) if float(r).is_integer() else r for r in args.rates], args.repeat)
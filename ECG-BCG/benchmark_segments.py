@@ -0,0 +1,52 @@
+"""
+Benchmark of the segmented pipeline (BCGPipeline(segmented=True)) against the
+contiguous chain, which filters and windows the signal left after
+detect_patterns as if the removed movements were never there.
+
+The recording is synthetic (benchmark_bed_server.make_bed_signal: a
+70 +- 10 bpm heart rate, body movements in one window out of five) with its
+heart rate as the reference. Reported per mode: run time, number of clean
+segments (the contiguous chain filters across the gaps between them),
+number of windows, and the MAE against the reference. detect_patterns
+removes whole 10 s windows, so with 10 s rate windows no rate window of the
+contiguous chain spans a gap: the difference between the modes is the
+filter and wavelet context at the segment edges.
+
+Usage: python benchmark_segments.py [--hours 1 8] [--fs 50] [--threads 4]
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmark_bed_server import make_bed_signal
+from benchmark_detect_patterns import best_of
+from benchmark_sampling_rate import make_bcg_with_heart_rate
+from pipeline import BCGPipeline
+
+
+def run(hours_list, fs, threads, repeat=3):
+    modes = [("contiguous", BCGPipeline()), ("segmented", BCGPipeline(segmented=True)),
+             (f"segmented x{threads}", BCGPipeline(segmented=True, segment_workers=threads))]
+    print("\nSegmented pipeline benchmark")
+    print("==========================================================================================================")
+    print(f"{'hours':>6}{'mode':>16}{'time [ms]':>11}{'segments':>10}{'windows':>9}{'MAE [bpm]':>11}")
+    for hours in hours_list:
+        n = int(hours * 3600 * fs)
+        bcg = make_bed_signal(n, fs, 0)
+        ref_hr = make_bcg_with_heart_rate(n, fs)[1]
+        time_ms = 1.7e12 + np.arange(n) * 1000 / fs
+        for name, pipeline in modes:
+            result, seconds = best_of(repeat, lambda: pipeline.process_signal(bcg, time_ms, ref_hr, fs))
+            n_segments = '-' if result.segments is None else result.segments.size
+            print(f"{hours:>6}{name:>16}{seconds * 1e3:>11.1f}{n_segments:>10}{result.rates.size:>9}"
+                  f"{result.metrics.mae:>11.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, nargs="+", default=[1, 8])
+    parser.add_argument("--fs", type=float, default=50.0)
+    parser.add_argument("--threads", type=int, default=4, help="segment_workers of the threaded mode")
+    args = parser.parse_args()
+    run(args.hours, args.fs, args.threads)
@@ -0,0 +1,112 @@
+"""
+Load time and on-disk size of the columnar cache (columnar_cache) against CSV.
+
+Builds a synthetic synchronized BCG/RR table (140 Hz BCG samples with float ms
+and UTC string timestamps plus the matched RR columns), writes it as CSV,
+Parquet and NPZ and reports write time, load time and file size of each.
+The resampled-recording input of main.py is also compared against the
+memory-mapped signal store (signal_store).
+
+Usage: python benchmark_storage.py [--rows 2000000] [--repeat 3]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from columnar_cache import read_table, write_table
+from signal_store import open_signal_store, write_signal_store
+from convert_timestamp_format_BCG import format_utc_ms, generate_timestamps_ms
+
+
+def make_synced_table(rows, fs=140.0, start_ms=1699451083498.0):
+    rng = np.random.default_rng(0)
+    timestamps = generate_timestamps_ms(start_ms, rows, fs)
+    heart_rate = np.repeat(rng.integers(50, 90, size=rows // int(fs) + 1), int(fs))[:rows]
+    return pd.DataFrame({
+        'BCG': rng.integers(-2000, 2000, size=rows),
+        'Timestamp_x': timestamps,
+        'fs': int(fs),
+        'Timestamp_UTC': format_utc_ms(timestamps),
+        'Heart Rate': heart_rate.astype(float),
+        'RR Interval in seconds': 60.0 / heart_rate,
+    })
+
+
+def run(rows, repeat, formats=('csv', 'parquet', 'npz')):
+    df = make_synced_table(rows)
+    print("\nStorage benchmark")
+    print("==========================================================================================================")
+    print(f"Rows: {rows}")
+    print(f"{'format':<10}{'size [MB]':>12}{'write [s]':>12}{'load [s]':>12}{'load vs csv':>14}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for file_format in formats:
+            path = os.path.join(tmp, f"synchronized_bcg_rr_data.{file_format}")
+            try:
+                t0 = time.perf_counter()
+                write_table(df, path)
+                write_time = time.perf_counter() - t0
+            except ImportError as e:
+                print(f"{file_format:<10}skipped ({e})")
+                continue
+
+            load_times = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                read_table(path)
+                load_times.append(time.perf_counter() - t0)
+
+            results[file_format] = (os.path.getsize(path) / 1e6, write_time, min(load_times))
+
+    csv_load = results['csv'][2] if 'csv' in results else None
+    for file_format, (size_mb, write_time, load_time) in results.items():
+        relative = f"{csv_load / load_time:.1f}x" if csv_load else "-"
+        print(f"{file_format:<10}{size_mb:>12.1f}{write_time:>12.2f}{load_time:>12.3f}{relative:>14}")
+    return results
+
+
+def run_main_input(rows, repeat, fs=50.0):
+    """main.py's per-patient load: CSV with the sniffing Python parser vs the memory-mapped store."""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'BCG_downsampled': rng.normal(0, 200, size=rows),
+        'Timestamp_x_downsampled': 1699451083498.0 + np.arange(rows) * 1000.0 / fs,
+        'Heart Rate_downsampled': rng.integers(50, 90, size=rows).astype(float),
+    })
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "resampled_sync_bcg_rr_data.csv")
+        store_path = os.path.join(tmp, "resampled_sync_bcg_rr_data.bcgsig")
+        df.to_csv(csv_path, index=False)
+        write_signal_store(store_path, [df[c].values for c in df.columns], fs, df.iloc[0, 1], ['bcg', 'time', 'heart_rate'])
+
+        csv_times, store_times = [], []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            pd.read_csv(csv_path, sep=None, header=None, skiprows=1, engine="python").values
+            csv_times.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            raw = open_signal_store(store_path).data.T
+            float(raw[:, 0].sum())  # touch the BCG channel
+            store_times.append(time.perf_counter() - t0)
+            del raw  # release the mapping before the temporary folder is removed
+        sizes = os.path.getsize(csv_path) / 1e6, os.path.getsize(store_path) / 1e6
+
+    print(f"\nmain.py input ({rows} rows): CSV (python parser) {min(csv_times):.3f} s, {sizes[0]:.1f} MB | "
+          f"signal store {min(store_times):.4f} s, {sizes[1]:.1f} MB")
+    return min(csv_times), min(store_times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
+    run_main_input(args.rows, args.repeat)
@@ -0,0 +1,63 @@
+"""
+Agreement and throughput of detect_body_movements.StreamingMovementDetector
+against the batch window classification of detect_patterns.
+
+The synthetic recording is fed in random block sizes; for each configuration
+the fraction of windows whose streaming flag equals the batch flag, the
+latency and the processing rate (in multiples of real time) are reported.
+
+Usage: python benchmark_streaming_movement.py [--hours 8] [--fs 50] [--seeds 0 1 2]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmark_detect_patterns import make_recording
+from detect_body_movements import StreamingMovementDetector, classify_windows, mad_threshold, window_sd
+
+
+def stream_flags(data, detector, rng, max_block=3000):
+    flags = []
+    i = 0
+    while i < data.size:
+        block = int(rng.integers(1, max_block))
+        flags.append(detector.process(data[i:i + block])[1])
+        i += block
+    flags.append(detector.flush()[1])
+    return np.concatenate(flags)
+
+
+def run(hours, fs, seeds, win_size=500, configs=((None, 0), (None, 6), (None, 30), (360, 0), (360, 30))):
+    print("\nStreaming movement detector vs batch detect_patterns")
+    print("==========================================================================================================")
+    print(f"{'horizon':>10}{'delay':>8}{'latency [s]':>14}{'min agreement':>16}{'mean agreement':>16}{'x real time':>14}")
+    n_samples = int(hours * 3600 * fs)
+    recordings = [make_recording(n_samples, win_size, seed) for seed in seeds]
+    batch = []
+    for data in recordings:
+        sd = window_sd(data, 0, win_size, win_size)
+        batch.append(classify_windows(sd, mad_threshold(sd)))
+
+    for horizon, delay in configs:
+        agreements, seconds = [], 0.0
+        for data, batch_flags in zip(recordings, batch):
+            detector = StreamingMovementDetector(win_size, horizon_windows=horizon, delay_windows=delay)
+            t0 = time.perf_counter()
+            flags = stream_flags(data, detector, np.random.default_rng(0))
+            seconds += time.perf_counter() - t0
+            agreements.append(np.mean(flags == batch_flags))
+        latency = (1 + delay) * win_size / fs
+        speed = len(recordings) * hours * 3600 / seconds
+        print(f"{str(horizon):>10}{delay:>8}{latency:>14.0f}{min(agreements):>16.4f}{np.mean(agreements):>16.4f}"
+              f"{speed:>14.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=8.0)
+    parser.add_argument("--fs", type=float, default=50.0)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    args = parser.parse_args()
+    run(args.hours, args.fs, args.seeds)
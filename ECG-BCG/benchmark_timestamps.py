@@ -0,0 +1,90 @@
+"""
+Benchmark of the timestamp conversion in convert_timestamp_format_BCG.process_csv_folder.
+
+Writes a synthetic 140 Hz BCG file, converts it with the per-row path
+(vectorized=False) and with the vectorized path, reports the wall time of
+both and checks that the two output CSVs are byte-identical.
+
+Usage: python benchmark_timestamps.py [--rows 1000000] [--fs 140]
+"""
+
+import argparse
+import filecmp
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from convert_timestamp_format_BCG import (convert_to_utc_format, format_utc_ms, generate_timestamps_ms,
+                                          process_csv_folder)
+
+
+def make_bcg_csv(path, rows, start_ms=1699451083498):
+    rng = np.random.default_rng(0)
+    timestamps = np.full(rows, np.nan)
+    timestamps[0] = start_ms
+    df = pd.DataFrame({
+        'BCG': rng.integers(-2000, 2000, size=rows),
+        'Timestamp': timestamps,
+        'fs': 140,
+    })
+    df.to_csv(path, index=False)
+
+
+def time_conversion_step(rows, fs, start_ms=1699451083498.0):
+    """Times only the timestamp generation + UTC formatting, without CSV I/O."""
+    time_increment_ms = (1.0 / fs) * 1000.0
+
+    t0 = time.perf_counter()
+    per_row = pd.Series([start_ms + (i * time_increment_ms) for i in range(rows)])
+    per_row_utc = per_row.apply(convert_to_utc_format)
+    per_row_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vectorized = generate_timestamps_ms(start_ms, rows, fs)
+    vectorized_utc = format_utc_ms(vectorized)
+    vectorized_time = time.perf_counter() - t0
+
+    identical = np.array_equal(per_row.values, vectorized) and list(per_row_utc) == list(vectorized_utc)
+    return per_row_time, vectorized_time, identical
+
+
+def run(rows, fs):
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = os.path.join(tmp, "BCG")
+        os.makedirs(input_dir)
+        make_bcg_csv(os.path.join(input_dir, "bench_BCG.csv"), rows)
+
+        timings = {}
+        for name, vectorized in (("per-row", False), ("vectorized", True)):
+            output_dir = os.path.join(tmp, name)
+            t0 = time.perf_counter()
+            process_csv_folder(input_dir, output_dir, sampling_frequency=fs, vectorized=vectorized)
+            timings[name] = time.perf_counter() - t0
+
+        identical = filecmp.cmp(os.path.join(tmp, "per-row", "bench_BCG.csv"),
+                                os.path.join(tmp, "vectorized", "bench_BCG.csv"), shallow=False)
+
+    step_per_row, step_vectorized, step_identical = time_conversion_step(rows, fs)
+
+    print("\nTimestamp conversion benchmark")
+    print("==========================================================================================================")
+    print(f"Rows: {rows}, fs: {fs} Hz")
+    print(f"Conversion step only (no CSV I/O): per-row {step_per_row:.2f} s, vectorized {step_vectorized:.3f} s "
+          f"({step_per_row / step_vectorized:.0f}x), identical values: {step_identical}")
+    print("Full process_csv_folder run:")
+    print(f"Per-row path:    {timings['per-row']:.2f} s")
+    print(f"Vectorized path: {timings['vectorized']:.2f} s")
+    print(f"Speed-up:        {timings['per-row'] / timings['vectorized']:.1f}x")
+    print(f"Byte-identical output: {identical}")
+    return timings, identical
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--fs", type=float, default=140.0)
+    args = parser.parse_args()
+    run(args.rows, args.fs)
@@ -0,0 +1,211 @@
+"""
+Optional columnar storage (Parquet or NPZ) for the converted, synchronized and
+resampled recordings, as an alternative to re-parsing CSV text on every run.
+
+Columns are stored typed:
+- datetime columns and UTC timestamp strings (e.g. 'Timestamp_UTC') as int64 epoch ms,
+- numeric columns whose name contains 'Timestamp' as float64 (epoch ms needs the precision),
+- other float columns as float32 and integer/bool columns as int64.
+
+read_table turns the epoch-ms columns back into datetimes (UTC if they were
+tz-aware) unless parse_dates=False. The format is chosen from the file
+extension: .csv, .parquet (needs pyarrow) or .npz (numpy only).
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CACHE_FORMATS = ('csv', 'parquet', 'npz')
+
+_META_KEY = '__bcg_cache_meta__'
+
+
+def file_format_of(path):
+    """Returns 'csv', 'parquet' or 'npz' from the file extension of path."""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension not in CACHE_FORMATS:
+        raise ValueError(f"Unsupported table format '{extension}' for '{path}', expected one of {CACHE_FORMATS}")
+    return extension
+
+
+def with_format(path, file_format):
+    """Returns path with its extension replaced by the one of file_format."""
+    if file_format not in CACHE_FORMATS:
+        raise ValueError(f"Unsupported table format '{file_format}', expected one of {CACHE_FORMATS}")
+    return os.path.splitext(path)[0] + '.' + file_format
+
+
+def _is_time_column(name):
+    return 'Timestamp' in str(name)
+
+
+def to_typed_columns(df):
+    """
+    Converts df to a dict of typed numpy arrays following the rules in the
+    module docstring. Returns (columns, meta) where meta records the
+    timestamp columns and the original column order.
+    """
+    columns = {}
+    timestamp_columns = {}
+
+    for name in df.columns:
+        series = df[name]
+        if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+            if _is_time_column(name):
+                series = pd.to_datetime(series, utc=True, format='mixed')
+            else:
+                columns[name] = series.astype(str).values.astype(str)
+                continue
+
+        if isinstance(series.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(series.dtype):
+            is_utc = isinstance(series.dtype, pd.DatetimeTZDtype)
+            if is_utc:
+                series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+            epoch_ms = series.values.astype('datetime64[ms]').astype(np.int64)
+            columns[name] = epoch_ms
+            timestamp_columns[name] = 'UTC' if is_utc else None
+        elif pd.api.types.is_float_dtype(series.dtype):
+            dtype = np.float64 if _is_time_column(name) else np.float32
+            columns[name] = series.values.astype(dtype)
+        elif pd.api.types.is_bool_dtype(series.dtype) or pd.api.types.is_integer_dtype(series.dtype):
+            columns[name] = series.values.astype(np.int64)
+        else:
+            columns[name] = series.astype(str).values.astype(str)
+
+    meta = {'columns': [str(name) for name in df.columns], 'timestamp_columns': timestamp_columns}
+    return columns, meta
+
+
+def _from_typed_columns(columns, meta, parse_dates):
+    df = pd.DataFrame({name: columns[name] for name in meta['columns']})
+    if parse_dates:
+        for name, tz in meta['timestamp_columns'].items():
+            # nanosecond resolution, like timestamps parsed from CSV text
+            df[name] = pd.to_datetime(df[name], unit='ms', utc=tz is not None).astype(
+                'datetime64[ns, UTC]' if tz is not None else 'datetime64[ns]')
+    return df
+
+
+def write_table(df, path):
+    """Writes df to path in the format given by its extension and returns path."""
+    file_format = file_format_of(path)
+    if file_format == 'csv':
+        df.to_csv(path, index=False)
+        return path
+
+    columns, meta = to_typed_columns(df)
+    if file_format == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.table(columns)
+        table = table.replace_schema_metadata({_META_KEY: json.dumps(meta)})
+        pq.write_table(table, path)
+    else:
+        # np.savez appends '.npz' when missing; write through a file handle to keep the exact path
+        with open(path, 'wb') as f:
+            np.savez(f, **{_META_KEY: np.array(json.dumps(meta))},
+                     **{f'col{i}': columns[name] for i, name in enumerate(meta['columns'])})
+    return path
+
+
+def read_table(path, parse_dates=True, columns=None):
+    """
+    Reads a table written by write_table (or any CSV) into a DataFrame.
+    `columns` optionally restricts the columns loaded (Parquet/NPZ only load those).
+    """
+    file_format = file_format_of(path)
+    if file_format == 'csv':
+        return pd.read_csv(path, usecols=columns)
+
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path, columns=columns)
+        meta = json.loads(pq.read_schema(path).metadata[_META_KEY.encode()])
+        data = {name: table.column(name).to_numpy() for name in table.column_names}
+    else:
+        with np.load(path, allow_pickle=False) as npz:
+            meta = json.loads(str(npz[_META_KEY]))
+            wanted = meta['columns'] if columns is None else columns
+            data = {name: npz[f'col{meta["columns"].index(name)}'] for name in wanted}
+
+    if columns is not None:
+        meta['columns'] = [name for name in meta['columns'] if name in columns]
+        meta['timestamp_columns'] = {k: v for k, v in meta['timestamp_columns'].items() if k in columns}
+    return _from_typed_columns(data, meta, parse_dates)
+
+
+def iter_table(path, chunksize, parse_dates=True):
+    """
+    Yields the table at path as DataFrames of at most `chunksize` rows.
+    CSV and Parquet are read incrementally; NPZ archives are loaded once and sliced.
+    """
+    file_format = file_format_of(path)
+    if file_format == 'csv':
+        yield from pd.read_csv(path, chunksize=chunksize)
+        return
+
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        meta = json.loads(parquet_file.schema_arrow.metadata[_META_KEY.encode()])
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            data = {name: batch.column(name).to_numpy(zero_copy_only=False) for name in batch.schema.names}
+            yield _from_typed_columns(data, meta, parse_dates)
+    else:
+        df = read_table(path, parse_dates=parse_dates)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+class TableWriter:
+    """
+    Incremental writer: appends DataFrames with the same columns to a CSV or
+    Parquet file. The Parquet schema is the one of the first DataFrame; later
+    ones are cast to it (a lossy cast raises pyarrow.ArrowInvalid). NPZ
+    archives cannot be appended to.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file_format = file_format_of(path)
+        if self.file_format == 'npz':
+            raise ValueError("NPZ tables cannot be written incrementally, use 'csv' or 'parquet'")
+        self.rows = 0
+        self._parquet_writer = None
+
+    def write(self, df):
+        if self.file_format == 'csv':
+            df.to_csv(self.path, index=False, mode='w' if self.rows == 0 else 'a', header=self.rows == 0)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            columns, meta = to_typed_columns(df)
+            table = pa.table(columns).replace_schema_metadata({_META_KEY: json.dumps(meta)})
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            elif not table.schema.equals(self._parquet_writer.schema):
+                # The file schema comes from the first chunk: e.g. an integer column of a later chunk
+                # that came back as float (NaN-padded, then stored as float32) must be cast back
+                table = table.cast(self._parquet_writer.schema)
+            self._parquet_writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+        elif self.rows == 0 and self.file_format == 'csv':
+            open(self.path, 'w').close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -2,16 +2,46 @@ import numpy as np
 
 from detect_peaks import detect_peaks
 
+# One record per heart-rate window: samples [window_start, window_end), the
+# rate in beats per minute (NaN when the window has fewer than two peaks)
+RATE_DTYPE = np.dtype([
+    ('window_start', np.int64),
+    ('window_end', np.int64),
+    ('bpm', np.float64),
+    ('n_peaks', np.int32),
+    ('valid', np.bool_),
+])
 
-def compute_rate(beats, mpd):
+# RATE_DTYPE with the timestamps of the first and last sample of the window
+TIMED_RATE_DTYPE = np.dtype(RATE_DTYPE.descr + [
+    ('start_epoch_ms', np.float64),
+    ('end_epoch_ms', np.float64),
+])
+
+
+def rates_from_peaks(starts, ends, n_peaks, first, last, fs=50):
+    """
+    RATE_DTYPE records of windows [starts, ends) from their peak count and
+    first/last peak sample: (n_peaks - 1) beats over the first-to-last peak
+    span, in beats per minute; NaN and not valid below two peaks.
+    """
+    n_peaks = np.asarray(n_peaks)
+    rates = np.empty(n_peaks.size, dtype=RATE_DTYPE)
+    rates['window_start'] = starts
+    rates['window_end'] = ends
+    rates['n_peaks'] = n_peaks
+    rates['valid'] = valid = n_peaks > 1
+    rates['bpm'] = np.nan
+    t_N = (np.asarray(last)[valid] - np.asarray(first)[valid] + 1) / fs
+    rates['bpm'][valid] = (n_peaks[valid] - 1) / t_N * 60
+    return rates
+
+
+def compute_rate(beats, mpd, fs=50):
 
     peaks = detect_peaks(beats, mpd=mpd)
 
     if len(peaks) > 1:
-        fs = 50
-        diff_sample = peaks[-1] - peaks[0] + 1
-        t_N = diff_sample / fs
-        heartRate = (len(peaks) - 1) / t_N * 60
-        return heartRate
+        return rates_from_peaks(0, len(beats), [len(peaks)], peaks[:1], peaks[-1:], fs)['bpm'][0]
     else:
-        return 0.0, 0.0
+        return np.nan
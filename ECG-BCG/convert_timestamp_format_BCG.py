@@ -1,9 +1,12 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timezone, timedelta
 import math
 import os
 import glob
 
+from columnar_cache import with_format, write_table
+
 def convert_to_utc_format(timestamp_val):
     """
     Converts a Unix epoch timestamp in milliseconds
@@ -36,7 +39,142 @@ def convert_to_utc_format(timestamp_val):
     except Exception as e:
         return f"Error converting timestamp {timestamp_val}: {e}"
 
-def process_csv_folder(input_folder_path, output_folder_path, timestamp_column_name='Timestamp', sampling_frequency=140.0):
+def generate_timestamps_ms(initial_timestamp_ms, n_samples, sampling_frequency):
+    """
+    Returns n_samples Unix ms timestamps starting at initial_timestamp_ms and
+    incrementing by 1/sampling_frequency seconds.
+
+    Computes exactly the same float values as the per-row
+    initial + (i * increment) loop, in one arange expression.
+    """
+    time_increment_ms = (1.0 / sampling_frequency) * 1000.0
+    return initial_timestamp_ms + np.arange(n_samples) * time_increment_ms
+
+def format_utc_ms(timestamps_ms):
+    """
+    Vectorized equivalent of convert_to_utc_format for an array of Unix ms
+    timestamps. Returns strings in the format 'YYYY-MM-DD HH:MM:SS.ssssss+00:00'
+    (None for NaN entries).
+
+    Microseconds are rounded half-to-even from the fractional seconds, the same
+    way datetime.fromtimestamp does, so the output is byte-identical to the
+    per-row version.
+    """
+    seconds = np.asarray(timestamps_ms, dtype=np.float64) / 1000.0
+    is_nan = np.isnan(seconds)
+    if is_nan.any():
+        seconds = np.where(is_nan, 0.0, seconds)
+
+    # Split into whole seconds and rounded microseconds (datetime.fromtimestamp semantics)
+    frac, whole = np.modf(seconds)
+    micros = np.rint(frac * 1e6)
+    carry = micros >= 1e6
+    micros[carry] -= 1e6
+    whole[carry] += 1.0
+    borrow = micros < 0
+    micros[borrow] += 1e6
+    whole[borrow] -= 1.0
+
+    total_us = whole.astype(np.int64) * 1000000 + micros.astype(np.int64)
+    formatted = np.datetime_as_string(total_us.astype('datetime64[us]'), unit='us')
+    formatted = np.char.add(np.char.replace(formatted, 'T', ' '), "+00:00")
+
+    if is_nan.any():
+        formatted = formatted.astype(object)
+        formatted[is_nan] = None
+    return formatted
+
+def process_csv_file(csv_file_path, output_file_path, timestamp_column_name='Timestamp', sampling_frequency=140.0, vectorized=True):
+    """
+    Converts a single CSV file as described in process_csv_folder and writes it
+    to output_file_path (CSV, or Parquet/NPZ depending on its extension, see
+    columnar_cache).
+
+    Returns None on success, or a short message describing why the file was
+    skipped or failed, so callers (e.g. the parallel ingest driver) can report it.
+    """
+    base_filename = os.path.basename(csv_file_path)
+    time_increment_ms = (1.0 / sampling_frequency) * 1000.0
+    print(f"\nProcessing file: {csv_file_path}...")
+
+    try:
+        df = pd.read_csv(csv_file_path)
+
+        if timestamp_column_name not in df.columns:
+            message = f"Timestamp column '{timestamp_column_name}' not found in '{base_filename}'. Skipping file."
+            print(f"  Warning: {message}")
+            return message
+
+        if df.empty:
+            print(f"  Warning: CSV file '{base_filename}' is empty. Skipping file.")
+            write_table(df, output_file_path) # Save empty file as is
+            return None
+
+        start_timestamp_val = df[timestamp_column_name].iloc[0]
+        initial_timestamp_ms_utc = None
+
+        if pd.isna(start_timestamp_val):
+            message = f"Starting timestamp (first row) in '{timestamp_column_name}' is missing in '{base_filename}'. Skipping file."
+            print(f"  Error: {message}")
+            return message
+
+        try:
+            if isinstance(start_timestamp_val, (int, float)):
+                if math.isnan(start_timestamp_val):
+                    raise ValueError("Starting timestamp is NaN")
+                initial_timestamp_ms_utc = float(start_timestamp_val) # Assume it's already UTC ms
+            elif isinstance(start_timestamp_val, str):
+                # Try parsing common "MM/DD/YYYY HH:MM:SS AM/PM"
+                # If your string format is different, this part needs adjustment
+                naive_dt = datetime.strptime(start_timestamp_val, "%m/%d/%Y %I:%M:%S %p")
+                # IMPORTANT ASSUMPTION: Parsed string datetime is in local timezone
+                local_dt = naive_dt.astimezone(None)
+                utc_dt = local_dt.astimezone(timezone.utc)
+                initial_timestamp_ms_utc = utc_dt.timestamp() * 1000.0
+            else:
+                raise TypeError(f"Unsupported type for starting timestamp: {type(start_timestamp_val)}")
+        except (ValueError, TypeError) as e:
+            message = f"Could not parse starting timestamp '{start_timestamp_val}' in '{base_filename}': {e}. Skipping."
+            print(f"  Error: {message}")
+            return message
+
+        converted_column_name = f"{timestamp_column_name}_UTC"
+        if vectorized:
+            # Generate new timestamps in milliseconds and their UTC strings in one pass
+            calculated_timestamps_ms = generate_timestamps_ms(initial_timestamp_ms_utc, len(df), sampling_frequency)
+            df[timestamp_column_name] = calculated_timestamps_ms
+            df[converted_column_name] = format_utc_ms(calculated_timestamps_ms)
+        else:
+            # Generate new timestamps in milliseconds
+            calculated_timestamps_ms = []
+            for i in range(len(df)):
+                calculated_timestamps_ms.append(initial_timestamp_ms_utc + (i * time_increment_ms))
+
+            # Overwrite the original timestamp column with the new millisecond values
+            df[timestamp_column_name] = calculated_timestamps_ms
+
+            # Convert the new millisecond timestamps to UTC string format in a new column
+            df[converted_column_name] = df[timestamp_column_name].apply(convert_to_utc_format)
+
+        write_table(df, output_file_path)
+        print(f"  Successfully processed. Converted file saved to: {output_file_path}")
+        return None
+
+    except FileNotFoundError:
+        message = f"File '{csv_file_path}' not found during processing."
+        print(f"  Error: {message}")
+        return message
+    except pd.errors.EmptyDataError: # Should be caught by df.empty check, but good to have
+        message = f"File '{csv_file_path}' is empty. Skipping."
+        print(f"  Warning: {message}")
+        return message
+    except Exception as e:
+        message = f"Error processing file '{csv_file_path}': {e}"
+        print(f"  {message}")
+        return message
+
+
+def process_csv_folder(input_folder_path, output_folder_path, timestamp_column_name='Timestamp', sampling_frequency=140.0, vectorized=True, output_format='csv'):
     """
     Reads all CSV files from an input folder. For each file:
     1. Determines a starting timestamp from the first entry in 'timestamp_column_name'.
@@ -44,6 +182,10 @@ def process_csv_folder(input_folder_path, output_folder_path, timestamp_column_n
        start time by 1/sampling_frequency seconds. These will be Unix ms.
     3. Converts these millisecond timestamps to UTC string format in a new column.
     Saves the modified files to an output folder.
+
+    With vectorized=False the original per-row loop and df.apply path is used
+    (kept as a reference; the output is byte-identical).
+    output_format='parquet' or 'npz' writes typed columnar files instead of CSV.
     """
     if not os.path.isdir(input_folder_path):
         print(f"Error: Input folder '{input_folder_path}' not found.")
@@ -58,72 +200,10 @@ def process_csv_folder(input_folder_path, output_folder_path, timestamp_column_n
         print(f"No CSV files found in '{input_folder_path}'.")
         return
 
-    time_increment_ms = (1.0 / sampling_frequency) * 1000.0
-
     for csv_file_path in csv_files:
         base_filename = os.path.basename(csv_file_path)
-        output_file_path = os.path.join(output_folder_path, base_filename)
-        print(f"\nProcessing file: {csv_file_path}...")
-
-        try:
-            df = pd.read_csv(csv_file_path)
-
-            if timestamp_column_name not in df.columns:
-                print(f"  Warning: Timestamp column '{timestamp_column_name}' not found in '{base_filename}'. Skipping file.")
-                continue
-
-            if df.empty:
-                print(f"  Warning: CSV file '{base_filename}' is empty. Skipping file.")
-                df.to_csv(output_file_path, index=False) # Save empty file as is
-                continue
-
-            start_timestamp_val = df[timestamp_column_name].iloc[0]
-            initial_timestamp_ms_utc = None
-
-            if pd.isna(start_timestamp_val):
-                print(f"  Error: Starting timestamp (first row) in '{timestamp_column_name}' is missing in '{base_filename}'. Skipping file.")
-                continue
-
-            try:
-                if isinstance(start_timestamp_val, (int, float)):
-                    if math.isnan(start_timestamp_val):
-                        raise ValueError("Starting timestamp is NaN")
-                    initial_timestamp_ms_utc = float(start_timestamp_val) # Assume it's already UTC ms
-                elif isinstance(start_timestamp_val, str):
-                    # Try parsing common "MM/DD/YYYY HH:MM:SS AM/PM"
-                    # If your string format is different, this part needs adjustment
-                    naive_dt = datetime.strptime(start_timestamp_val, "%m/%d/%Y %I:%M:%S %p")
-                    # IMPORTANT ASSUMPTION: Parsed string datetime is in local timezone
-                    local_dt = naive_dt.astimezone(None)
-                    utc_dt = local_dt.astimezone(timezone.utc)
-                    initial_timestamp_ms_utc = utc_dt.timestamp() * 1000.0
-                else:
-                    raise TypeError(f"Unsupported type for starting timestamp: {type(start_timestamp_val)}")
-            except (ValueError, TypeError) as e:
-                print(f"  Error: Could not parse starting timestamp '{start_timestamp_val}' in '{base_filename}': {e}. Skipping.")
-                continue
-
-            # Generate new timestamps in milliseconds
-            calculated_timestamps_ms = []
-            for i in range(len(df)):
-                calculated_timestamps_ms.append(initial_timestamp_ms_utc + (i * time_increment_ms))
-
-            # Overwrite the original timestamp column with the new millisecond values
-            df[timestamp_column_name] = calculated_timestamps_ms
-
-            # Convert the new millisecond timestamps to UTC string format in a new column
-            converted_column_name = f"{timestamp_column_name}_UTC"
-            df[converted_column_name] = df[timestamp_column_name].apply(convert_to_utc_format)
-
-            df.to_csv(output_file_path, index=False)
-            print(f"  Successfully processed. Converted file saved to: {output_file_path}")
-
-        except FileNotFoundError:
-            print(f"  Error: File '{csv_file_path}' not found during processing.")
-        except pd.errors.EmptyDataError: # Should be caught by df.empty check, but good to have
-            print(f"  Warning: File '{csv_file_path}' is empty. Skipping.")
-        except Exception as e:
-            print(f"  Error processing file '{csv_file_path}': {e}")
+        output_file_path = with_format(os.path.join(output_folder_path, base_filename), output_format)
+        process_csv_file(csv_file_path, output_file_path, timestamp_column_name, sampling_frequency, vectorized)
 
 
 # --- How to use the function ---
@@ -197,28 +277,29 @@ def setup_dummy_test_environment(base_dir="test_timestamp_increment_conversion")
 # The input_folder should contain the CSVs (e.g., the 'BCG' subfolder).
 # The output_folder is where the converted files will be saved. 21,22,23,24,25,26,27,28,29,30,7,1
 
-print("\n--- Running with USER-SPECIFIED data ---")
-# user_input_folder = r"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\02\BCG"
-# user_output_folder = r"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\02"
-# # Outputting to the parent folder of 'BCG', as in your example
-# Default timestamp column name is 'Timestamp' and sampling frequency is 140.0
-# If your column is named differently or fs varies per file type, adjust the call.
+if __name__ == "__main__":
+    print("\n--- Running with USER-SPECIFIED data ---")
+    # user_input_folder = r"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\02\BCG"
+    # user_output_folder = r"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\02"
+    # # Outputting to the parent folder of 'BCG', as in your example
+    # Default timestamp column name is 'Timestamp' and sampling frequency is 140.0
+    # If your column is named differently or fs varies per file type, adjust the call.
+
+    file_numbers = [f"{i:02d}" for i in range(14, 21) if i != 7] + ["31", "32"]
 
-file_numbers = [f"{i:02d}" for i in range(14, 21) if i != 7] + ["31", "32"]
+    # Loop through each folder number and create the corresponding input/output paths
+    for num in file_numbers:
+        user_input_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\BCG"
+        user_output_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}"
 
-# Loop through each folder number and create the corresponding input/output paths
-for num in file_numbers:
-    user_input_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\BCG"
-    user_output_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}"
-    
-    print(f"Processing folder number: {num}")
-    process_csv_folder(
-    input_folder_path=user_input_folder,
-    output_folder_path=user_output_folder,
-    timestamp_column_name='Timestamp', # Adjust if your main timestamp column has a different name
-    sampling_frequency=140.0
-)
+        print(f"Processing folder number: {num}")
+        process_csv_folder(
+        input_folder_path=user_input_folder,
+        output_folder_path=user_output_folder,
+        timestamp_column_name='Timestamp', # Adjust if your main timestamp column has a different name
+        sampling_frequency=140.0
+    )
 
 
 
-    print(f"\n--- User-specified data processing finished. Check the output folder. {num}---")
\ No newline at end of file
+        print(f"\n--- User-specified data processing finished. Check the output folder. {num}---")
@@ -114,29 +114,40 @@
 import os
 import pandas as pd
 
-file_numbers = [f"{i:02d}" for i in range(2, 21) if i != 7] + ["31", "32"]
 
-# Loop through each folder number and create the corresponding input/output paths
-for num in file_numbers:
-    input_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\Reference\RR"
-    output_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\Reference\RR_converted"
+def convert_rr_file(file_path, output_folder):
+    """
+    Converts the 'Timestamp' column of one RR file to UTC-aware datetimes and
+    saves it as converted_<filename> in output_folder. Returns the output path.
+    """
+    filename = os.path.basename(file_path)
 
-    # Ensure the output folder exists
-    os.makedirs(output_folder, exist_ok=True)
+    # Load the CSV file
+    rr_df = pd.read_csv(file_path)
 
-    # Loop through all files in the input folder
-    for filename in os.listdir(input_folder):
-        if filename.endswith(".csv"):
-            file_path = os.path.join(input_folder, filename)
+    # Convert 'Timestamp' to UTC-aware datetime
+    rr_df['Timestamp'] = pd.to_datetime(rr_df['Timestamp'].str.strip(), utc=True)
 
-            # Load the CSV file
-            rr_df = pd.read_csv(file_path)
+    # Construct full output file path
+    output_file_path = os.path.join(output_folder, f"converted_{filename}")
+    rr_df.to_csv(output_file_path, index=False)
 
-            # Convert 'Timestamp' to UTC-aware datetime
-            rr_df['Timestamp'] = pd.to_datetime(rr_df['Timestamp'].str.strip(), utc=True)
+    print(f"Processed: {filename} -> converted_{filename}")
+    return output_file_path
 
-            # Construct full output file path
-            output_file_path = os.path.join(output_folder, f"converted_{filename}")
-            rr_df.to_csv(output_file_path, index=False)
 
-            print(f"Processed: {filename} -> converted_{filename}")
+if __name__ == "__main__":
+    file_numbers = [f"{i:02d}" for i in range(2, 21) if i != 7] + ["31", "32"]
+
+    # Loop through each folder number and create the corresponding input/output paths
+    for num in file_numbers:
+        input_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\Reference\RR"
+        output_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\Reference\RR_converted"
+
+        # Ensure the output folder exists
+        os.makedirs(output_folder, exist_ok=True)
+
+        # Loop through all files in the input folder
+        for filename in os.listdir(input_folder):
+            if filename.endswith(".csv"):
+                convert_rr_file(os.path.join(input_folder, filename), output_folder)
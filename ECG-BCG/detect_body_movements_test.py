@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+
+from benchmark_detect_patterns import make_recording
+from detect_body_movements import (DEFAULT_HORIZON_WINDOWS, StreamingMovementDetector, classify_windows,
+                                   detect_patterns, detect_segments, mad_threshold, segment_index, window_sd)
+
+
+def reference_flags(data, win_size, horizon, delay):
+    """The streaming classification written out: the threshold of the last `horizon` SDs, `delay` windows late."""
+    sd = window_sd(data, 0, win_size, win_size)
+    flags = []
+    for i in range(sd.size):
+        # window i is classified when window i + delay completes (or at the end)
+        last = min(i + delay, sd.size - 1)
+        history = sd[:last + 1] if horizon is None else sd[max(0, last + 1 - horizon):last + 1]
+        flags.append(classify_windows(sd[i:i + 1], mad_threshold(history))[0])
+    return np.array(flags)
+
+
+def stream_flags(detector, data, rng):
+    flags, i = [], 0
+    while i < data.size:
+        block = int(rng.integers(1, 3000))
+        flags.append(detector.process(data[i:i + block])[1])
+        i += block
+    flags.append(detector.flush()[1])
+    return np.concatenate(flags)
+
+
+class StreamingMovementDetectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = make_recording(600 * 500 + 123, 500, 0)
+
+    def test_sliding_horizon(self):
+        for horizon, delay in ((None, 0), (None, 3), (7, 0), (7, 2), (360, 0), (1, 0)):
+            with self.subTest(horizon=horizon, delay=delay):
+                detector = StreamingMovementDetector(500, horizon_windows=horizon, delay_windows=delay)
+                np.testing.assert_array_equal(stream_flags(detector, self.data, np.random.default_rng(0)),
+                                              reference_flags(self.data, 500, horizon, delay))
+
+    def test_history_is_bounded_by_default(self):
+        detector = StreamingMovementDetector(10)
+        detector.process(np.random.default_rng(1).normal(0, 100, 10 * (DEFAULT_HORIZON_WINDOWS + 500)))
+        self.assertEqual(detector._n_history, DEFAULT_HORIZON_WINDOWS)
+        self.assertEqual(detector._history.size, DEFAULT_HORIZON_WINDOWS)
+
+
+class SegmentIndexTest(unittest.TestCase):
+
+    def assert_segments(self, segments, expected, time):
+        np.testing.assert_array_equal(segments['start_sample'], [a for a, _ in expected])
+        np.testing.assert_array_equal(segments['end_sample'], [b for _, b in expected])
+        np.testing.assert_array_equal(segments['start_epoch_ms'], time[[a for a, _ in expected]])
+
+    def test_runs_at_the_edges(self):
+        time = 1.7e12 + np.arange(9) * 20.0
+        mask = np.array([1, 1, 0, 0, 1, 0, 1, 1, 1], dtype=bool)
+        self.assert_segments(segment_index(mask, time), [(0, 2), (4, 5), (6, 9)], time)
+        self.assert_segments(segment_index(~mask, time), [(2, 4), (5, 6)], time)
+
+    def test_all_and_none_kept(self):
+        time = np.arange(5) * 20.0
+        self.assert_segments(segment_index(np.ones(5, dtype=bool), time), [(0, 5)], time)
+        self.assert_segments(segment_index(np.zeros(5, dtype=bool), time), [], time)
+        self.assert_segments(segment_index(np.zeros(0, dtype=bool), time[:0]), [], time)
+
+    def test_same_samples_as_detect_patterns(self):
+        data = make_recording(300 * 500 + 123, 500, 1)
+        time = 1.7e12 + np.arange(data.size) * 20.0
+        segments = detect_segments(0, 500, 500, data, time)
+        kept, kept_time = detect_patterns(0, 500, 500, data, time, plot=0)
+        self.assertGreater(segments.size, 1)
+        np.testing.assert_array_equal(np.concatenate([data[a:b] for a, b, _ in segments]), kept)
+        np.testing.assert_array_equal(np.concatenate([time[a:b] for a, b, _ in segments]), kept_time)
+        # Consecutive segments are separated by removed samples
+        self.assertTrue((segments['start_sample'][1:] > segments['end_sample'][:-1]).all())
+
+    def test_every_window_removed(self):
+        data = np.zeros(2000)  # an empty bed
+        time = np.arange(2000) * 20.0
+        self.assertEqual(detect_segments(0, 500, 500, data, time).size, 0)
+        # A trailing partial window is never classified, so it is kept
+        self.assert_segments(detect_segments(0, 500, 500, np.zeros(2100), np.arange(2100) * 20.0), [(2000, 2100)],
+                             np.arange(2100) * 20.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,6 @@
 
 from __future__ import division, print_function
 import numpy as np
-import matplotlib.pyplot as plt
 
 __author__ = "Marcos Duarte, https://github.com/demotu/BMC"
 __version__ = "1.0.4"
@@ -36,7 +35,7 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
     # handle NaN's
     if ind.size and indnan.size:
         # NaN's and values close to NaN's cannot be peaks
-        ind = ind[np.in1d(ind, np.unique(np.hstack((indnan, indnan - 1, indnan + 1))), invert=True)]
+        ind = ind[np.isin(ind, np.unique(np.hstack((indnan, indnan - 1, indnan + 1))), invert=True)]
     # first and last values of x cannot be peaks
     if ind.size and ind[0] == 0:
         ind = ind[1:]
@@ -51,16 +50,7 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
         ind = np.delete(ind, np.where(dx < threshold)[0])
     # detect small peaks closer than minimum peak distance
     if ind.size and mpd > 1:
-        ind = ind[np.argsort(x[ind])][::-1]  # sort ind by peak height
-        idel = np.zeros(ind.size, dtype=bool)
-        for i in range(ind.size):
-            if not idel[i]:
-                # keep peaks with the same height if kpsh is True
-                idel = idel | (ind >= ind[i] - mpd) & (ind <= ind[i] + mpd) \
-                              & (x[ind[i]] > x[ind] if kpsh else True)
-                idel[i] = 0  # Keep current peak
-        # remove the small peaks and sort back the indices by their occurrence
-        ind = np.sort(ind[~idel])
+        ind = _remove_close_peaks(x, ind, mpd, kpsh)
 
     if show:
         if indnan.size:
@@ -72,6 +62,32 @@ def detect_peaks(x, mph=None, mpd=1, threshold=0, edge='rising',
     return ind
 
 
+def _remove_close_peaks(x, ind, mpd, kpsh):
+    """
+    Removes the peaks closer than mpd to a higher kept peak (strictly higher
+    if kpsh is True). The peaks are visited by decreasing height, in the same
+    order as the former all-candidates mask loop, and each kept peak only
+    marks its own neighbours: ind is sorted by position, so the candidates
+    within mpd of ind[i] are the slice ind[lo[i]:hi[i]]. Kept peaks are more
+    than mpd apart (without kpsh), so every candidate is marked at most twice
+    and the cost is the O(n log n) sort and searches.
+    """
+    height = x[ind]
+    lo = np.searchsorted(ind, ind - mpd, side='left').tolist()
+    hi = np.searchsorted(ind, ind + mpd, side='right').tolist()
+    idel = np.zeros(ind.size, dtype=bool)
+    for i in np.argsort(height)[::-1].tolist():  # sort ind by peak height
+        if not idel[i]:
+            if kpsh:
+                # keep peaks with the same height
+                idel[lo[i]:hi[i]] |= height[lo[i]:hi[i]] < height[i]
+            else:
+                idel[lo[i]:hi[i]] = True
+                idel[i] = False  # Keep current peak
+    # ind is still sorted by occurrence
+    return ind[~idel]
+
+
 def _plot(x, mph, mpd, threshold, edge, valley, ax, ind):
     """Plot results of the detect_peaks function, see its help."""
     try:
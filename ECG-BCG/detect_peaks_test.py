@@ -0,0 +1,58 @@
+import itertools
+import unittest
+
+import numpy as np
+
+from benchmark_detect_peaks import legacy_detect_peaks
+from detect_peaks import detect_peaks
+
+EDGES = ('rising', 'falling', 'both', None)
+
+
+def random_signal(rng):
+    """Short integer-valued signal: many tied heights, sometimes plateaus and NaN's."""
+    n = int(rng.integers(3, 400))
+    x = rng.integers(0, int(rng.integers(2, 20)), n).astype(float)
+    if rng.random() < 0.3:
+        x = np.repeat(x, int(rng.integers(1, 4)))[:n]
+    if rng.random() < 0.2:
+        x[rng.integers(0, n, int(rng.integers(1, 4)))] = np.nan
+    return x
+
+
+class RemoveClosePeaksTest(unittest.TestCase):
+    """detect_peaks with mpd > 1 against the original O(k^2) mask loop."""
+
+    def assert_same_peaks(self, x, **kwargs):
+        np.testing.assert_array_equal(detect_peaks(x, **kwargs), legacy_detect_peaks(x, **kwargs),
+                                      err_msg=f"{kwargs}, x = {x.tolist()}")
+
+    def test_random_signals(self):
+        rng = np.random.default_rng(0)
+        for _ in range(2000):
+            x = random_signal(rng)
+            self.assert_same_peaks(x, mpd=int(rng.integers(2, 40)), kpsh=bool(rng.random() < 0.5),
+                                   valley=bool(rng.random() < 0.3), edge=EDGES[int(rng.integers(4))])
+
+    def test_all_option_combinations(self):
+        rng = np.random.default_rng(1)
+        signals = [random_signal(rng) for _ in range(20)] + [np.sin(np.arange(300) / 3) + rng.normal(0, 0.3, 300)]
+        for x, mpd, edge, kpsh, valley in itertools.product(signals, (2, 5, 17, 1000), EDGES, (False, True),
+                                                             (False, True)):
+            self.assert_same_peaks(x, mpd=mpd, edge=edge, kpsh=kpsh, valley=valley)
+
+    def test_equal_heights_kept_with_kpsh(self):
+        x = np.array([0, 5, 0, 5, 0, 3, 0], dtype=float)
+        np.testing.assert_array_equal(detect_peaks(x, mpd=3, kpsh=True), [1, 3])
+        # Without kpsh the tie goes to the later peak (the original reversed argsort), which also removes 5
+        np.testing.assert_array_equal(detect_peaks(x, mpd=3), [3])
+        self.assert_same_peaks(x, mpd=3)
+
+    def test_white_noise(self):
+        x = np.random.default_rng(2).normal(size=30000)
+        for mpd in (2, 10, 50):
+            self.assert_same_peaks(x, mpd=mpd)
+
+
+if __name__ == "__main__":
+    unittest.main()
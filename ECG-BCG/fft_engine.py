@@ -0,0 +1,195 @@
+"""
+Cached FFTW transform engine for modwt and modwtmra.
+
+The pyfftw.interfaces wrappers plan every transform again (FFTW_ESTIMATE,
+one thread). FFTEngine builds one pyfftw.FFTW plan per (shape, dtype,
+direction) and reuses it. It also caches the DFTs of the MODWT filters per
+(wavelet, N). Planner effort and thread count are configurable, and the
+FFTW wisdom gathered by the planner can be saved to a cache file and loaded
+in later runs, so FFTW_MEASURE/FFTW_PATIENT plans of the same sizes are not
+planned again (default_wisdom_path: outside the dataset, raw FFTW wisdom
+bytes, no pickle).
+
+Plans own their input/output buffers, so an engine must not be shared
+between threads. get_engine() returns one engine per thread, built with the
+settings given to configure().
+
+Plans and spectra are sized to the transformed signal, so for whole
+recordings (8 h at 50 Hz: ~23 MB per complex buffer) a few of them are a lot
+of memory, and recordings of other lengths never reuse them. Both caches
+share a budget of max_bytes (least recently used entries are dropped first),
+and clear_caches() empties the engine of the calling thread, e.g. once a
+recording is done.
+"""
+
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pyfftw
+import pywt
+
+PLANNER_EFFORTS = ('FFTW_ESTIMATE', 'FFTW_MEASURE', 'FFTW_PATIENT', 'FFTW_EXHAUSTIVE')
+
+# Cache budget of an engine, in bytes of plan buffers and filter spectra
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_WISDOM_LENGTH = struct.Struct('<Q')
+
+_settings = {'planner_effort': 'FFTW_ESTIMATE', 'threads': 1, 'max_bytes': DEFAULT_MAX_BYTES}
+_local = threading.local()
+
+
+class FFTEngine:
+    """
+    Reusable FFTW plans and MODWT filter spectra, in one LRU cache holding at
+    most max_bytes of buffers (the newest entry is kept even when it alone is
+    larger).
+    """
+
+    def __init__(self, planner_effort='FFTW_ESTIMATE', threads=1, max_bytes=DEFAULT_MAX_BYTES):
+        if planner_effort not in PLANNER_EFFORTS:
+            raise ValueError(f"Unknown planner effort '{planner_effort}', expected one of {PLANNER_EFFORTS}")
+        self.planner_effort = planner_effort
+        self.threads = threads
+        self.max_bytes = max_bytes
+        self.cached_bytes = 0
+        self._cache = OrderedDict()  # ('plan' | 'filters', ...) -> (value, bytes held)
+
+    def _get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        self._cache.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key, value, nbytes):
+        self._cache[key] = (value, nbytes)
+        self.cached_bytes += nbytes
+        while self.cached_bytes > self.max_bytes and len(self._cache) > 1:
+            self.cached_bytes -= self._cache.popitem(last=False)[1][1]
+
+    def clear(self):
+        """Releases every cached plan and filter spectrum."""
+        self._cache.clear()
+        self.cached_bytes = 0
+
+    def plan(self, shape, direction, dtype=np.complex128):
+        """The FFTW plan transforming arrays of `shape` along the last axis."""
+        key = ('plan', tuple(shape), np.dtype(dtype).str, direction)
+        plan = self._get(key)
+        if plan is None:
+            input_array = pyfftw.empty_aligned(shape, dtype=dtype)
+            output_array = pyfftw.empty_aligned(shape, dtype=dtype)
+            plan = pyfftw.FFTW(input_array, output_array, axes=(-1,), direction=direction,
+                               flags=(self.planner_effort,), threads=self.threads)
+            self._put(key, plan, input_array.nbytes + output_array.nbytes)
+        return plan
+
+    def _execute(self, x, direction):
+        plan = self.plan(x.shape, direction)
+        plan.input_array[...] = x
+        return plan(normalise_idft=True).copy()
+
+    def fft(self, x, n=None):
+        """DFT along the last axis; with n the input is zero-padded or truncated to n points."""
+        x = np.asarray(x)
+        if n is not None and n != x.shape[-1]:
+            padded = np.zeros(x.shape[:-1] + (n,), dtype=x.dtype)
+            m = min(n, x.shape[-1])
+            padded[..., :m] = x[..., :m]
+            x = padded
+        return self._execute(x, 'FFTW_FORWARD')
+
+    def ifft(self, X):
+        """Normalised inverse DFT along the last axis."""
+        return self._execute(np.asarray(X), 'FFTW_BACKWARD')
+
+    def filter_spectra(self, wname, N):
+        """
+        (G, H): N-point DFTs of the MODWT scaling and wavelet filters of wname
+        (the reconstruction filters scaled by 1/sqrt(2)). Do not modify in place.
+        """
+        key = ('filters', wname, N)
+        spectra = self._get(key)
+        if spectra is None:
+            wavelet = pywt.Wavelet(wname)
+            Lo = np.array(wavelet.rec_lo) / np.sqrt(2)
+            Hi = np.array(wavelet.rec_hi) / np.sqrt(2)
+            spectra = (self.fft(Lo, N), self.fft(Hi, N))
+            self._put(key, spectra, spectra[0].nbytes + spectra[1].nbytes)
+        return spectra
+
+
+def configure(planner_effort=None, threads=None, max_bytes=None, wisdom_path=None):
+    """
+    Sets the engine settings used by get_engine() (already created engines are
+    replaced) and optionally loads FFTW wisdom from wisdom_path.
+    """
+    for name, value in (('planner_effort', planner_effort), ('threads', threads), ('max_bytes', max_bytes)):
+        if value is not None:
+            _settings[name] = value
+    _settings['generation'] = _settings.get('generation', 0) + 1
+    if wisdom_path is not None:
+        load_wisdom(wisdom_path)
+
+
+def get_engine():
+    """The engine of the current thread, built with the configure() settings."""
+    engine = getattr(_local, 'engine', None)
+    if engine is None or getattr(_local, 'generation', 0) != _settings.get('generation', 0):
+        engine = FFTEngine(_settings['planner_effort'], _settings['threads'], _settings['max_bytes'])
+        _local.engine = engine
+        _local.generation = _settings.get('generation', 0)
+    return engine
+
+
+def clear_caches():
+    """Empties the plan and filter caches of the current thread's engine."""
+    engine = getattr(_local, 'engine', None)
+    if engine is not None:
+        engine.clear()
+
+
+def default_wisdom_path():
+    """FFTW wisdom cache: $BCG_CACHE_DIR/fftw_wisdom, or ~/.cache/bcg-heart-rate/fftw_wisdom."""
+    cache_dir = os.environ.get('BCG_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'bcg-heart-rate')
+    return os.path.join(cache_dir, 'fftw_wisdom')
+
+
+def load_wisdom(path):
+    """
+    Imports FFTW wisdom saved by save_wisdom. Returns False if the file does
+    not exist or is not a wisdom file.
+    """
+    if not os.path.exists(path):
+        return False
+    with open(path, 'rb') as f:
+        content = f.read()
+    wisdom, offset = [], 0
+    while offset < len(content):
+        if offset + _WISDOM_LENGTH.size > len(content):
+            return False
+        length, = _WISDOM_LENGTH.unpack_from(content, offset)
+        offset += _WISDOM_LENGTH.size
+        wisdom.append(content[offset:offset + length])
+        offset += length
+    if offset != len(content) or not wisdom:
+        return False
+    pyfftw.import_wisdom(tuple(wisdom))
+    return True
+
+
+def save_wisdom(path):
+    """
+    Saves the FFTW wisdom accumulated by this process (all plans made so far):
+    the wisdom strings of every precision, each preceded by its length.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        for wisdom in pyfftw.export_wisdom():
+            f.write(_WISDOM_LENGTH.pack(len(wisdom)) + wisdom)
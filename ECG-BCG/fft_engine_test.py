@@ -0,0 +1,34 @@
+import unittest
+
+import numpy as np
+
+from fft_engine import FFTEngine
+
+
+class FFTEngineCacheTest(unittest.TestCase):
+
+    def test_cache_is_bounded_by_bytes(self):
+        engine = FFTEngine(max_bytes=3 * 2 * 16 * 1000)  # the buffers of three 1000-point plans
+        for n in range(1000, 1010):
+            x = np.random.default_rng(n).normal(size=n)
+            np.testing.assert_allclose(engine.fft(x), np.fft.fft(x))
+            self.assertLessEqual(engine.cached_bytes, engine.max_bytes)
+        self.assertEqual(engine.cached_bytes, sum(nbytes for _, nbytes in engine._cache.values()))
+
+    def test_entry_larger_than_the_budget(self):
+        engine = FFTEngine(max_bytes=1)
+        x = np.arange(64.0)
+        np.testing.assert_allclose(engine.ifft(engine.fft(x)).real, x, atol=1e-12)
+        self.assertEqual(len(engine._cache), 1)  # only the plan just used
+
+    def test_clear(self):
+        engine = FFTEngine()
+        G, H = engine.filter_spectra('bior3.9', 4096)
+        self.assertGreater(engine.cached_bytes, G.nbytes + H.nbytes)  # the spectra and the plan behind them
+        engine.clear()
+        self.assertEqual(engine.cached_bytes, 0)
+        self.assertEqual(len(engine._cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,21 +1,64 @@
 import numpy as np
-from compute_rate import compute_rate
-import heartpy
+from compute_rate import rates_from_peaks
+from detect_peaks import detect_peaks
 
-def heart_rate(t1, t2, win_size, window_limit, sig, mpd, sig_type="bcg", plot=0):
+
+def window_heart_rates(sig, t1, t2, win_size, window_limit, mpd, fs=50):
+    """
+    BCG heart rate of window_limit windows of t2 - t1 samples, the first one
+    starting at t1 and each next one win_size samples later (windows overlap
+    when win_size < t2 - t1), as a RATE_DTYPE record array. Same rates as
+    compute_rate on every window.
+
+    Peaks are detected once on the whole signal. A peak belongs to a window
+    [s, e) when s < p < e - 1, as detect_peaks on the window slice cannot
+    report its first and last samples, and the peak counts and first/last
+    peaks of all windows come from two searchsorted calls. With mpd > 1 the
+    minimum peak distance only applies within a window, so the peaks are
+    detected per window instead. Windows with fewer than two peaks have
+    bpm NaN and valid False.
+    """
+    sig = np.asarray(sig)
+    starts = np.minimum(t1 + win_size * np.arange(window_limit), sig.size)
+    ends = np.minimum(starts + (t2 - t1), sig.size)
+
+    if mpd > 1:
+        window_peaks = [s + detect_peaks(sig[s:e], mpd=mpd) for s, e in zip(starts, ends)]
+        n_peaks = np.array([p.size for p in window_peaks], dtype=int)
+        first = np.array([p[0] if p.size else 0 for p in window_peaks], dtype=int)
+        last = np.array([p[-1] if p.size else 0 for p in window_peaks], dtype=int)
+    else:
+        peaks = detect_peaks(sig, mpd=mpd)
+        lo = np.searchsorted(peaks, starts, side='right')
+        hi = np.searchsorted(peaks, ends - 1, side='left')
+        n_peaks = np.maximum(hi - lo, 0)
+        has_peaks = n_peaks > 0
+        first = np.zeros(window_limit, dtype=int)
+        last = np.zeros(window_limit, dtype=int)
+        first[has_peaks] = peaks[lo[has_peaks]]
+        last[has_peaks] = peaks[hi[has_peaks] - 1]
+
+    return rates_from_peaks(starts, ends, n_peaks, first, last, fs)
+
+
+def heart_rate(t1, t2, win_size, window_limit, sig, mpd, sig_type="bcg", plot=0, fs=50):
+    """Heart rate of every window in bpm, NaN for BCG windows with fewer than two peaks."""
+
+    if sig_type != "ecg":
+        return window_heart_rates(sig, t1, t2, win_size, window_limit, mpd, fs)['bpm']
+
+    # heartpy is only needed (and imported) for ECG signals
+    import heartpy
 
     all_rate = []
     for j in range(0, window_limit):
         sub_signal = sig[t1:t2]
-        if sig_type == "ecg":
-            w, results = heartpy.process(sub_signal, 50)
-            rate = results['bpm']
-        else:
-            rate = compute_rate(sub_signal, mpd)
+        w, results = heartpy.process(sub_signal, fs)
+        rate = results['bpm']
         all_rate.append(rate)
 
         t1 = t2
         t2 += win_size
 
     all_rate = np.vstack(all_rate).flatten()
-    return all_rate
\ No newline at end of file
+    return all_rate
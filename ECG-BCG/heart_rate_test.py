@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from benchmark_heart_rate import legacy_heart_rates
+from benchmark_resample import make_bcg_like
+from compute_rate import compute_rate, rates_from_peaks
+from heart_rate import window_heart_rates
+from modwt_fused_fft import modwt_mra
+from streaming_pipeline import StreamingPeakDetector
+
+
+class RatesFromPeaksTest(unittest.TestCase):
+
+    def test_formula_and_invalid_windows(self):
+        rates = rates_from_peaks([0, 500, 1000], [500, 1000, 1500], [11, 1, 0], [10, 600, 0], [460, 600, 0], fs=50)
+        self.assertAlmostEqual(rates['bpm'][0], 10 / (451 / 50) * 60)
+        np.testing.assert_array_equal(rates['valid'], [True, False, False])
+        self.assertTrue(np.isnan(rates['bpm'][1:]).all())
+        np.testing.assert_array_equal(rates['window_end'], [500, 1000, 1500])
+
+    def test_compute_rate(self):
+        x = np.sin(np.arange(500) * 2 * np.pi / 40)
+        self.assertAlmostEqual(compute_rate(x, 1, fs=50), 12 / ((10 + 12 * 40 - 10 + 1) / 50) * 60)
+        self.assertTrue(np.isnan(compute_rate(np.arange(10.0), 1)))
+
+
+class WindowHeartRatesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cycle = modwt_mra(make_bcg_like(30000, 50), 'bior3.9', 4, levels=[4])[0]
+
+    def test_same_rates_as_compute_rate_per_window(self):
+        for hop, mpd in ((500, 1), (500, 5), (250, 1)):
+            limit = (self.cycle.size - 500) // hop + 1
+            expected = [compute_rate(self.cycle[s:s + 500], mpd) for s in range(0, limit * hop, hop)]
+            rates = window_heart_rates(self.cycle, 0, 500, hop, limit, mpd, 50)
+            np.testing.assert_allclose(rates['bpm'], expected, rtol=1e-12)
+            np.testing.assert_array_equal(rates['valid'], ~np.isnan(expected))
+
+    def test_legacy_loop(self):
+        limit = self.cycle.size // 500
+        np.testing.assert_allclose(window_heart_rates(self.cycle, 0, 500, 500, limit, 1, 50)['bpm'],
+                                   legacy_heart_rates(self.cycle, 0, 500, 500, limit, 1), rtol=1e-12)
+
+    def test_streaming_peaks(self):
+        detector = StreamingPeakDetector()
+        blocks = np.array_split(self.cycle, 37)
+        peaks = np.concatenate([detector.process(b) for b in blocks])
+        np.testing.assert_array_equal(peaks, np.flatnonzero((np.diff(self.cycle)[:-1] > 0)
+                                                            & (np.diff(self.cycle)[1:] <= 0)) + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
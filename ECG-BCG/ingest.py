@@ -0,0 +1,131 @@
+"""
+Parallel multi-patient ingest driver for the timestamp conversion scripts.
+
+Finds the patient folders under a dataset root (folders with a 'BCG' and/or
+'Reference/RR' sub-folder) and runs the per-file conversions of
+convert_timestamp_format_BCG and convert_timestamp_format_RR on a process pool:
+
+    <root>/<patient>/BCG/*.csv           -> <root>/<patient>/<file>.csv
+    <root>/<patient>/Reference/RR/*.csv  -> <root>/<patient>/Reference/RR_converted/converted_<file>.csv
+
+Usage: python ingest.py <root_dir> [--workers 8] [--patients 01 02] [--kinds bcg rr]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+from collections import namedtuple
+
+from columnar_cache import CACHE_FORMATS, with_format
+from convert_timestamp_format_BCG import process_csv_file
+from convert_timestamp_format_RR import convert_rr_file
+from job_pool import JobSummary, guarded_call, run_jobs
+
+IngestJob = namedtuple('IngestJob', ['patient', 'kind', 'input_path', 'output_path', 'sampling_frequency'])
+FileResult = namedtuple('FileResult', ['patient', 'kind', 'input_path', 'output_path', 'seconds', 'error'])
+IngestSummary = JobSummary
+
+
+def find_patient_folders(root_dir, patients=None):
+    """Returns the sorted patient folder names under root_dir, optionally restricted to `patients`."""
+    found = []
+    for name in sorted(os.listdir(root_dir)):
+        folder = os.path.join(root_dir, name)
+        if not os.path.isdir(folder):
+            continue
+        if patients is not None and name not in patients:
+            continue
+        if os.path.isdir(os.path.join(folder, "BCG")) or os.path.isdir(os.path.join(folder, "Reference", "RR")):
+            found.append(name)
+    return found
+
+
+def collect_jobs(root_dir, patients=None, kinds=("bcg", "rr"), sampling_frequency=140.0, output_format='csv'):
+    """
+    Builds one IngestJob per input CSV file, creating the output folders.
+    output_format ('csv', 'parquet' or 'npz') applies to the converted BCG files.
+    """
+    jobs = []
+    for patient in find_patient_folders(root_dir, patients):
+        patient_dir = os.path.join(root_dir, patient)
+
+        if "bcg" in kinds:
+            for csv_file in sorted(glob.glob(os.path.join(patient_dir, "BCG", "*.csv"))):
+                output_file = with_format(os.path.join(patient_dir, os.path.basename(csv_file)), output_format)
+                jobs.append(IngestJob(patient, "bcg", csv_file, output_file, sampling_frequency))
+
+        if "rr" in kinds:
+            output_folder = os.path.join(patient_dir, "Reference", "RR_converted")
+            csv_files = sorted(glob.glob(os.path.join(patient_dir, "Reference", "RR", "*.csv")))
+            if csv_files:
+                os.makedirs(output_folder, exist_ok=True)
+            for csv_file in csv_files:
+                output_file = os.path.join(output_folder, f"converted_{os.path.basename(csv_file)}")
+                jobs.append(IngestJob(patient, "rr", csv_file, output_file, sampling_frequency))
+    return jobs
+
+
+def run_job(job, quiet=True):
+    """Converts a single file. Never raises: failures are returned in FileResult.error."""
+    # The conversion functions print per-file progress; keep worker output readable
+    with contextlib.redirect_stdout(io.StringIO()) if quiet else contextlib.nullcontext():
+        if job.kind == "bcg":
+            # process_csv_file returns its own error message for an unreadable file
+            value, error, seconds = guarded_call(process_csv_file, job.input_path, job.output_path,
+                                                 sampling_frequency=job.sampling_frequency)
+            error = error or value
+        else:
+            _, error, seconds = guarded_call(convert_rr_file, job.input_path, os.path.dirname(job.output_path))
+    return FileResult(job.patient, job.kind, job.input_path, job.output_path, seconds, error)
+
+
+def failed_job(job, error):
+    """FileResult of a job whose worker process died."""
+    return FileResult(job.patient, job.kind, job.input_path, job.output_path, 0.0, error)
+
+
+def run_ingest(root_dir, workers=None, patients=None, kinds=("bcg", "rr"), sampling_frequency=140.0, output_format='csv',
+               verbose=True):
+    """
+    Converts every BCG/RR file of every patient under root_dir using a pool of
+    `workers` processes (defaults to the number of cores; 1 runs in-process).
+    Returns an IngestSummary with one FileResult per file.
+    """
+    if not os.path.isdir(root_dir):
+        raise FileNotFoundError(f"Dataset root '{root_dir}' not found.")
+
+    jobs = collect_jobs(root_dir, patients, kinds, sampling_frequency, output_format)
+    summary = run_jobs(run_job, jobs, workers, sort_key=lambda r: (r.patient, r.kind, r.input_path),
+                       report=_report if verbose else None, failed_result=failed_job)
+    failed = [r for r in summary.results if r.error is not None]
+
+    if verbose:
+        print("\nIngest summary")
+        print("==========================================================================================================")
+        print(f"Files: {len(summary.results)}, succeeded: {summary.succeeded}, failed: {summary.failed}")
+        print(f"Workers: {summary.workers}, wall time: {summary.wall_seconds:.2f} s, "
+              f"summed file time: {sum(r.seconds for r in summary.results):.2f} s")
+        for r in failed:
+            print(f"  FAILED [{r.patient}/{r.kind}] {r.input_path}: {r.error}")
+    return summary
+
+
+def _report(result):
+    status = "ok" if result.error is None else "FAILED"
+    print(f"[{result.patient}/{result.kind}] {os.path.basename(result.input_path)}: {status} ({result.seconds:.2f} s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root_dir", help="dataset root containing one folder per patient")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("--patients", nargs="+", default=None, help="patient folder names to ingest (default: all)")
+    parser.add_argument("--kinds", nargs="+", default=["bcg", "rr"], choices=["bcg", "rr"])
+    parser.add_argument("--fs", type=float, default=140.0, help="BCG sampling frequency in Hz")
+    parser.add_argument("--format", default="csv", choices=CACHE_FORMATS, help="output format of the converted BCG files")
+    args = parser.parse_args()
+
+    run_ingest(args.root_dir, workers=args.workers, patients=args.patients, kinds=args.kinds,
+               sampling_frequency=args.fs, output_format=args.format)
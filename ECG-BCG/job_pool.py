@@ -0,0 +1,118 @@
+"""
+Process-pool driver shared by the multi-patient scripts (ingest.py, batch_analysis.py).
+
+run_jobs maps a job function over a list of jobs, in-process for one worker
+or on a ProcessPoolExecutor otherwise, and returns a JobSummary. Job
+functions are expected to report their failures in an `error` field of
+their result (see guarded_call) rather than raise, so that one bad file does
+not stop the run; a job that kills its worker process is reported the same
+way.
+"""
+
+import contextlib
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+# Environment variables read by the BLAS/OpenMP runtimes when they are loaded
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS',
+                   'VECLIB_MAXIMUM_THREADS')
+
+# results: one result per job, sorted by the caller's key; failed: the number of results with an error
+JobSummary = namedtuple('JobSummary', ['results', 'succeeded', 'failed', 'wall_seconds', 'workers'])
+
+
+@contextlib.contextmanager
+def thread_limits(threads):
+    """Sets THREAD_ENV_VARS for the duration of the block: spawned workers inherit them."""
+    saved = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    os.environ.update({name: str(threads) for name in THREAD_ENV_VARS})
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def guarded_call(func, *args, **kwargs):
+    """(func(*args, **kwargs), None, seconds), or (None, "<Error>: <message>", seconds) when it raises."""
+    t0 = time.perf_counter()
+    try:
+        value, error = func(*args, **kwargs), None
+    except Exception as e:
+        value, error = None, f"{type(e).__name__}: {e}"
+    return value, error, time.perf_counter() - t0
+
+
+def run_jobs(run_job, jobs, workers=None, sort_key=None, report=None, initializer=None, initargs=(),
+             mp_context=None, failed_result=None):
+    """
+    Runs run_job on every job with `workers` processes (defaults to the number
+    of cores; 1 runs in-process, after calling initializer(*initargs) there).
+    report is called with every result as it completes. Returns a JobSummary
+    whose results are sorted by sort_key.
+
+    A worker process that dies (out of memory on a long recording...) breaks
+    the whole pool and every job still in it. Those jobs run again in a new
+    pool; the ones that had already been sent to the workers go first, one at
+    a time, and the job that kills that single worker gets failed_result(job,
+    error) as its result. Without failed_result the BrokenProcessPool is raised.
+    """
+    workers = workers or os.cpu_count() or 1
+    results = []
+
+    def add(result):
+        results.append(result)
+        if report is not None:
+            report(result)
+
+    def run_pool(indices, n_workers):
+        lost = _run_pool(run_job, jobs, indices, n_workers, add, initializer, initargs, mp_context)
+        if lost and failed_result is None:
+            raise BrokenProcessPool(f"a worker process died while running {jobs[lost[0]]}")
+        return lost
+
+    t0 = time.perf_counter()
+    if workers == 1:
+        if initializer is not None:
+            initializer(*initargs)
+        for job in jobs:
+            add(run_job(job))
+    else:
+        waiting = list(range(len(jobs)))
+        while waiting:
+            lost = run_pool(waiting, workers)
+            # Jobs are handed to the workers in order, at most 2 * workers + 1 at a time
+            suspects, waiting = lost[:2 * workers + 1], lost[2 * workers + 1:]
+            while suspects:
+                lost = run_pool(suspects, 1)
+                if lost:
+                    # A single worker runs its jobs in order: the first job lost is the one that killed it
+                    add(failed_result(jobs[lost[0]], "BrokenProcessPool: the worker process died on this job"))
+                suspects = lost[1:]
+    wall_seconds = time.perf_counter() - t0
+
+    results.sort(key=sort_key)
+    failed = sum(r.error is not None for r in results)
+    return JobSummary(results, len(results) - failed, failed, wall_seconds, workers)
+
+
+def _run_pool(run_job, jobs, indices, workers, add, initializer, initargs, mp_context):
+    """Runs jobs[indices] on a new pool; returns the indices lost when a worker died, in order."""
+    lost = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context, initializer=initializer,
+                             initargs=initargs) as executor:
+        futures = {executor.submit(run_job, jobs[i]): i for i in indices}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                lost.append(futures[future])
+                continue
+            add(result)
+    return sorted(lost)
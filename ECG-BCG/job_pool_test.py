@@ -0,0 +1,51 @@
+import os
+import unittest
+from collections import namedtuple
+from concurrent.futures.process import BrokenProcessPool
+
+from job_pool import guarded_call, run_jobs
+
+Result = namedtuple('Result', ['job', 'value', 'error'])
+
+
+def square(job):
+    value, error, _ = guarded_call(lambda: job * job if job % 5 else 1 // 0)
+    return Result(job, value, error)
+
+
+def square_or_die(job):
+    if job == 7:
+        os._exit(1)  # like a worker killed for running out of memory
+    return square(job)
+
+
+def lost(job, error):
+    return Result(job, None, error)
+
+
+class RunJobsTest(unittest.TestCase):
+
+    def test_errors_are_results(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                summary = run_jobs(square, range(1, 11), workers, sort_key=lambda r: r.job)
+                self.assertEqual([r.job for r in summary.results], list(range(1, 11)))
+                self.assertEqual((summary.succeeded, summary.failed), (8, 2))
+                self.assertEqual(summary.results[4].error, "ZeroDivisionError: integer division or modulo by zero")
+                self.assertEqual(summary.results[5].value, 36)
+
+    def test_dead_worker_fails_its_job_only(self):
+        summary = run_jobs(square_or_die, range(1, 21), 2, sort_key=lambda r: r.job, failed_result=lost)
+        self.assertEqual([r.job for r in summary.results], list(range(1, 21)))
+        self.assertIn("BrokenProcessPool", summary.results[6].error)
+        self.assertEqual([r.value for r in summary.results if r.job % 5 and r.job != 7],
+                         [job * job for job in range(1, 21) if job % 5 and job != 7])
+        self.assertEqual(summary.failed, 5)
+
+    def test_dead_worker_without_failed_result(self):
+        with self.assertRaises(BrokenProcessPool):
+            run_jobs(square_or_die, range(1, 11), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,36 +1,31 @@
-import math
+"""
+Heart rate of every patient folder under a dataset root, compared with the
+reference heart rate (see pipeline.BCGPipeline for the processing chain).
+
+Usage: python main.py [root_dir] [--no-plots] [--workers 16] [--segmented] [--fftw-planner FFTW_MEASURE]
+                      [--profile stages.json] [--profile-patient 01] [--profile-dump 01.prof]
+"""
+
+import argparse
 import os
-import glob
 import warnings
 
-import matplotlib.pyplot as plt
-from scipy import stats
-
 import numpy as np
 import pandas as pd
-from detect_body_movements import detect_patterns
 
-from heart_rate import heart_rate
-from modwt_matlab_fft import modwt
-from band_pass_filtering import band_pass_filtering
+from fft_engine import PLANNER_EFFORTS, configure as configure_fft, default_wisdom_path, save_wisdom
+from pipeline import BCGPipeline, find_patient_files
+from profiling import DISABLED, Profiler
 
-from modwt_mra_matlab_fft import modwtmra
-
-from data_subplot import data_subplot
-from scipy.signal import resample
-from sklearn.metrics import mean_absolute_error , mean_absolute_percentage_error , mean_squared_error, root_mean_squared_error
-#from stats import *
-# ======================================================================================================================
-warnings.simplefilter("ignore")
-# Main program starts here
-print('\nstart processing ...')
-# ======================================================================================================================
-
-# Add this function before your main processing loop
 
 def create_analysis_plots(rr_rates, bcg_rates, patient_id, folder_path):
     """Create correlation and Bland-Altman plots for each patient"""
-    
+    # Plotting libraries are only imported when plots are requested
+    import matplotlib
+    matplotlib.use('agg')
+    import matplotlib.pyplot as plt
+    from scipy import stats
+
     # Create plots directory in patient folder
     plots_dir = os.path.join(folder_path, 'analysis_plots')
     if not os.path.exists(plots_dir):
@@ -74,133 +69,115 @@ def create_analysis_plots(rr_rates, bcg_rates, patient_id, folder_path):
     plt.close()
 
 
-
-
-  
-root_dir = r"G:\spring 2025\data analytics\project\dataset\dataset\data"
-
-# Prepare the output structure
-dataInfo = [["PatientID", "RR AVG", "AVG BCG", "MAE", "RMSE", "MAPE"]]
-
-# Walk through each sub-folder
-for folder_name in os.listdir(root_dir):
-    folder_path = os.path.join(root_dir, folder_name)
+def print_report(metrics):
+    print('\nHeart Rate Information:')
+    print("==========================================================================================================\n")
     
-    # Make sure it's a directory
-    if os.path.isdir(folder_path):
-        # Look for CSV files inside this subfolder
-        csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
-        
-        for csv_file in csv_files:
-            if csv_file.endswith(".csv") and os.stat(csv_file).st_size != 0:
-                # Extract patient ID (number from folder name like "X123")
-                patient_id = ''.join(filter(str.isdigit, folder_name))
-
-
-                rawData = pd.read_csv(csv_file, sep=None, header=None, skiprows=1, engine="python").values
-                start_point, end_point, window_shift = 0, 500, 500 # Constants
-            # ==========================================================================================================
-            
-            # BCG Processing
-            utc_time = rawData[:, 1]
-            data_stream_bcg = rawData[:, 0] # Read BCG data
-            rr_heart_rates = rawData[:, 2]
-            
-            # ==========================================================================================================
-           
-            data_stream_bcg, utc_time = detect_patterns(start_point, end_point, window_shift, data_stream_bcg, utc_time, plot=1)
-        # ==========================================================================================================
-        # BCG signal extraction
-            movement = band_pass_filtering(data_stream_bcg, 50, "bcg")
-
-            # ==========================================================================================================
-            #Wavelet transformation
-            w = modwt(movement, 'bior3.9', 4)
-            dc = modwtmra(w, 'bior3.9')
-            wavelet_cycle = dc[4]
-            # ==========================================================================================================
-            # Vital Signs estimation - (10 seconds window is an optimal size for vital signs measurement)
-            limit = int(math.floor(data_stream_bcg.size / window_shift))
-            # ==========================================================================================================
-            # Heart Rate of BCG
-            bcg_bpm= heart_rate(start_point, end_point, window_shift, limit, wavelet_cycle, mpd=1, sig_type="bcg", plot=0)
-            
-            min_bcg = np.around(np.min(bcg_bpm))
-            max_bcg = np.around(np.max(bcg_bpm))
-            avg_bcg = np.around(np.mean(bcg_bpm))
-
-            # Replace the resampling code with:
-            window_size = len(rr_heart_rates) // len(bcg_bpm)
-            rr_heart_rates_resampled = np.array([
-                np.mean(rr_heart_rates[i:i+window_size]) 
-                for i in range(0, len(rr_heart_rates)-window_size+1, window_size)
-            ])
-
-            # Ensure both arrays have the same length
-            min_length = min(len(rr_heart_rates_resampled), len(bcg_bpm))
-            rr_heart_rates_resampled = rr_heart_rates_resampled[:min_length]
-            bcg_bpm = bcg_bpm[:min_length]
-
-            # Now calculate the metrics
-            mae = mean_absolute_error(rr_heart_rates_resampled, bcg_bpm)
-            rmse = root_mean_squared_error(rr_heart_rates_resampled, bcg_bpm)
-            mape = mean_absolute_percentage_error(rr_heart_rates_resampled, bcg_bpm)
-
-            print('\nHeart Rate Information:')
-            print("==========================================================================================================\n")
-            
-            print("Mean absolute error: ", mae)
-            print("==========================================================================================================")
-            print("Root mean square error: ", rmse)
-            print("==========================================================================================================")
-            print("Mean absolute percentage error: ", mape)
-            print("==========================================================================================================")
-            print("==========================================================================================================")
-            # ==========================================================================================================
-            # Write data
-            dataInfo.append([patient_id,rr_heart_rates_resampled,avg_bcg,mae,rmse,mape])
-            
-
-            
-        
-        # RR file heart rate
-            rr_hr_stats = {
-            'min': np.around(np.min(rr_heart_rates_resampled)),
-            'max': np.around(np.max(rr_heart_rates_resampled)),
-            'mean': np.around(np.mean(rr_heart_rates_resampled))
-        }
-        
-        # Print statistics
-            print('\nBCG Heart Rate Information')
-            print('Minimum pulse : ', min_bcg)
-            print('Maximum pulse : ', max_bcg)
-            print('Average pulse : ', avg_bcg)
-        
-            print('\nReference Heart Rate Information')
-            print('Minimum pulse : ', rr_hr_stats['min'])
-            print('Maximum pulse : ', rr_hr_stats['max'])
-            print('Average pulse : ', rr_hr_stats['mean'])
-        
-        # Calculate heart rate difference
-            hr_diff = np.abs(avg_bcg - rr_hr_stats['mean'])
-            print('\nHeart Rate Difference (BCG vs Reference):', hr_diff)
-
-            # Create analysis plots
-            create_analysis_plots(rr_heart_rates_resampled, bcg_bpm, patient_id, folder_path)
-
-
-
-
-
-
-
-
-
-
-
-
-dataInfo = pd.DataFrame(dataInfo)
-#dataInfo.to_csv("./results/patientinfo.csv", header=False)
-# ======================================================================================================================
-
-print('\nEnd processing ...')
+    print("Mean absolute error: ", metrics.mae)
+    print("==========================================================================================================")
+    print("Root mean square error: ", metrics.rmse)
+    print("==========================================================================================================")
+    print("Mean absolute percentage error: ", metrics.mape)
+    print("==========================================================================================================")
+    print("==========================================================================================================")
+
+    print('\nBCG Heart Rate Information')
+    print('Minimum pulse : ', np.around(metrics.bcg_min))
+    print('Maximum pulse : ', np.around(metrics.bcg_max))
+    print('Average pulse : ', np.around(metrics.bcg_mean))
+
+    print('\nReference Heart Rate Information')
+    print('Minimum pulse : ', np.around(metrics.reference_min))
+    print('Maximum pulse : ', np.around(metrics.reference_max))
+    print('Average pulse : ', np.around(metrics.reference_mean))
+
+    # Calculate heart rate difference
+    hr_diff = np.abs(np.around(metrics.bcg_mean) - np.around(metrics.reference_mean))
+    print('\nHeart Rate Difference (BCG vs Reference):', hr_diff)
+
+
+def main(root_dir, plots=True, segmented=False, profiler=DISABLED, planner_effort="FFTW_ESTIMATE"):
+    """
+    Runs every patient; profiler (a profiling.Profiler) records the stages of
+    each one, planner_effort is the FFTW planner effort of the wavelet transforms.
+    """
+    print('\nstart processing ...')
+    # FFTW plans for the wavelet transforms. Every recording has its own length, and measuring a
+    # plan of that size (FFTW_MEASURE) takes 10-100 s for a transform at most ~25% faster, so plans
+    # are estimated by default and need no wisdom. Measured plans are kept in the wisdom cache
+    # (outside the dataset) for the next run on recordings of the same lengths.
+    fftw_wisdom_path = default_wisdom_path() if planner_effort != "FFTW_ESTIMATE" else None
+    configure_fft(planner_effort=planner_effort, threads=1, wisdom_path=fftw_wisdom_path)
+
+    pipeline = BCGPipeline(segmented=segmented, profiler=profiler)
+    # Prepare the output structure
+    dataInfo = [["PatientID", "RR AVG", "AVG BCG", "MAE", "RMSE", "MAPE"]]
+
+    # Walk through each sub-folder
+    for folder_name in os.listdir(root_dir):
+        folder_path = os.path.join(root_dir, folder_name)
+        if not os.path.isdir(folder_path):
+            continue
+        # Extract patient ID (number from folder name like "X123")
+        patient_id = ''.join(filter(str.isdigit, folder_name))
+
+        # Look for CSV (or cached Parquet/NPZ/signal store) files inside this subfolder
+        for csv_file in find_patient_files(folder_path):
+            if os.stat(csv_file).st_size == 0:
+                continue
+            with profiler.patient(patient_id):
+                result = pipeline.process_patient(csv_file)
+                metrics = result.metrics
+                print_report(metrics)
+                dataInfo.append([patient_id, np.around(metrics.reference_mean), np.around(metrics.bcg_mean),
+                                 metrics.mae, metrics.rmse, metrics.mape])
+
+                # Windows with fewer than two BCG peaks have no rate
+                valid = result.rates['valid'] & ~np.isnan(result.reference_bpm)
+                # (the regression line and Pearson's r need two windows; an empty-bed night has none)
+                if plots and valid.sum() >= 2:
+                    with profiler.stage('plots', int(valid.sum())):
+                        create_analysis_plots(result.reference_bpm[valid], result.rates['bpm'][valid], patient_id,
+                                              folder_path)
+
+    if fftw_wisdom_path is not None:
+        save_wisdom(fftw_wisdom_path)
+    print('\nEnd processing ...')
+    return pd.DataFrame(dataInfo)
+
+
+if __name__ == "__main__":
+    warnings.simplefilter("ignore")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root_dir", nargs="?", default=r"G:\spring 2025\data analytics\project\dataset\dataset\data")
+    parser.add_argument("--no-plots", action="store_true", help="skip the correlation and Bland-Altman plots")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes; more than 1 runs batch_analysis (results table only: needs --no-plots)")
+    parser.add_argument("--segmented", action="store_true",
+                        help="process every segment between removed movements on its own")
+    parser.add_argument("--fftw-planner", default="FFTW_ESTIMATE", choices=PLANNER_EFFORTS,
+                        help="FFTW planner effort (other than FFTW_ESTIMATE: plans cached in the wisdom cache)")
+    parser.add_argument("--profile", default=None, help="write the stage profile to this .json or .csv file")
+    parser.add_argument("--profile-patient", default=None, help="run this patient ID under cProfile")
+    parser.add_argument("--profile-dump", default=None, help="cProfile output (default: profile_<patient>.prof)")
+    args = parser.parse_args()
+    if args.workers > 1:
+        # batch_analysis only writes the results table, with estimated FFTW plans
+        ignored = [option for option, given in (("--fftw-planner", args.fftw_planner != "FFTW_ESTIMATE"),
+                                                ("--profile-dump", args.profile_dump is not None),
+                                                ("plots (add --no-plots)", not args.no_plots)) if given]
+        if ignored:
+            parser.error(f"--workers > 1 does not support {', '.join(ignored)}")
+        from batch_analysis import run_batch
+        dataInfo = run_batch(args.root_dir, workers=args.workers, pipeline_options={'segmented': args.segmented},
+                             profile_path=args.profile, profile_patient=args.profile_patient).table
+    else:
+        profiler = Profiler(args.profile is not None or args.profile_patient is not None,
+                            args.profile_patient, args.profile_dump)
+        dataInfo = main(args.root_dir, plots=not args.no_plots, segmented=args.segmented, profiler=profiler,
+                        planner_effort=args.fftw_planner)
+        if profiler.enabled:
+            profiler.print_summary()
+            if args.profile is not None:
+                profiler.write(args.profile)
+    #dataInfo.to_csv("./results/patientinfo.csv", header=False)
@@ -0,0 +1,76 @@
+"""
+Overlap-save block MODWT multiresolution analysis for unbounded recordings.
+
+The MODWT of modwt_matlab_fft is circular over the whole signal, so its
+memory grows with the recording and nothing is available before the end.
+BlockMODWT transforms fixed-size blocks extended by a margin of M samples
+on both sides, where M + 1 = (2^J - 1)(L - 1) + 1 is the length of the level
+J equivalent filter (L: length of the pywt.Wavelet filters). The analysis
+cascade looks M samples back and the synthesis cascade M samples ahead, so
+the middle block_size samples of each extended block equal the full-signal
+MRA. Away from the first and last M samples of the recording (where the
+full-signal transform wraps around and this one sees zeros) the stitched
+output matches modwt_mra.
+"""
+
+import numpy as np
+import pywt
+
+from modwt_fused_fft import modwt_mra
+
+
+def equivalent_filter_length(wname, J):
+    """Length of the level J scaling (and wavelet) equivalent filter of the MODWT of wname."""
+    L = len(pywt.Wavelet(wname).rec_lo)
+    return (2 ** J - 1) * (L - 1) + 1
+
+
+class BlockMODWT:
+    """
+    Streaming MODWT MRA. process() takes consecutive blocks of any size and
+    returns the (len(levels), n) MRA samples completed so far; flush() returns
+    the rest. Output lags the input by margin samples plus up to one block.
+    All complete blocks available in one call are transformed as one batch.
+    Memory stays at about block_size + 2 * margin samples.
+    """
+
+    def __init__(self, wname, J, block_size=8192, levels=None):
+        self.wname = wname
+        self.J = J
+        self.levels = list(range(J + 1)) if levels is None else [int(level) for level in levels]
+        self.block_size = block_size
+        self.margin = equivalent_filter_length(wname, J) - 1
+        self.fft_length = block_size + 2 * self.margin
+        # Zeros before the first sample stand for the unknown past
+        self._buffer = np.zeros(self.margin)
+
+    def _transform(self, segments):
+        return modwt_mra(segments, self.wname, self.J, levels=self.levels)[..., self.margin:self.margin + self.block_size]
+
+    def process(self, block):
+        self._buffer = np.concatenate([self._buffer, np.asarray(block, dtype=np.float64)])
+        n_blocks = (self._buffer.size - 2 * self.margin) // self.block_size
+        if n_blocks <= 0:
+            return np.zeros((len(self.levels), 0))
+        windows = np.lib.stride_tricks.sliding_window_view(self._buffer, self.fft_length)[::self.block_size][:n_blocks]
+        mra = self._transform(windows)  # (n_blocks, len(levels), block_size)
+        self._buffer = self._buffer[n_blocks * self.block_size:]
+        return np.concatenate(list(mra), axis=-1)
+
+    def flush(self):
+        remaining = self._buffer.size - self.margin
+        if remaining <= 0:
+            return np.zeros((len(self.levels), 0))
+        # Zeros after the last sample stand for the unknown future; padded to the full
+        # extended block so the cached FFT plan is reused
+        segment = np.zeros(self.fft_length + max(remaining - self.block_size, 0))
+        segment[:self._buffer.size] = self._buffer
+        mra = modwt_mra(segment, self.wname, self.J, levels=self.levels)[..., self.margin:self.margin + remaining]
+        self._buffer = np.zeros(self.margin)
+        return mra
+
+
+def block_modwt_mra(x, wname, J, block_size=8192, levels=None):
+    """modwt_mra(x, wname, J, levels) computed block by block with BlockMODWT."""
+    transform = BlockMODWT(wname, J, block_size, levels)
+    return np.concatenate([transform.process(x), transform.flush()], axis=-1)
@@ -0,0 +1,83 @@
+
+import math
+import sys
+
+import numpy as np
+import pywt
+
+from fft_engine import get_engine
+from modwt_matlab_fft import modwt
+from modwt_mra_matlab_fft import modwtmra
+
+
+def modwt_mra(x, wname, J, levels=None, return_coefficients=False):
+    """
+    MODWT multiresolution analysis of x computed in the frequency domain,
+    equal (within float tolerance) to modwtmra(modwt(x, wname, J), wname, levels).
+
+    modwt and modwtmra inverse-FFT every coefficient row and FFT it again.
+    Here the row spectra are products of the input spectrum X with the
+    upsampled filter spectra, so the detail of level j + 1 is
+    ifft(X |Hup_j|^2 prod_{k<j} |Gup_k|^2) and the smooth
+    ifft(X prod_{k<J} |Gup_k|^2): one forward FFT and one inverse FFT per
+    requested row, without the (J + 1) x N coefficient matrix.
+    With return_coefficients=True the MODWT coefficients are returned as well,
+    as (mra, w). A (batch, N) array gives (batch, len(levels), N), like the
+    batched modwt and modwtmra.
+    """
+    x = np.asarray(x)
+    if x.ndim == 1 or x.shape[-1] == 1:
+        x = np.ravel(x)
+    datalength = x.shape[-1]
+
+    # % Check that the level of the transform does not exceed floor(log2(len(x))
+    Jmax = np.floor(math.log(datalength, 2))
+    if J <= 0 or J > Jmax:
+        print('Wavelet:modwt:MRALevel')
+        sys.exit()
+
+    if levels is None:
+        levels = range(J + 1)
+    levels = [int(level) for level in levels]
+    if not levels or any(level < 0 or level > J for level in levels):
+        print('Wavelet:modwt:MRALevel')
+        sys.exit()
+
+    # % Signals shorter than the filter are periodized by modwt: use the two-step path
+    if datalength < len(pywt.Wavelet(wname).rec_lo):
+        w = modwt(x, wname, J)
+        mra = modwtmra(w, wname, levels)
+        return (mra, w) if return_coefficients else mra
+
+    N = datalength
+    engine = get_engine()
+    G, H = engine.filter_spectra(wname, N)
+    X = engine.fft(x)
+
+    def upsampled(F, j):
+        return F[np.mod(2 ** j * np.arange(0, N), N)]
+
+    last = J if return_coefficients else max(levels)
+    mra = {}
+    w = []
+    cascade = np.ones(N)                     # prod_{k<j} |Gup_k|^2
+    scaling = np.ones(N, dtype=complex)      # prod_{k<j} Gup_k, for the coefficients
+    for j in range(last + 1):
+        if j < J:
+            Hup = upsampled(H, j)
+            if j in levels:
+                mra[j] = engine.ifft(X * (np.abs(Hup) ** 2 * cascade)).real
+            if return_coefficients:
+                w.append(engine.ifft(X * (Hup * scaling)).real)
+            Gup = upsampled(G, j)
+            cascade *= np.abs(Gup) ** 2
+            if return_coefficients:
+                scaling *= Gup
+        else:
+            if J in levels:
+                mra[J] = engine.ifft(X * cascade).real
+            if return_coefficients:
+                w.append(engine.ifft(X * scaling).real)
+
+    mra = np.stack([mra[level] for level in levels], axis=-2)
+    return (mra, np.stack(w, axis=-2)) if return_coefficients else mra
@@ -3,17 +3,25 @@ import math
 import sys
 
 import numpy as np
-import pyfftw
 import pywt
 
+from fft_engine import get_engine
+
 
 def modwt(x, wname, J):
-    # % Convert data to row vector
-    if x.shape[0] > 1:
-        x = x.flatten()
+    """
+    MODWT coefficients of x: (J + 1, N) for a 1-D signal or an (N, 1) column,
+    (batch, J + 1, N) for a (batch, N) array of equal-length signals (channels
+    of a mat, or segments). Batches are transformed along the last axis with
+    one FFT call, using the threads set with fft_engine.configure.
+    """
+    # % Convert column vectors to row vectors (a view when x is already contiguous, e.g. a memmap channel)
+    x = np.asarray(x)
+    if x.ndim == 1 or x.shape[-1] == 1:
+        x = np.ravel(x)
 
     # % Record original data length
-    datalength = x.size
+    datalength = x.shape[-1]
 
     # % Check that the level of the transform does not exceed floor(log2(len(x))
     Jmax = np.floor(math.log(datalength, 2))
@@ -22,7 +30,7 @@ def modwt(x, wname, J):
         sys.exit()
 
     # % obtain new signal length if needed
-    siglen = x.size
+    siglen = x.shape[-1]
     Nrep = siglen
 
     # % Scale the scaling and wavelet filters for the MODWT
@@ -41,23 +49,22 @@ def modwt(x, wname, J):
     # % If the signal length is less than the filter length, need to
     # % periodize the signal in order to use the DFT algorithm
     if siglen < len(Lo):
-        xp = np.tile(x, (1, len(Lo) - siglen))
-        x = np.append(x, xp)
-        Nrep = x.size
+        x = np.tile(x, len(Lo) - siglen + 1)
+        Nrep = x.shape[-1]
 
     # % Allocate coefficient array
     w = []  # np.zeros(shape=(J + 1, Nrep))
 
-    # % Obtain the DFT of the filters
-    G = pyfftw.interfaces.numpy_fft.fft(Lo, Nrep, planner_effort='FFTW_ESTIMATE', threads=1).T
-    H = pyfftw.interfaces.numpy_fft.fft(Hi, Nrep, planner_effort='FFTW_ESTIMATE', threads=1).T
+    # % Obtain the DFT of the filters (cached per wavelet and length)
+    engine = get_engine()
+    G, H = engine.filter_spectra(wname, Nrep)
 
     # %Obtain the DFT of the data
-    Vhat = pyfftw.interfaces.numpy_fft.fft(x, planner_effort='FFTW_ESTIMATE').T
+    Vhat = engine.fft(x)
 
     # % [Vhat,What] = modwtfft(X,G,H,J)
     def modwtdec(X, G, H, J):
-        N = X.size
+        N = X.shape[-1]
         upfactor = 2 ** J
         Gup = G[np.mod(upfactor * np.arange(0, N), N)]
         Hup = H[np.mod(upfactor * np.arange(0, N), N)]
@@ -68,8 +75,8 @@ def modwt(x, wname, J):
     # % Main MODWT algorithm
     for jj in range(J):
         [Vhat, What] = modwtdec(Vhat, G, H, jj)
-        w.append(pyfftw.interfaces.numpy_fft.ifft(What, planner_effort='FFTW_ESTIMATE', threads=1).real)
-    w.append(pyfftw.interfaces.numpy_fft.ifft(Vhat, planner_effort='FFTW_ESTIMATE', threads=1).real)
-    w = np.vstack(w)
-    w = w[:, 0:siglen]
+        w.append(engine.ifft(What).real)
+    w.append(engine.ifft(Vhat).real)
+    w = np.stack(w, axis=-2)
+    w = w[..., 0:siglen]
     return w
@@ -2,80 +2,66 @@
 import sys
 
 import numpy as np
-import pyfftw
 import pywt
 
+from fft_engine import get_engine
 
-def modwtmra(w, wname):
-    # % The input to modwtmra must be a matrix
-    if w.shape[0] == 1 and w.shape[1] > 1 or w.shape[0] > 1 and w.shape[1] == 1:
+
+def modwtmra(w, wname, levels=None):
+    """
+    MODWT multiresolution analysis of the coefficients w (J0 + 1 rows).
+
+    Row j < J0 of the result is the detail of level j + 1 and row J0 the
+    smooth. With levels (row indices, e.g. [J0] for the smooth only) only
+    those rows are reconstructed, in the order given. The inverse cascade of
+    each row is one product of upsampled filter spectra, so every row costs
+    one forward and one inverse FFT. A (batch, J0 + 1, N) array from a
+    batched modwt gives (batch, len(levels), N), with one FFT call per row
+    for the whole batch.
+    """
+    # % The input to modwtmra must be a matrix (or a batch of matrices)
+    w = np.asarray(w)
+    if w.ndim < 2 or w.shape[-2] == 1 or w.shape[-1] == 1:
         print('Wavelet:modwt:MRASize')
         sys.exit()
 
     # % get the size of the output coefficients
-    cfslength = w.shape[1]
-    J0 = w.shape[0] - 1
-
-    nullinput = np.zeros(cfslength)
+    cfslength = w.shape[-1]
+    J0 = w.shape[-2] - 1
     N = cfslength
 
+    if levels is None:
+        levels = range(J0 + 1)
+    levels = [int(level) for level in levels]
+    if not levels or any(level < 0 or level > J0 for level in levels):
+        print('Wavelet:modwt:MRALevel')
+        sys.exit()
+
     # % Scale the scaling and wavelet filters for the MODWT
     wavelet = pywt.Wavelet(wname)
-    Lo = wavelet.rec_lo
-    Hi = wavelet.rec_hi
-    Lo = np.array(Lo) / np.sqrt(2)
-    Hi = np.array(Hi) / np.sqrt(2)
+    Lo = np.array(wavelet.rec_lo) / np.sqrt(2)
 
     if cfslength < len(Lo):
-        wp = np.tile(w, (1, len(Lo) - cfslength))
-        w = np.append(w, wp, axis=1)
-        cfslength = w.shape[1]
-        nullinput = np.zeros(cfslength)
-
-    G = pyfftw.interfaces.numpy_fft.fft(Lo, cfslength, planner_effort='FFTW_ESTIMATE', threads=1).T
-    H = pyfftw.interfaces.numpy_fft.fft(Hi, cfslength, planner_effort='FFTW_ESTIMATE', threads=1).T
-
-    # % Allocate array for MRA
-    mra = []  # np.zeros(shape=(J0 + 1, N))
-
-    def imodwtrec(Vin, Win, G, H, J):
-        N = Vin.size
-        Vhat = pyfftw.interfaces.numpy_fft.fft(Vin, planner_effort='FFTW_ESTIMATE', threads=1).T
-        What = pyfftw.interfaces.numpy_fft.fft(Win, planner_effort='FFTW_ESTIMATE', threads=1).T
-        upfactor = 2 ** J
-        Gup = np.conj(G[np.mod(upfactor * np.arange(0, N), N)])
-        Hup = np.conj(H[np.mod(upfactor * np.arange(0, N), N)])
-        Vout = pyfftw.interfaces.numpy_fft.ifft(np.multiply(Gup, Vhat) + np.multiply(Hup, What),
-                                                planner_effort='FFTW_ESTIMATE', threads=1).real
-        return Vout
+        w = np.tile(w, len(Lo) - cfslength + 1)
+        cfslength = w.shape[-1]
 
-    def imodwtDetails(coefs, nullinput, lev, Lo, Hi, N):
-        v = nullinput
-        w = coefs
-        for jj in range(lev + 1, 0, -1):
-            vout = imodwtrec(v, w, Lo, Hi, jj - 1)
-            w = nullinput
-            v = vout
-        details = v[0:N]
-        return details
+    engine = get_engine()
+    G, H = engine.filter_spectra(wname, cfslength)
 
-    def imodwtSmooth(scalingcoefs, nullinput, Lo, Hi, N, J0):
-        v = scalingcoefs
-        for J in range(J0 + 1, 0, -1):
-            vout = imodwtrec(v, nullinput, Lo, Hi, J - 1)
-            v = vout
-        smooth = v[0:N]
-        return smooth
+    def upsampled(F, J):
+        return F[np.mod(2 ** J * np.arange(0, cfslength), cfslength)]
 
-    # % Main MRA - MODWT algorithm
-    for J in range(J0, 0, -1):
-        wcfs = w[J - 1]
-        details = imodwtDetails(wcfs, nullinput, J - 1, G, H, cfslength)
-        details = details[0:N]
-        mra.append(details)
-    scalingcoefs = w[J0:]
-    smooth = imodwtSmooth(scalingcoefs.flatten(), nullinput, G, H, cfslength, J0 - 1)
-    mra = mra[::-1]
-    mra.append(smooth[0: N])
-    mra = np.vstack(mra)
-    return mra
+    # % Main MRA - MODWT algorithm: the details of level J go through conj(Hup_J)
+    # % and then conj(Gup_k) for k < J, the smooth through conj(Gup_k) for k < J0
+    mra = {}
+    cascade = np.ones(cfslength, dtype=complex)  # shared by the whole batch
+    for J in range(max(levels) + 1):
+        if J in levels:
+            if J < J0:
+                spectrum = engine.fft(w[..., J, :]) * (np.conj(upsampled(H, J)) * cascade)
+            else:
+                spectrum = engine.fft(w[..., J0, :]) * cascade
+            mra[J] = engine.ifft(spectrum).real[..., 0:N]
+        if J < max(levels):
+            cascade *= np.conj(upsampled(G, J))
+    return np.stack([mra[level] for level in levels], axis=-2)
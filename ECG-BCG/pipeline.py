@@ -0,0 +1,255 @@
+"""
+BCG heart-rate pipeline as a reusable API.
+
+BCGPipeline runs the processing chain of main.py (movement removal,
+band-pass filtering, wavelet cycle, windowed heart rate, comparison with the
+reference heart rate) on an in-memory signal with process_signal, or on a
+resampled recording file with process_patient, and returns a PipelineResult.
+With segmented=True the movement removal yields a segment index instead of
+a shortened signal, and every clean segment is filtered and analysed on its
+own (optionally on a thread pool), so no window or filter spans a gap.
+Plotting and printing are left to the caller, and only numpy/scipy/pywt/pyfftw
+are imported, so a worker or a service can build the pipeline once and call
+it for every recording.
+"""
+
+import contextlib
+import glob
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from band_pass_filtering import band_pass_filtering
+from columnar_cache import file_format_of, read_table
+from compute_rate import RATE_DTYPE, TIMED_RATE_DTYPE
+from detect_body_movements import detect_patterns, detect_segments, segment_index
+from fft_engine import clear_caches as clear_fft_caches
+from heart_rate import window_heart_rates
+from modwt_fused_fft import modwt_mra
+from profiling import DISABLED
+from signal_info import WINDOW_SECONDS, SignalInfo, info_from_timestamps, wavelet_level, window_samples
+from signal_store import SIGNAL_STORE_EXTENSION, open_signal_store
+
+# Result of one recording: rates is the RATE_DTYPE array of the BCG windows (TIMED_RATE_DTYPE, in
+# samples of the original signal, when segmented), reference_bpm the reference heart rate of the
+# same windows, timings the seconds spent in each stage, segments the SEGMENT_DTYPE index (segmented only)
+PipelineResult = namedtuple('PipelineResult', ['info', 'rates', 'reference_bpm', 'metrics', 'timings', 'segments'],
+                            defaults=(None,))
+
+# Agreement between the valid BCG windows and the reference (bpm, MAPE as a fraction)
+HeartRateMetrics = namedtuple('HeartRateMetrics', [
+    'mae', 'rmse', 'mape',
+    'bcg_min', 'bcg_max', 'bcg_mean',
+    'reference_min', 'reference_max', 'reference_mean',
+    'n_windows', 'n_valid',
+])
+
+
+def find_patient_files(folder_path):
+    """One file per recording in folder_path, preferring the signal store over NPZ, Parquet and CSV"""
+    preference = [SIGNAL_STORE_EXTENSION] + ['.' + f for f in ('npz', 'parquet', 'csv')]
+    recordings = {}
+    for extension in reversed(preference):
+        for path in glob.glob(os.path.join(folder_path, f"*{extension}")):
+            recordings[os.path.splitext(path)[0]] = path
+    return sorted(recordings.values())
+
+
+def load_patient_data(path):
+    """
+    Loads a resampled recording as (array of [BCG, time, heart rate] rows, SignalInfo).
+    Signal stores are memory-mapped (the columns are zero-copy views) and carry
+    their sampling frequency; CSV, Parquet and NPZ files are read into memory
+    and their sampling frequency is taken from the timestamps.
+    """
+    if path.endswith(SIGNAL_STORE_EXTENSION):
+        store = open_signal_store(path)
+        return store.data.T, SignalInfo(store.fs, store.start_epoch_ms)
+    if file_format_of(path) == 'csv':
+        data = pd.read_csv(path, sep=None, header=None, skiprows=1, engine="python").values
+    else:
+        data = read_table(path, parse_dates=False).values
+    return data, info_from_timestamps(data[:, 1])
+
+
+def window_reference(ref_time, ref_hr, bcg_time, window, n_windows):
+    """
+    Mean reference heart rate of each of the n_windows BCG windows, matched by
+    time rather than by index. bcg_time holds the timestamps of the BCG samples
+    (after detect_patterns, so window k is bcg_time[k * window:(k + 1) * window]);
+    every one of them takes the reference sample at or before its timestamp,
+    and the window gets their mean. A window across a removed movement thus
+    averages the reference over the samples it actually kept. NaN for a window
+    without any reference sample (before the first one, or all NaN).
+    """
+    ref_time = np.asarray(ref_time, dtype=np.float64)
+    ref_hr = np.asarray(ref_hr, dtype=np.float64)
+    n = n_windows * window
+    if n == 0 or ref_hr.size == 0:
+        return np.full(n_windows, np.nan)
+    bcg_time = np.asarray(bcg_time[:n], dtype=np.float64)
+    starts = np.arange(n_windows) * window
+    # detect_patterns removes whole windows, so a window's timestamps are usually consecutive reference
+    # timestamps: search the window starts only, and the other samples where that guess is wrong
+    idx = (np.searchsorted(ref_time, bcg_time[starts], side='right') - 1)[:, None] + np.arange(window)
+    idx = idx.ravel()
+    exact = (idx >= 0) & (idx < ref_time.size)
+    exact[exact] = ref_time[idx[exact]] == bcg_time[exact]
+    idx[~exact] = np.searchsorted(ref_time, bcg_time[~exact], side='right') - 1
+    values = ref_hr[np.maximum(idx, 0)]
+    known = (idx >= 0) & ~np.isnan(values)
+    sums = np.add.reduceat(np.where(known, values, 0.0), starts)
+    counts = np.add.reduceat(known.astype(np.int64), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def heart_rate_metrics(reference, bcg, n_windows):
+    """MAE, RMSE and MAPE (as sklearn.metrics computes them) plus the rate statistics."""
+    if bcg.size == 0:
+        return HeartRateMetrics(*[np.nan] * 9, n_windows, 0)
+    error = bcg - reference
+    mape = np.mean(np.abs(error) / np.maximum(np.abs(reference), np.finfo(np.float64).eps))
+    return HeartRateMetrics(
+        float(np.mean(np.abs(error))), float(np.sqrt(np.mean(error ** 2))), float(mape),
+        float(np.min(bcg)), float(np.max(bcg)), float(np.mean(bcg)),
+        float(np.min(reference)), float(np.max(reference)), float(np.mean(reference)),
+        n_windows, int(bcg.size))
+
+
+class BCGPipeline:
+    """
+    The heart-rate chain of main.py with its parameters fixed once:
+    detect_patterns (remove_movements), band_pass_filtering(filter_type),
+    the modwt_mra smooth of wavelet_level(fs) with wname, and
+    window_heart_rates over window_seconds windows with mpd.
+
+    segmented=True runs the chain per detect_segments segment (segment_workers
+    threads, 1: in the calling thread); a segment's trailing partial window has
+    no rate.
+
+    Every stage is timed into PipelineResult.timings, and recorded by
+    `profiler` (a profiling.Profiler) when one is given.
+    """
+
+    def __init__(self, wname='bior3.9', window_seconds=WINDOW_SECONDS, mpd=1, filter_type="bcg",
+                 remove_movements=True, segmented=False, segment_workers=1, profiler=None):
+        self.wname = wname
+        self.window_seconds = window_seconds
+        self.mpd = mpd
+        self.filter_type = filter_type
+        self.remove_movements = remove_movements
+        self.segmented = segmented
+        self.segment_workers = segment_workers
+        self.profiler = profiler or DISABLED
+
+    def process_signal(self, bcg, timestamps, ref_hr, fs):
+        """Heart rate of a BCG signal sampled at fs Hz, compared with the reference heart rate ref_hr."""
+        timings = {}
+        bcg = np.asarray(bcg, dtype=np.float64)
+        timestamps = np.asarray(timestamps)
+        info = SignalInfo(fs, float(timestamps[0]) if timestamps.size else None)
+        window = window_samples(fs, self.window_seconds)
+        if self.segmented:
+            return self._process_segments(bcg, timestamps, ref_hr, info, window, timings)
+
+        ref_time = timestamps
+        if self.remove_movements:
+            with self._stage(timings, 'detect_patterns', bcg.size):
+                bcg, timestamps = detect_patterns(0, window, window, bcg, timestamps, plot=0, fs=fs)
+
+        limit = bcg.size // window
+        if limit == 0:
+            # No complete window left (e.g. an empty bed): nothing to filter, and sosfiltfilt
+            # would reject a signal shorter than its padding
+            rates = np.empty(0, dtype=RATE_DTYPE)
+        else:
+            with self._stage(timings, 'band_pass', bcg.size):
+                movement = band_pass_filtering(bcg, fs, self.filter_type)
+
+            with self._stage(timings, 'wavelet', bcg.size):
+                level = wavelet_level(fs)
+                # (too short a signal for the level has no complete window anyway)
+                wavelet_cycle = modwt_mra(movement, self.wname, level, levels=[level])[0] if bcg.size >= 2 ** level else movement
+
+            with self._stage(timings, 'heart_rate', limit):
+                rates = window_heart_rates(wavelet_cycle, 0, window, window, limit, self.mpd, fs)
+
+        with self._stage(timings, 'reference', limit):
+            reference_bpm = window_reference(ref_time, ref_hr, timestamps, window, limit)
+        with self._stage(timings, 'metrics', limit):
+            # Windows with fewer than two BCG peaks, or without reference samples, are left out
+            valid = rates['valid'] & ~np.isnan(reference_bpm)
+            metrics = heart_rate_metrics(reference_bpm[valid], rates['bpm'][valid], rates.size)
+        return PipelineResult(info, rates, reference_bpm, metrics, timings)
+
+    def _process_segments(self, bcg, timestamps, ref_hr, info, window, timings):
+        with self._stage(timings, 'detect_patterns', bcg.size):
+            if self.remove_movements:
+                segments = detect_segments(0, window, window, bcg, timestamps, fs=info.fs)
+            else:
+                segments = segment_index(np.ones(bcg.size, dtype=bool), timestamps)
+
+        def process(segment):
+            return self._process_segment(bcg, timestamps, segment, info.fs, window)
+
+        # Band-pass, wavelet and heart rate, timed together (the segments may run on several threads)
+        with self._stage(timings, 'segments', int(np.sum(segments['end_sample'] - segments['start_sample']))):
+            if self.segment_workers > 1 and segments.size > 1:
+                with ThreadPoolExecutor(self.segment_workers) as executor:
+                    parts = list(executor.map(process, segments))
+            else:
+                parts = [process(segment) for segment in segments]
+            rates = np.concatenate(parts) if parts else np.empty(0, dtype=TIMED_RATE_DTYPE)
+
+        with self._stage(timings, 'reference', rates.size):
+            window_time = timestamps[(rates['window_start'][:, None] + np.arange(window)).ravel()]
+            reference_bpm = window_reference(timestamps, ref_hr, window_time, window, rates.size)
+        with self._stage(timings, 'metrics', rates.size):
+            valid = rates['valid'] & ~np.isnan(reference_bpm)
+            metrics = heart_rate_metrics(reference_bpm[valid], rates['bpm'][valid], rates.size)
+        return PipelineResult(info, rates, reference_bpm, metrics, timings, segments)
+
+    def _process_segment(self, bcg, timestamps, segment, fs, window):
+        """Band-pass, wavelet and rate stages on one segment; TIMED_RATE_DTYPE records in samples of bcg."""
+        start, end = int(segment['start_sample']), int(segment['end_sample'])
+        n_windows = (end - start) // window
+        timed = np.empty(n_windows, dtype=TIMED_RATE_DTYPE)
+        if n_windows == 0:
+            return timed
+        movement = band_pass_filtering(bcg[start:end], fs, self.filter_type)
+        level = wavelet_level(fs)
+        wavelet_cycle = modwt_mra(movement, self.wname, level, levels=[level])[0]
+        rates = window_heart_rates(wavelet_cycle, 0, window, window, n_windows, self.mpd, fs)
+        for name in RATE_DTYPE.names:
+            timed[name] = rates[name]
+        timed['window_start'] += start
+        timed['window_end'] += start
+        timed['start_epoch_ms'] = timestamps[timed['window_start']]
+        timed['end_epoch_ms'] = timestamps[timed['window_end'] - 1]
+        return timed
+
+    def process_patient(self, path):
+        """process_signal on a resampled recording file ([BCG, time, heart rate] columns, see load_patient_data)."""
+        timings = {}
+        with self._stage(timings, 'load', os.path.getsize(path)):
+            data, info = load_patient_data(path)
+        try:
+            result = self.process_signal(data[:, 0], data[:, 1], data[:, 2], info.fs)
+        finally:
+            # The FFT plans are sized to this recording; the next one has another length
+            clear_fft_caches()
+        result.timings.update(timings)
+        return result._replace(info=info)
+
+    @contextlib.contextmanager
+    def _stage(self, timings, stage, size):
+        """Times a stage into timings, and into the profiler (with the input size) when it is enabled."""
+        t0 = time.perf_counter()
+        with self.profiler.stage(stage, size):
+            yield
+        timings[stage] = time.perf_counter() - t0
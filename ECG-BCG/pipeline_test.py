@@ -0,0 +1,117 @@
+import unittest
+
+import numpy as np
+
+from benchmark_bed_server import make_bed_signal
+from benchmark_reference_alignment import legacy_reference
+from benchmark_sampling_rate import make_bcg_with_heart_rate
+from compute_rate import RATE_DTYPE
+from pipeline import BCGPipeline, window_reference
+
+
+class WindowReferenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.time = 1.7e12 + np.arange(1000) * 20.0  # 50 Hz
+        self.ref_hr = 60 + np.arange(1000) / 10       # a different rate at every sample
+
+    def test_no_removal_matches_index_chunks(self):
+        np.testing.assert_allclose(window_reference(self.time, self.ref_hr, self.time, 100, 10),
+                                   legacy_reference(self.ref_hr, 10), rtol=1e-14)
+
+    def test_removed_windows(self):
+        # Windows 2, 3 and 7 of 100 samples removed by the movement detection
+        keep = np.ones(1000, dtype=bool)
+        keep[200:400] = keep[700:800] = False
+        kept = np.flatnonzero(keep)
+        reference = window_reference(self.time, self.ref_hr, self.time[keep], 100, 7)
+        np.testing.assert_allclose(reference, self.ref_hr[kept].reshape(7, 100).mean(axis=1), rtol=1e-14)
+
+    def test_window_across_a_gap(self):
+        keep = np.ones(1000, dtype=bool)
+        keep[150:250] = False
+        reference = window_reference(self.time, self.ref_hr, self.time[keep], 100, 9)
+        self.assertAlmostEqual(reference[1], np.mean(np.r_[self.ref_hr[100:150], self.ref_hr[250:300]]))
+
+    def test_reference_at_a_lower_rate(self):
+        # One reference value per second: every BCG sample takes the last value at or before it
+        ref_time, ref_hr = self.time[::50], self.ref_hr[::50]
+        reference = window_reference(ref_time, ref_hr, self.time, 100, 10)
+        np.testing.assert_allclose(reference, (ref_hr[0::2] + ref_hr[1::2]) / 2, rtol=1e-14)
+
+    def test_nan_and_missing_reference(self):
+        ref_hr = self.ref_hr.copy()
+        ref_hr[100:150] = np.nan   # half of window 1 missing
+        bcg_time = self.time - 1000.0  # the first 50 BCG samples precede the reference
+        ref_hr[250:350] = np.nan   # window 3 (shifted by 50 samples) missing
+        reference = window_reference(self.time, ref_hr, bcg_time, 100, 10)
+        self.assertAlmostEqual(reference[0], np.mean(ref_hr[0:50]))
+        self.assertAlmostEqual(reference[1], np.mean(ref_hr[50:100]))
+        self.assertTrue(np.isnan(reference[3]))
+        self.assertAlmostEqual(reference[4], np.mean(ref_hr[350:450]))
+
+    def test_empty(self):
+        self.assertEqual(window_reference(self.time, self.ref_hr, self.time, 100, 0).size, 0)
+        self.assertTrue(np.isnan(window_reference(self.time[:0], self.ref_hr[:0], self.time, 100, 3)).all())
+
+
+class SegmentedPipelineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fs = 50.0
+        n = int(1800 * cls.fs)
+        cls.bcg = make_bed_signal(n, cls.fs, 0)
+        cls.ref_hr = make_bcg_with_heart_rate(n, cls.fs)[1]
+        cls.time = 1.7e12 + np.arange(n) * 1000 / cls.fs
+
+    def process(self, **kwargs):
+        return BCGPipeline(**kwargs).process_signal(self.bcg, self.time, self.ref_hr, self.fs)
+
+    def test_equal_to_contiguous_without_removal(self):
+        contiguous = self.process(remove_movements=False)
+        segmented = self.process(remove_movements=False, segmented=True)
+        self.assertEqual(segmented.segments.size, 1)
+        for name in RATE_DTYPE.names:
+            np.testing.assert_array_equal(segmented.rates[name], contiguous.rates[name])
+        np.testing.assert_array_equal(segmented.reference_bpm, contiguous.reference_bpm)
+        self.assertEqual(segmented.metrics, contiguous.metrics)
+
+    def test_windows_stay_within_segments(self):
+        result = self.process(segmented=True)
+        rates, segments = result.rates, result.segments
+        self.assertGreater(segments.size, 1)
+        self.assertEqual(rates.size, np.sum((segments['end_sample'] - segments['start_sample']) // 500))
+        segment_of = np.searchsorted(segments['start_sample'], rates['window_start'], side='right') - 1
+        self.assertTrue((rates['window_end'] <= segments['end_sample'][segment_of]).all())
+        np.testing.assert_array_equal(rates['start_epoch_ms'], self.time[rates['window_start']])
+        np.testing.assert_array_equal(rates['end_epoch_ms'], self.time[rates['window_end'] - 1])
+        # The rate follows the reference heart rate of its own time span
+        self.assertLess(result.metrics.mae, 2.0)
+
+    def test_threads_give_the_same_rates(self):
+        serial = self.process(segmented=True)
+        threaded = self.process(segmented=True, segment_workers=3)
+        np.testing.assert_array_equal(threaded.rates, serial.rates)
+
+    def test_every_window_removed(self):
+        result = BCGPipeline(segmented=True).process_signal(np.zeros(5000), self.time[:5000], self.ref_hr[:5000],
+                                                            self.fs)
+        self.assertEqual(result.segments.size, 0)
+        self.assertEqual(result.rates.size, 0)
+        self.assertTrue(np.isnan(result.metrics.mae))
+
+    def test_every_window_removed_contiguous(self):
+        # An empty bed leaves nothing to filter; the result matches the segmented one
+        for n in (5000, 5009):
+            with self.subTest(n=n):
+                result = BCGPipeline().process_signal(np.zeros(n), self.time[:n], self.ref_hr[:n], self.fs)
+                self.assertEqual(result.rates.dtype, RATE_DTYPE)
+                self.assertEqual(result.rates.size, 0)
+                self.assertEqual(result.reference_bpm.size, 0)
+                self.assertTrue(np.isnan(result.metrics.mae))
+                self.assertEqual(result.metrics.n_windows, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
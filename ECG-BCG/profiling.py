@@ -0,0 +1,170 @@
+"""
+Per-stage profiling of the BCG pipeline.
+
+A Profiler records, for every named stage run inside `with
+profiler.stage(name, size)`: the wall time, the CPU time of the process, the
+growth of the peak resident set size (RSS) and the input size given by the
+caller (samples, bytes, windows...). `with profiler.patient(patient_id)`
+attributes the stages to a patient, and runs that patient under cProfile
+when it is the one chosen with profile_patient. The records are aggregated
+per patient and stage and per stage over the cohort, and written as JSON
+or CSV.
+
+A disabled profiler (DISABLED, or Profiler(enabled=False)) returns the same
+do-nothing context manager for every stage and records nothing.
+
+The peak RSS comes from resource.getrusage, which Windows does not have: the
+RSS delta is NaN there. It is the growth of the process peak, so a stage
+that only reuses memory freed by an earlier stage shows 0.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# One run of a stage: seconds of wall and CPU time, peak RSS growth in KiB, caller-defined input size
+StageRecord = namedtuple('StageRecord', ['patient', 'stage', 'wall_seconds', 'cpu_seconds', 'rss_delta_kb',
+                                         'input_size'])
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB (NaN without the resource module)."""
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in KiB elsewhere
+    return peak / 1024 if sys.platform == 'darwin' else float(peak)
+
+
+class Profiler:
+    """
+    Stage timings of one process. profile_patient names the patient to run
+    under cProfile; its statistics are dumped to profile_path (pstats format,
+    default profile_<patient>.prof).
+    """
+
+    def __init__(self, enabled=True, profile_patient=None, profile_path=None):
+        self.enabled = enabled
+        self.profile_patient = profile_patient
+        self.profile_path = profile_path
+        self.records = []
+        self.current_patient = None
+
+    def stage(self, name, size=None):
+        """Context manager recording one run of the stage `name` on an input of `size`."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._stage(name, size)
+
+    @contextlib.contextmanager
+    def _stage(self, name, size):
+        rss0 = peak_rss_kb()
+        cpu0 = time.process_time()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            cpu = time.process_time() - cpu0
+            self.records.append(StageRecord(self.current_patient, name, wall, cpu, peak_rss_kb() - rss0, size))
+
+    def patient(self, patient_id):
+        """Context manager attributing the stages run inside it to patient_id."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._patient(patient_id)
+
+    @contextlib.contextmanager
+    def _patient(self, patient_id):
+        previous, self.current_patient = self.current_patient, patient_id
+        profile = None
+        if self.profile_patient is not None and str(patient_id) == str(self.profile_patient):
+            import cProfile
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                profile.dump_stats(self.profile_path or f"profile_{patient_id}.prof")
+            self.current_patient = previous
+
+    def take(self):
+        """Returns the records so far and starts a new list (to send them from a worker)."""
+        records, self.records = self.records, []
+        return records
+
+    def table(self):
+        """The records as a DataFrame, one row per stage run."""
+        import pandas as pd
+
+        return pd.DataFrame(self.records, columns=StageRecord._fields)
+
+    def summary(self):
+        """
+        (per_patient, cohort) DataFrames: calls, total, mean and max wall time,
+        total CPU time, largest RSS delta and total input size per (patient,
+        stage), and the same per stage over all patients.
+        """
+        table = self.table()
+        aggregations = dict(calls=('wall_seconds', 'size'), wall_seconds=('wall_seconds', 'sum'),
+                            mean_wall_seconds=('wall_seconds', 'mean'), max_wall_seconds=('wall_seconds', 'max'),
+                            cpu_seconds=('cpu_seconds', 'sum'), max_rss_delta_kb=('rss_delta_kb', 'max'),
+                            input_size=('input_size', 'sum'))
+        per_patient = table.groupby(['patient', 'stage'], sort=False, dropna=False).agg(**aggregations).reset_index()
+        cohort = table.groupby('stage', sort=False).agg(**aggregations).reset_index()
+        cohort['share'] = cohort['wall_seconds'] / cohort['wall_seconds'].sum() if len(cohort) else []
+        return per_patient, cohort
+
+    def write(self, path):
+        """
+        Writes the records by extension: .json holds the records and both
+        summaries, .csv the records (the summaries go to <name>_patients.csv
+        and <name>_cohort.csv next to it).
+        """
+        per_patient, cohort = self.summary()
+        if path.endswith('.json'):
+            content = {
+                'records': [r._asdict() for r in self.records],
+                'per_patient': per_patient.to_dict(orient='records'),
+                'cohort': cohort.to_dict(orient='records'),
+            }
+            with open(path, 'w') as f:
+                json.dump(content, f, indent=1, default=_json_default)
+        elif path.endswith('.csv'):
+            base = os.path.splitext(path)[0]
+            self.table().to_csv(path, index=False)
+            per_patient.to_csv(base + '_patients.csv', index=False)
+            cohort.to_csv(base + '_cohort.csv', index=False)
+        else:
+            raise ValueError(f"Unknown profile format '{path}', expected .json or .csv")
+
+    def print_summary(self):
+        cohort = self.summary()[1].sort_values('wall_seconds', ascending=False)
+        print("\nStage profile")
+        print("==========================================================================================================")
+        print(f"{'stage':<18}{'calls':>7}{'wall [s]':>11}{'mean [ms]':>11}{'max [ms]':>10}{'cpu [s]':>10}"
+              f"{'share':>8}{'max RSS delta [MiB]':>21}")
+        for row in cohort.itertuples():
+            print(f"{row.stage:<18}{row.calls:>7}{row.wall_seconds:>11.3f}{row.mean_wall_seconds * 1e3:>11.1f}"
+                  f"{row.max_wall_seconds * 1e3:>10.1f}{row.cpu_seconds:>10.3f}{row.share:>8.1%}"
+                  f"{row.max_rss_delta_kb / 1024:>21.1f}")
+
+
+def _json_default(value):
+    # numpy scalars in the summaries
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+DISABLED = Profiler(enabled=False)
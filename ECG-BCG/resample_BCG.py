@@ -1,17 +1,128 @@
+from fractions import Fraction
+
 import numpy as np
 import pandas as pd
-from scipy.signal import resample
+from scipy.signal import firwin, resample, resample_poly
+
+from columnar_cache import read_table, write_table
+
+RESAMPLE_METHODS = ('fft', 'poly')
 
-def downsample_general(df, original_fs, new_fs, bcg_col='BCG', timestamp_col='Timestamp_x', hr_col='Heart Rate'):
+def polyphase_factors(original_fs, new_fs, max_denominator=1000):
+        """Returns (up, down) with up / down == new_fs / original_fs, e.g. (5, 14) for 140 -> 50 Hz."""
+        ratio = Fraction(new_fs / original_fs).limit_denominator(max_denominator)
+        return ratio.numerator, ratio.denominator
+
+class PolyphaseResampler:
+        """
+        Streaming rational resampler, equivalent to scipy.signal.resample_poly
+        (same Kaiser-windowed FIR design, zero padding at both ends).
+
+        Feed blocks of any size to process(); each call returns the output samples
+        that are fully determined by the input seen so far. flush() returns the
+        remaining samples, so the concatenated output equals resample_poly(x, up, down)
+        to floating point precision. Only the last ceil(len(h) / up) input samples
+        are carried between blocks. When both rates are equal the blocks are
+        passed through unchanged, like resample_poly does.
+        """
+
+        def __init__(self, original_fs, new_fs, window=('kaiser', 5.0), max_block_outputs=32768):
+                self.up, self.down = polyphase_factors(original_fs, new_fs)
+                self.n_in = 0
+                self.n_out = 0
+                if self.up == self.down:
+                        return  # no filter (firwin rejects the cutoff of 1)
+                max_rate = max(self.up, self.down)
+                self.half_len = 10 * max_rate
+                h = firwin(2 * self.half_len + 1, 1. / max_rate, window=window) * self.up
+
+                # Polyphase decomposition: phase p uses h[p], h[p + up], h[p + 2 up], ...
+                self.taps = -(-len(h) // self.up)
+                h = np.concatenate((h, np.zeros(self.taps * self.up - len(h))))
+                self.phases = h.reshape(self.taps, self.up).T.copy()
+                self.max_block_outputs = max_block_outputs
+
+                # Input history; buffer[0] holds input sample number buffer_start (negative = leading zeros)
+                self.buffer = np.zeros(self.taps - 1)
+                self.buffer_start = -(self.taps - 1)
+
+        def _compute(self, m_end):
+                """Output samples self.n_out .. m_end - 1 (their input must be in the buffer)."""
+                outputs = []
+                lag = np.arange(self.taps)
+                for m0 in range(self.n_out, m_end, self.max_block_outputs):
+                        m = np.arange(m0, min(m0 + self.max_block_outputs, m_end))
+                        n = m * self.down + self.half_len  # position on the upsampled grid
+                        base = n // self.up - self.buffer_start
+                        x = self.buffer[base[:, None] - lag[None, :]]
+                        outputs.append(np.einsum('ij,ij->i', x, self.phases[n % self.up]))
+                self.n_out = max(self.n_out, m_end)
+
+                # Keep only the history the next output still needs
+                next_base = (self.n_out * self.down + self.half_len) // self.up
+                drop = min(next_base - (self.taps - 1) - self.buffer_start, len(self.buffer))
+                if drop > 0:
+                        self.buffer = self.buffer[drop:]
+                        self.buffer_start += drop
+                return np.concatenate(outputs) if outputs else np.zeros(0)
+
+        def process(self, block):
+                block = np.asarray(block, dtype=np.float64)
+                if self.up == self.down:
+                        self.n_in += block.size
+                        self.n_out = self.n_in
+                        return block.copy()
+                self.buffer = np.concatenate((self.buffer, block))
+                self.n_in += block.size
+                # Output m is ready once input sample (m * down + half_len) // up has arrived
+                m_end = ((self.n_in - 1) * self.up - self.half_len) // self.down + 1 if self.n_in else 0
+                return self._compute(max(m_end, self.n_out))
+
+        def flush(self):
+                total_out = -(-self.n_in * self.up // self.down)
+                if total_out <= self.n_out:
+                        return np.zeros(0)
+                last_base = ((total_out - 1) * self.down + self.half_len) // self.up
+                padding = last_base - (self.buffer_start + len(self.buffer) - 1)
+                if padding > 0:
+                        self.buffer = np.concatenate((self.buffer, np.zeros(padding)))
+                return self._compute(total_out)
+
+def resample_polyphase(x, original_fs, new_fs, chunk_size=None):
+        """
+        Rational polyphase resampling of x from original_fs to new_fs.
+        With chunk_size the signal is streamed through PolyphaseResampler in
+        blocks of chunk_size samples, otherwise scipy.signal.resample_poly is used.
+        """
+        if chunk_size is None:
+                up, down = polyphase_factors(original_fs, new_fs)
+                return resample_poly(np.asarray(x, dtype=np.float64), up, down)
+
+        resampler = PolyphaseResampler(original_fs, new_fs)
+        outputs = [resampler.process(x[i:i + chunk_size]) for i in range(0, len(x), chunk_size)]
+        outputs.append(resampler.flush())
+        return np.concatenate(outputs)
+
+def downsample_general(df, original_fs, new_fs, bcg_col='BCG', timestamp_col='Timestamp_x', hr_col='Heart Rate',
+                       method='fft', chunk_size=None):
         """
         Downsamples the BCG signal using Fourier-based interpolation.
         Works for arbitrary sampling rate ratios.
+
+        method='poly' uses the rational polyphase resampler instead (e.g. 5/14 for
+        140 -> 50 Hz), optionally in streaming chunks of chunk_size samples.
         """
+        if method not in RESAMPLE_METHODS:
+                raise ValueError(f"Unknown resampling method '{method}', expected one of {RESAMPLE_METHODS}")
+
         duration = len(df) / original_fs    # total time in seconds
         num_new_samples = int(duration * new_fs)
 
-        # Resample BCG signal using Fourier method
-        bcg_resampled = resample(df[bcg_col].values, num_new_samples)
+        if method == 'fft':
+                # Resample BCG signal using Fourier method
+                bcg_resampled = resample(df[bcg_col].values, num_new_samples)
+        else:
+                bcg_resampled = resample_polyphase(df[bcg_col].values, original_fs, new_fs, chunk_size)[:num_new_samples]
 
         # Create time axes for interpolation
         time_original = np.linspace(0, duration, len(df))
@@ -34,30 +145,35 @@ def downsample_general(df, original_fs, new_fs, bcg_col='BCG', timestamp_col='Ti
 
         return downsampled_df
 
+def downsample_file(input_file, output_file, original_fs, new_fs, **kwargs):
+        """
+        Loads a synchronized recording, downsamples it with downsample_general and
+        saves it. Input and output may each be CSV, Parquet or NPZ (by extension).
+        """
+        df = read_table(input_file)
+        downsampled_df = downsample_general(df, original_fs, new_fs, **kwargs)
+        write_table(downsampled_df, output_file)
+        return downsampled_df
+
 # --- Example usage ---
 # input_file = r"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\01\synced\synchronized_bcg_rr_data.csv"
 # output_file = r"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\01\synced\resampled_sync_bcg_rr_data.csv"
 # input_file = r"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\07\synced\synchronized_bcg_rr_data.csv"
 # output_file = r"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\07\synced\resampled_sync_bcg_rr_data.csv"
-file_numbers = [f"{i:02d}" for i in range(31, 33) if i != 7]## + ["31", "32"]
-# 6 and 13  20 32 no sync
-# Loop through each folder number and create the corresponding input/output paths
-for num in file_numbers:
-#     user_input_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\BCG"
-#     user_output_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}"
-		input_file = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\synced\synchronized_bcg_rr_data.csv"
-		output_file = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\synced\resampled_sync_bcg_rr_data.csv"
-		original_fs = 140
-		new_fs = 50     # Can now be any arbitrary value
-    
-    # Load data
-		df = pd.read_csv(input_file)
-    
-    # Downsample
-		downsampled_df = downsample_general(df, original_fs, new_fs)
-    
-    # Save to CSV
-		downsampled_df.to_csv(output_file, index=False)
+if __name__ == "__main__":
+        file_numbers = [f"{i:02d}" for i in range(31, 33) if i != 7]## + ["31", "32"]
+        # 6 and 13  20 32 no sync
+        # Loop through each folder number and create the corresponding input/output paths
+        for num in file_numbers:
+        #     user_input_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\BCG"
+        #     user_output_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}"
+                input_file = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\synced\synchronized_bcg_rr_data.csv"
+                output_file = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}\synced\resampled_sync_bcg_rr_data.csv"
+                original_fs = 140
+                new_fs = 50     # Can now be any arbitrary value
+
+                # Load, downsample and save (CSV, Parquet or NPZ by file extension)
+                downsample_file(input_file, output_file, original_fs, new_fs)
 
 
 
@@ -0,0 +1,32 @@
+import unittest
+
+import numpy as np
+from scipy.signal import resample_poly
+
+from benchmark_resample import make_bcg_like
+from resample_BCG import PolyphaseResampler, polyphase_factors, resample_polyphase
+
+
+class PolyphaseResamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.x = make_bcg_like(14000 + 37, 140)
+
+    def test_chunked_equals_resample_poly(self):
+        for original_fs, new_fs in ((140, 50), (50, 140), (100, 50), (140, 140)):
+            up, down = polyphase_factors(original_fs, new_fs)
+            expected = resample_poly(self.x, up, down)
+            for chunk_size in (1, 999, 4096, self.x.size):
+                with self.subTest(original_fs=original_fs, new_fs=new_fs, chunk_size=chunk_size):
+                    np.testing.assert_allclose(resample_polyphase(self.x, original_fs, new_fs, chunk_size=chunk_size),
+                                               expected, rtol=0, atol=1e-9)
+
+    def test_same_rate_passes_blocks_through(self):
+        resampler = PolyphaseResampler(50, 50)
+        np.testing.assert_array_equal(resampler.process(self.x[:100]), self.x[:100])
+        np.testing.assert_array_equal(resampler.process(self.x[100:150]), self.x[100:150])
+        self.assertEqual(resampler.flush().size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+Sampling-rate metadata of a recording, carried through the processing chain.
+
+The BCG is sampled at 140 Hz by the mat (ingest), resampled (usually to
+50 Hz) and then processed by main.py, whose parameters were tuned at 50 Hz:
+500-sample windows, a level 4 wavelet cycle, rates computed at 50 Hz.
+SignalInfo carries the sampling frequency of the signal along with it, and
+the helpers below derive every rate-dependent parameter from it, so the
+chain can run on the 140 Hz signal or at 25 Hz unchanged.
+"""
+
+import math
+from collections import namedtuple
+
+import numpy as np
+
+# fs in Hz, start_epoch_ms: Unix time of the first sample (None if unknown)
+SignalInfo = namedtuple('SignalInfo', ['fs', 'start_epoch_ms'], defaults=[None])
+
+DEFAULT_FS = 50.0
+# Movement and heart-rate windows: 10 s is an optimal size for vital signs measurement
+WINDOW_SECONDS = 10
+# Upper edge of the wavelet cycle band: the level 4 smooth at 50 Hz, fs / 2^(J+1)
+WAVELET_CYCLE_HZ = 1.5625
+
+
+def window_samples(fs, seconds=WINDOW_SECONDS):
+    """Window length in samples, 500 at 50 Hz"""
+    return int(round(seconds * fs))
+
+
+def wavelet_level(fs):
+    """MODWT level whose smooth keeps the wavelet cycle band: 3 at 25 Hz, 4 at 50 Hz, 5 at 140 Hz"""
+    return max(int(round(math.log2(fs / WAVELET_CYCLE_HZ))) - 1, 1)
+
+
+def info_from_timestamps(time_ms):
+    """SignalInfo of a signal from its Unix ms timestamps (median sample spacing)"""
+    time_ms = np.asarray(time_ms, dtype=np.float64)
+    if time_ms.size < 2:
+        return SignalInfo(DEFAULT_FS, float(time_ms[0]) if time_ms.size else None)
+    return SignalInfo(1000.0 / float(np.median(np.diff(time_ms))), float(time_ms[0]))
@@ -0,0 +1,131 @@
+"""
+Memory-mapped signal store for the per-patient processing in main.py.
+
+A store file holds a small JSON header (sampling rate, start epoch, channel
+names, dtype, number of samples) followed by the raw channel arrays, each one
+contiguous (channel-major). open_signal_store maps the data with np.memmap, so
+loading a patient costs no parsing and every channel is a zero-copy view.
+
+Layout:
+    8 bytes   magic b'BCGSIG01'
+    4 bytes   header length (little-endian uint32)
+    header    UTF-8 JSON, padded with spaces so the data starts on a 64-byte boundary
+    data      n_channels x n_samples values of `dtype`
+
+Usage: python signal_store.py <resampled table> <store file> [--fs 50]
+"""
+
+import argparse
+import json
+import struct
+
+import numpy as np
+
+SIGNAL_STORE_EXTENSION = '.bcgsig'
+
+_MAGIC = b'BCGSIG01'
+_ALIGNMENT = 64
+
+# Columns of the resampled recordings (resample_BCG.downsample_general) and their channel names
+RESAMPLED_COLUMNS = ('BCG_downsampled', 'Timestamp_x_downsampled', 'Heart Rate_downsampled')
+RESAMPLED_CHANNELS = ('bcg', 'time', 'heart_rate')
+
+
+class SignalStore:
+    """An opened store: header fields plus the (n_channels, n_samples) memmap in `data`."""
+
+    def __init__(self, path, data, fs, start_epoch_ms, channel_names):
+        self.path = path
+        self.data = data
+        self.fs = fs
+        self.start_epoch_ms = start_epoch_ms
+        self.channel_names = list(channel_names)
+
+    @property
+    def n_samples(self):
+        return self.data.shape[1]
+
+    def __getitem__(self, name):
+        """Zero-copy view of one channel."""
+        return self.data[self.channel_names.index(name)]
+
+    def __repr__(self):
+        return (f"SignalStore('{self.path}', fs={self.fs}, n_samples={self.n_samples}, "
+                f"channels={self.channel_names})")
+
+
+def write_signal_store(path, channels, fs, start_epoch_ms, channel_names, dtype='float64'):
+    """
+    Writes `channels` (a (n_channels, n_samples) array or a sequence of equal
+    length 1-D arrays) to path. Returns path.
+    """
+    channel_names = list(channel_names)
+    n_samples = len(channels[0])
+    if len(channels) != len(channel_names) or any(len(c) != n_samples for c in channels):
+        raise ValueError("Expected one equal-length array per channel name")
+
+    header = json.dumps({
+        'version': 1,
+        'fs': float(fs),
+        'start_epoch_ms': None if start_epoch_ms is None else float(start_epoch_ms),
+        'channels': channel_names,
+        'dtype': np.dtype(dtype).str,
+        'n_samples': int(n_samples),
+    }).encode()
+    data_offset = len(_MAGIC) + 4 + len(header)
+    header += b' ' * (-data_offset % _ALIGNMENT)
+
+    with open(path, 'wb') as f:
+        f.write(_MAGIC)
+        f.write(struct.pack('<I', len(header)))
+        f.write(header)
+        for channel in channels:
+            f.write(np.ascontiguousarray(channel, dtype=dtype).tobytes())
+    return path
+
+
+def read_header(path):
+    """Returns (header dict, data offset in bytes)."""
+    with open(path, 'rb') as f:
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"'{path}' is not a signal store file")
+        (header_length,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_length))
+    return header, len(_MAGIC) + 4 + header_length
+
+
+def open_signal_store(path, mode='r'):
+    """Maps the store at path (read-only by default, mode='r+' to modify in place)."""
+    header, offset = read_header(path)
+    shape = (len(header['channels']), header['n_samples'])
+    data = np.memmap(path, dtype=np.dtype(header['dtype']), mode=mode, offset=offset, shape=shape)
+    return SignalStore(path, data, header['fs'], header['start_epoch_ms'], header['channels'])
+
+
+def table_to_signal_store(table_path, store_path, fs=None, columns=RESAMPLED_COLUMNS, channel_names=RESAMPLED_CHANNELS,
+                          time_column='Timestamp_x_downsampled'):
+    """
+    Converts a resampled recording (CSV, Parquet or NPZ, see columnar_cache) to a
+    signal store. The start epoch is taken from the first value of time_column,
+    and so is fs when not given (from the median sample spacing).
+    """
+    from columnar_cache import read_table
+    from signal_info import DEFAULT_FS, info_from_timestamps
+
+    df = read_table(table_path, parse_dates=False, columns=list(columns))
+    start_epoch_ms = float(df[time_column].iloc[0]) if time_column in df.columns and len(df) else None
+    if fs is None:
+        fs = info_from_timestamps(df[time_column].to_numpy()).fs if time_column in df.columns else DEFAULT_FS
+    return write_signal_store(store_path, [df[c].to_numpy(dtype=np.float64) for c in columns], fs, start_epoch_ms,
+                              channel_names)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("table_path", help="resampled recording (.csv, .parquet or .npz)")
+    parser.add_argument("store_path", help=f"output store file (usually *{SIGNAL_STORE_EXTENSION})")
+    parser.add_argument("--fs", type=float, default=None,
+                        help="sampling frequency of the recording in Hz (default: from the timestamps)")
+    args = parser.parse_args()
+
+    print(open_signal_store(table_to_signal_store(args.table_path, args.store_path, args.fs)))
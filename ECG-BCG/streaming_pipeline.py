@@ -0,0 +1,254 @@
+"""
+Real-time BCG heart rate: raw sensor blocks in, one BPM record per window out.
+
+StreamingBCGPipeline chains the streaming versions of the main.py stages:
+
+- movement: StreamingMovementDetector; the samples of the windows classified
+  as movement or empty bed are dropped, the others are passed on,
+- band_pass: BandPassFilter.process, the causal band-pass (the offline chain
+  uses the zero-phase filtfilt),
+- wavelet: BlockMODWT, the overlap-save wavelet cycle,
+- peaks: StreamingPeakDetector, detect_peaks' rising-edge rule (mpd=1, as in
+  main.py) across block boundaries,
+- rate: a RATE_DTYPE record for every window of window_seconds of the
+  gated signal, emitted as soon as the window closes; window_start and
+  window_end count samples of the gated signal, as in the offline chain.
+
+Each stage has a StageCounter (calls, samples, processing time, algorithmic
+delay). replay_recording feeds a recorded resampled recording (CSV, Parquet,
+NPZ or signal store) at N times real time.
+
+Usage: python streaming_pipeline.py <recording> [--speed 10] [--block 1.0] [--quiet]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from band_pass_filtering import BandPassFilter
+from compute_rate import RATE_DTYPE, rates_from_peaks
+from detect_body_movements import DEFAULT_HORIZON_WINDOWS, StreamingMovementDetector
+from modwt_block import BlockMODWT
+from signal_info import WINDOW_SECONDS, wavelet_level, window_samples
+
+
+class StageCounter:
+    """Calls, samples in and out, processing time and algorithmic delay (in samples) of a stage."""
+
+    def __init__(self, name, delay_samples=0):
+        self.name = name
+        self.delay_samples = delay_samples
+        self.calls = 0
+        self.samples_in = 0
+        self.samples_out = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, seconds, samples_in, samples_out):
+        self.calls += 1
+        self.samples_in += samples_in
+        self.samples_out += samples_out
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    @property
+    def throughput(self):
+        """Input samples processed per second of processing time."""
+        return self.samples_in / self.seconds if self.seconds else float('inf')
+
+    @property
+    def mean_seconds(self):
+        return self.seconds / self.calls if self.calls else 0.0
+
+
+class StreamingPeakDetector:
+    """
+    Incremental detect_peaks(x, mpd=1): a sample is a peak when it is higher
+    than the previous one and not lower than the next one (edge='rising').
+    The last two samples are kept between blocks, so a peak is reported one
+    sample after it, with its index in the whole stream.
+    """
+
+    def __init__(self):
+        self._tail = np.zeros(0)
+        self._offset = 0  # stream index of the first tail sample
+
+    def process(self, block):
+        data = np.concatenate((self._tail, np.asarray(block, dtype=np.float64)))
+        if data.size < 3:
+            self._tail = data
+            return np.zeros(0, dtype=int)
+        dx = np.diff(data)
+        peaks = np.flatnonzero((dx[:-1] > 0) & (dx[1:] <= 0)) + 1 + self._offset
+        self._offset += data.size - 2
+        self._tail = data[-2:]
+        return peaks
+
+
+class StreamingBCGPipeline:
+    """
+    Live heart rate of one bed. process(block) takes raw BCG samples at fs Hz
+    and returns the RATE_DTYPE records of the windows closed by that block;
+    flush() closes the stream. counters holds one StageCounter per stage and
+    delay_seconds the total algorithmic delay between a sample's arrival and
+    the record of its window.
+    """
+
+    STAGES = ('movement', 'band_pass', 'wavelet', 'peaks', 'rate')
+
+    def __init__(self, fs, wname='bior3.9', window_seconds=WINDOW_SECONDS, filter_type="bcg",
+                 movement_delay_windows=0, horizon_windows=DEFAULT_HORIZON_WINDOWS, block_size=None):
+        self.fs = fs
+        self.window = window_samples(fs, window_seconds)
+        level = wavelet_level(fs)
+
+        self.movement = StreamingMovementDetector(self.window, horizon_windows, movement_delay_windows)
+        self.band_pass = BandPassFilter(fs, filter_type)
+        self.wavelet = BlockMODWT(wname, level, block_size or self.window, levels=[level])
+        self.peaks = StreamingPeakDetector()
+
+        self.counters = {
+            'movement': StageCounter('movement', (1 + movement_delay_windows) * self.window),
+            'band_pass': StageCounter('band_pass'),
+            'wavelet': StageCounter('wavelet', self.wavelet.margin + self.wavelet.block_size),
+            'peaks': StageCounter('peaks', 1),
+            'rate': StageCounter('rate', self.window),
+        }
+
+        self._raw = np.zeros(0)         # samples waiting for their movement window to be classified
+        self._raw_start = 0             # stream index of _raw[0]
+        self._peaks = np.zeros(0, dtype=int)
+        self._n_cycle = 0               # wavelet cycle samples produced so far
+        self._n_windows = 0             # rate windows emitted so far
+
+    @property
+    def delay_seconds(self):
+        return sum(c.delay_samples for c in self.counters.values()) / self.fs
+
+    def _timed(self, stage, func, arg, n_in):
+        t0 = time.perf_counter()
+        out = func(arg)
+        n_out = out.size if isinstance(out, np.ndarray) else len(out[0])
+        self.counters[stage].add(time.perf_counter() - t0, n_in, n_out)
+        return out
+
+    def _gate(self, starts, flags, release_tail=False):
+        """Passes on the raw samples of the sleeping windows (flag 1), drops the others."""
+        kept = []
+        for start, flag in zip(starts, flags):
+            a = start - self._raw_start
+            if flag == 1:
+                kept.append(self._raw[a:a + self.window])
+        consumed = int(starts[-1] + self.window - self._raw_start) if len(starts) else 0
+        if release_tail:
+            # A trailing partial window is never classified and kept, as in detect_patterns
+            kept.append(self._raw[consumed:])
+            consumed = self._raw.size
+        self._raw = self._raw[consumed:]
+        self._raw_start += consumed
+        return np.concatenate(kept) if kept else np.zeros(0)
+
+    def _downstream(self, gated, wavelet_step):
+        filtered = self._timed('band_pass', self.band_pass.process, gated, gated.size)
+        cycle = self._timed('wavelet', wavelet_step, filtered, filtered.size)[0]
+        peaks = self._timed('peaks', self.peaks.process, cycle, cycle.size)
+        self._n_cycle += cycle.size
+        return self._timed('rate', self._close_windows, peaks, cycle.size)
+
+    def _close_windows(self, peaks):
+        """Records of the windows whose last sample has been produced."""
+        self._peaks = np.concatenate((self._peaks, peaks))
+        n_closed = self._n_cycle // self.window - self._n_windows
+        if n_closed <= 0:
+            return np.empty(0, dtype=RATE_DTYPE)
+        starts = (self._n_windows + np.arange(n_closed)) * self.window
+        ends = starts + self.window
+        # detect_peaks on a window slice cannot report its first and last samples
+        lo = np.searchsorted(self._peaks, starts, side='right')
+        hi = np.searchsorted(self._peaks, ends - 1, side='left')
+        n_peaks = np.maximum(hi - lo, 0)
+        has_peaks = n_peaks > 0
+        first = np.zeros(n_closed, dtype=int)
+        last = np.zeros(n_closed, dtype=int)
+        first[has_peaks] = self._peaks[lo[has_peaks]]
+        last[has_peaks] = self._peaks[hi[has_peaks] - 1]
+        records = rates_from_peaks(starts, ends, n_peaks, first, last, self.fs)
+        self._n_windows += n_closed
+        self._peaks = self._peaks[self._peaks >= ends[-1]]
+        return records
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float64)
+        self._raw = np.concatenate((self._raw, block))
+        starts, flags = self._timed('movement', self.movement.process, block, block.size)
+        return self._downstream(self._gate(starts, flags), self.wavelet.process)
+
+    def flush(self):
+        t0 = time.perf_counter()
+        starts, flags = self.movement.flush()
+        self.counters['movement'].add(time.perf_counter() - t0, 0, len(starts))
+        records = self._downstream(self._gate(starts, flags, release_tail=True), self.wavelet.process)
+        # The wavelet margin still holds the last samples
+        tail = self._downstream(np.zeros(0), lambda _: self.wavelet.flush())
+        # A last partial window is not a window (the offline chain uses floor(n / window) windows)
+        return np.concatenate((records, tail))
+
+
+def replay_recording(path, speed=10.0, block_seconds=1.0, verbose=True, **pipeline_kwargs):
+    """
+    Feeds a recorded resampled recording to a StreamingBCGPipeline in blocks of
+    block_seconds, at speed times real time (0: as fast as possible).
+    Returns (records, pipeline).
+    """
+    from pipeline import load_patient_data
+
+    data, info = load_patient_data(path)
+    bcg = np.ascontiguousarray(data[:, 0], dtype=np.float64)
+    stream = StreamingBCGPipeline(info.fs, **pipeline_kwargs)
+    block = max(int(round(block_seconds * info.fs)), 1)
+
+    records = []
+    t_start = time.perf_counter()
+    for i in range(0, bcg.size, block):
+        if speed:
+            # Wait until the block would have been recorded
+            lag = (i + block) / info.fs / speed - (time.perf_counter() - t_start)
+            if lag > 0:
+                time.sleep(lag)
+        records.append(stream.process(bcg[i:i + block]))
+        if verbose:
+            _print_records(records[-1], stream.window)
+    records.append(stream.flush())
+    if verbose:
+        _print_records(records[-1], stream.window)
+    wall = time.perf_counter() - t_start
+    records = np.concatenate(records)
+
+    if verbose:
+        print("\nStreaming replay")
+        print("==========================================================================================================")
+        print(f"{bcg.size} samples ({bcg.size / info.fs:.0f} s at {info.fs:g} Hz) in {wall:.2f} s, "
+              f"{records.size} windows, {records['valid'].sum()} with a rate")
+        print(f"algorithmic delay: {stream.delay_seconds:.1f} s")
+        print(f"{'stage':<11}{'calls':>8}{'samples in':>12}{'mean [us]':>11}{'max [us]':>10}{'x real time':>13}{'delay [s]':>11}")
+        for c in stream.counters.values():
+            print(f"{c.name:<11}{c.calls:>8}{c.samples_in:>12}{c.mean_seconds * 1e6:>11.1f}{c.max_seconds * 1e6:>10.1f}"
+                  f"{c.throughput / info.fs:>13.0f}{c.delay_samples / info.fs:>11.1f}")
+    return records, stream
+
+
+def _print_records(records, window):
+    for r in records:
+        bpm = f"{r['bpm']:.1f} bpm" if r['valid'] else "no rate"
+        print(f"window {r['window_start'] // window:>6}: {bpm} ({r['n_peaks']} peaks)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="resampled recording (.csv, .parquet, .npz or .bcgsig)")
+    parser.add_argument("--speed", type=float, default=10.0, help="multiple of real time (0: as fast as possible)")
+    parser.add_argument("--block", type=float, default=1.0, help="block length in seconds")
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+    replay_recording(args.recording, args.speed, args.block, verbose=not args.quiet)
@@ -0,0 +1,68 @@
+import math
+import unittest
+
+import numpy as np
+
+from benchmark_bed_server import make_bed_signal
+from benchmark_sampling_rate import make_bcg_with_heart_rate
+from detect_body_movements import detect_patterns
+from pipeline import BCGPipeline
+from signal_info import WINDOW_SECONDS
+from streaming_pipeline import StreamingBCGPipeline
+
+# Mean |bpm difference| allowed between the causal stream and the offline zero-phase chain
+BPM_TOLERANCE = 3.0
+
+
+class StreamingBCGPipelineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.fs = 50.0
+        n = int(3600 * cls.fs)
+        cls.runs = []
+        for seed in (0, 1):
+            bcg = make_bed_signal(n, cls.fs, seed)
+            ref_hr = make_bcg_with_heart_rate(n, cls.fs, seed)[1]
+            time = 1.7e12 + np.arange(n) * 1000 / cls.fs
+            # The offline chain on the samples kept by the offline movement removal
+            kept, kept_time = detect_patterns(0, 500, 500, bcg, time, plot=0, fs=cls.fs)
+            offline = BCGPipeline(remove_movements=False).process_signal(kept, kept_time, ref_hr, cls.fs).rates
+
+            stream = StreamingBCGPipeline(cls.fs)
+            rng = np.random.default_rng(seed)
+            blocks, i = [], 0
+            while i < n:
+                size = int(rng.integers(1, 2000))
+                blocks.append(stream.process(bcg[i:i + size]))
+                i += size
+            tail = stream.flush()
+            cls.runs.append((offline, np.concatenate(blocks), tail, stream))
+
+    def test_window_count_within_the_delay(self):
+        for offline, streamed, tail, stream in self.runs:
+            delay_windows = math.ceil(stream.delay_seconds / WINDOW_SECONDS)
+            rates = np.concatenate((streamed, tail))
+            self.assertLessEqual(abs(rates.size - offline.size), delay_windows)
+            # Before the flush, the stream lags the offline chain by its delay at most (+1 partial window)
+            self.assertLessEqual(offline.size - streamed.size, delay_windows + 1)
+            np.testing.assert_array_equal(rates['window_start'], np.arange(rates.size) * stream.window)
+
+    def test_rates_agree_with_offline(self):
+        for offline, streamed, tail, _ in self.runs:
+            rates = np.concatenate((streamed, tail))
+            m = min(rates.size, offline.size)
+            valid = rates['valid'][:m] & offline['valid'][:m]
+            self.assertGreater(valid.mean(), 0.9)
+            self.assertLess(np.mean(np.abs(rates['bpm'][:m][valid] - offline['bpm'][:m][valid])), BPM_TOLERANCE)
+
+    def test_flush_emits_the_tail_windows(self):
+        for _, streamed, tail, stream in self.runs:
+            self.assertGreater(tail.size, 0)
+            self.assertEqual(tail['window_start'][0], streamed.size * stream.window)
+            # Nothing is left afterwards
+            self.assertEqual(stream.flush().size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
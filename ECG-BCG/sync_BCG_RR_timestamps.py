@@ -2,13 +2,24 @@ import pandas as pd
 import glob
 import os
 
+from columnar_cache import CACHE_FORMATS, TableWriter, iter_table, read_table, with_format, write_table
+
+SYNC_TOLERANCE = pd.Timedelta(milliseconds=300)
+
+def find_bcg_files(bcg_path):
+    """Converted BCG files in any of the cache formats (CSV, Parquet, NPZ)"""
+    bcg_files = []
+    for file_format in CACHE_FORMATS:
+        bcg_files.extend(glob.glob(os.path.join(bcg_path, f"*BCG.{file_format}")))
+    return bcg_files
+
 def process_bcg_files(bcg_path):
     """Read and combine all BCG files"""
-    bcg_files = glob.glob(os.path.join(bcg_path, "*BCG.csv"))
+    bcg_files = find_bcg_files(bcg_path)
     bcg_dfs = []
     
     for file in bcg_files:
-        df = pd.read_csv(file)
+        df = read_table(file)
         # Ensure Timestamp_UTC column exists and convert to UTC
         if 'Timestamp_UTC' in df.columns:
             df['Timestamp_UTC'] = pd.to_datetime(df['Timestamp_UTC']).dt.tz_localize(None)
@@ -30,8 +41,14 @@ def process_rr_files(rr_path):
             
     return pd.concat(rr_dfs, ignore_index=True) if rr_dfs else None
 
-def sync_bcg_rr_data(base_folder, output_path):
-    """Main function to sync BCG and RR data"""
+def sync_bcg_rr_data(base_folder, output_path, output_format='csv', streaming=False, chunksize=1000000):
+    """
+    Main function to sync BCG and RR data (output_format: 'csv', 'parquet' or 'npz').
+    With streaming=True the BCG files are merged chunk by chunk, see sync_bcg_rr_data_streaming.
+    """
+    if streaming:
+        return sync_bcg_rr_data_streaming(base_folder, output_path, output_format, chunksize)
+
     # Define paths 
     bcg_path = base_folder
     rr_path = os.path.join(base_folder, "Reference", "RR")
@@ -48,6 +65,11 @@ def sync_bcg_rr_data(base_folder, output_path):
         print("No RR files found or processed")
         return
     
+    # Both merge keys need the same datetime resolution (cached tables restore ns,
+    # text parsing may give us depending on the pandas version)
+    bcg_df['Timestamp_UTC'] = bcg_df['Timestamp_UTC'].astype('datetime64[ns]')
+    rr_df['Timestamp'] = rr_df['Timestamp'].astype('datetime64[ns]')
+
     # Sort dataframes by timestamp
     bcg_df = bcg_df.sort_values('Timestamp_UTC')
     rr_df = rr_df.sort_values('Timestamp')
@@ -59,15 +81,15 @@ def sync_bcg_rr_data(base_folder, output_path):
         left_on='Timestamp_UTC',
         right_on='Timestamp',
         direction='nearest',
-        tolerance=pd.Timedelta(milliseconds=300)
+        tolerance=SYNC_TOLERANCE
     )
     
     # Remove rows where there was no match within tolerance
     merged_df = merged_df.dropna(subset=['Heart Rate', 'RR Interval in seconds'])
     
     # Save the synchronized data
-    output_file = os.path.join(output_path, "synchronized_bcg_rr_data.csv")
-    merged_df.to_csv(output_file, index=False)
+    output_file = with_format(os.path.join(output_path, "synchronized_bcg_rr_data.csv"), output_format)
+    write_table(merged_df, output_file)
     print(f"Synchronized data saved to: {output_file}")
     
     # Print summary statistics
@@ -76,20 +98,98 @@ def sync_bcg_rr_data(base_folder, output_path):
     print(f"Total RR records processed: {len(rr_df)}")
     print(f"Total synchronized records: {len(merged_df)}")
 
+def first_bcg_timestamp(file):
+    """Timestamp_UTC of the first row of a BCG file (None if the column is missing)"""
+    first_chunk = next(iter_table(file, chunksize=1), None)
+    if first_chunk is None or 'Timestamp_UTC' not in first_chunk.columns or first_chunk.empty:
+        return None
+    return pd.to_datetime(first_chunk['Timestamp_UTC']).dt.tz_localize(None).iloc[0]
+
+def sync_bcg_rr_data_streaming(base_folder, output_path, output_format='csv', chunksize=1000000):
+    """
+    Streaming variant of sync_bcg_rr_data with bounded peak memory.
+
+    The (small) RR table is loaded once. The BCG files are visited in order of
+    their first timestamp and read `chunksize` rows at a time; each chunk is
+    as-of merged against the RR rows within its time span +- the 300 ms
+    tolerance and appended to the output file. The nearest-match semantics are
+    the same as the in-memory version, so the output rows are identical as long
+    as the BCG files do not overlap in time (rows are otherwise ordered by file,
+    not globally by timestamp). Output must be 'csv' or 'parquet'.
+    """
+    rr_path = os.path.join(base_folder, "Reference", "RR")
+
+    rr_df = process_rr_files(rr_path)
+    if rr_df is None:
+        print("No RR files found or processed")
+        return
+    rr_df['Timestamp'] = rr_df['Timestamp'].astype('datetime64[ns]')
+    rr_df = rr_df.sort_values('Timestamp', ignore_index=True)
+    rr_times = rr_df['Timestamp'].values
+    # merge_asof turns the integer RR columns into float in chunks with unmatched rows (and keeps them
+    # integer in fully matched ones): fix them to float, as in the in-memory merge, so every chunk
+    # has the same column types
+    rr_float = {name: 'float64' for name in rr_df.columns
+                if name != 'Timestamp' and pd.api.types.is_integer_dtype(rr_df[name].dtype)}
+
+    bcg_files = []
+    for file in find_bcg_files(base_folder):
+        start = first_bcg_timestamp(file)
+        if start is not None:
+            bcg_files.append((start, file))
+    if not bcg_files:
+        print("No BCG files found or processed")
+        return
+    bcg_files.sort()
+
+    output_file = with_format(os.path.join(output_path, "synchronized_bcg_rr_data.csv"), output_format)
+    total_bcg = 0
+    with TableWriter(output_file) as writer:
+        for _, file in bcg_files:
+            for chunk in iter_table(file, chunksize):
+                chunk = chunk.copy()
+                chunk['Timestamp_UTC'] = pd.to_datetime(chunk['Timestamp_UTC']).dt.tz_localize(None).astype('datetime64[ns]')
+                chunk = chunk.sort_values('Timestamp_UTC')
+                total_bcg += len(chunk)
+
+                # Only the RR rows that can match this chunk within the tolerance
+                lo = rr_times.searchsorted((chunk['Timestamp_UTC'].iloc[0] - SYNC_TOLERANCE).to_datetime64(), side='left')
+                hi = rr_times.searchsorted((chunk['Timestamp_UTC'].iloc[-1] + SYNC_TOLERANCE).to_datetime64(), side='right')
+
+                merged = pd.merge_asof(
+                    chunk,
+                    rr_df.iloc[lo:hi],
+                    left_on='Timestamp_UTC',
+                    right_on='Timestamp',
+                    direction='nearest',
+                    tolerance=SYNC_TOLERANCE
+                )
+                merged = merged.dropna(subset=['Heart Rate', 'RR Interval in seconds']).astype(rr_float)
+                if not merged.empty:
+                    writer.write(merged)
+        total_synced = writer.rows
+
+    print(f"Synchronized data saved to: {output_file}")
+    print(f"\nSummary:")
+    print(f"Total BCG records processed: {total_bcg}")
+    print(f"Total RR records processed: {len(rr_df)}")
+    print(f"Total synchronized records: {total_synced}")
+
 # Usage
 # base_folder = r"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\01"
 # output_path = r"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\01\synced"
 
 
-file_numbers = [f"{i:02d}" for i in range(2, 21) if i != 7] + ["31", "32"]
+if __name__ == "__main__":
+    file_numbers = [f"{i:02d}" for i in range(2, 21) if i != 7] + ["31", "32"]
 
-# Loop through each folder number and create the corresponding input/output paths
-for num in file_numbers:
-    base_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}"
-    output_path = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}"
+    # Loop through each folder number and create the corresponding input/output paths
+    for num in file_numbers:
+        base_folder = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}"
+        output_path = rf"D:\oneDrive\Desktop\BCG-Heart rate-detection\dataset\data\{num}"
 
-# Create output directory if it doesn't exist
-    os.makedirs(output_path, exist_ok=True)
+    # Create output directory if it doesn't exist
+        os.makedirs(output_path, exist_ok=True)
 
-# Run the synchronization
-    sync_bcg_rr_data(base_folder, output_path)
\ No newline at end of file
+    # Run the synchronization
+        sync_bcg_rr_data(base_folder, output_path)
@@ -0,0 +1,59 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from columnar_cache import TableWriter, read_table
+from sync_BCG_RR_timestamps import sync_bcg_rr_data
+
+
+def write_recording(base_folder, n_bcg=2000, n_rr=60):
+    """A BCG file at 50 Hz and RR rows every 250 ms covering only its first n_rr / 4 seconds."""
+    bcg_time = pd.date_range('2024-01-01', periods=n_bcg, freq='20ms', tz='UTC')
+    pd.DataFrame({'BCG': np.arange(n_bcg), 'Timestamp_UTC': bcg_time.strftime('%Y-%m-%d %H:%M:%S.%f')}).to_csv(
+        os.path.join(base_folder, 'night_BCG.csv'), index=False)
+    rr_path = os.path.join(base_folder, 'Reference', 'RR')
+    os.makedirs(rr_path)
+    pd.DataFrame({'Timestamp': pd.date_range('2024-01-01', periods=n_rr, freq='250ms'),
+                  'Heart Rate': np.arange(n_rr) % 20 + 60,
+                  'RR Interval in seconds': np.full(n_rr, 0.85)}).to_csv(os.path.join(rr_path, 'night_RR.csv'),
+                                                                          index=False)
+
+
+def sync(base_folder, output_format, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        sync_bcg_rr_data(base_folder, base_folder, output_format=output_format, **kwargs)
+    return os.path.join(base_folder, f"synchronized_bcg_rr_data.{output_format}")
+
+
+class StreamingSyncTest(unittest.TestCase):
+
+    def test_rr_coverage_ending_within_a_chunk(self):
+        # The first chunk (10 s) is fully matched, the RR data ends 15 s in, inside the second chunk
+        for output_format in ('parquet', 'csv'):
+            with self.subTest(output_format=output_format), tempfile.TemporaryDirectory() as folder:
+                write_recording(folder)
+                expected = read_table(sync(folder, output_format))
+                os.remove(os.path.join(folder, f"synchronized_bcg_rr_data.{output_format}"))
+                streamed = read_table(sync(folder, output_format, streaming=True, chunksize=500))
+                self.assertEqual(len(streamed), 753)  # up to 14.75 s + 300 ms
+                pd.testing.assert_frame_equal(streamed, expected)
+
+
+class TableWriterTest(unittest.TestCase):
+
+    def test_parquet_chunks_are_cast_to_the_first_schema(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'table.parquet')
+            with TableWriter(path) as writer:
+                writer.write(pd.DataFrame({'a': np.array([1, 2], dtype=np.int64)}))
+                writer.write(pd.DataFrame({'a': np.array([3.0, 4.0])}))
+            np.testing.assert_array_equal(read_table(path)['a'], [1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()